@@ -0,0 +1,365 @@
+#!/usr/bin/python3
+# Consistency of pick-and-place, BOM and schematics across board revisions
+#
+# python3 assembly_check.py                               # every archive in Outputs/
+# python3 assembly_check.py ../Outputs/DL-3.2.1-MB_PCB4.zip
+# python3 assembly_check.py --output findings.ndjson      # or .csv, --format ndjson for stdout
+#
+# for finding in check_archives(ARCHIVES):
+#     finding.designator, finding.check, finding.message
+#
+# Every source is read once, as a stream, into a designator keyed index:
+# the pick-and-place CSV and the BOM spreadsheet inside each archive (the
+# xlsx is itself a zip, read from the archive member without extracting
+# either), and per board the project schematics (schdoc_netlist) and the
+# manual lines of its BomDoc (bom_doc). Each archive is then checked in one
+# pass over the union of the designators:
+#
+# missing    a designator one source has and another lacks
+# dnp        placed but Do Not Stuff in the BOM, fitted in the BOM but not
+#            placed, or a BOM line whose type and quantity disagree
+# value      BOM value (Name / Comment) differs from the schematic or BomDoc
+# footprint  BOM footprint differs from the pick-and-place or BomDoc
+# quantity   a BOM quantity that is not its number of designators
+# duplicate  a designator on two lines of one source
+#
+# The schematics and BomDocs are the current design, so their findings on
+# older revisions are warnings, archive internal ones are always errors.
+from collections import namedtuple
+import argparse
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+
+from bom_doc import BOM_FILES, BomIndex
+from gerber_analysis import ARCHIVES
+from result_sinks import FORMATS, open_sink
+from revision_diff import archive_pick_place, board_revision, member_role, revisions
+from schdoc_netlist import NO_BOM_KINDS, PROJECT_DIRS, read_project
+from switch_bias_functions import fromSI
+
+# Project of each board of revision_diff.board_revision
+BOARD_PROJECTS = {"MB": "mainboard", "CB": "connector"}
+
+# BOM types of parts that are not fitted
+DNP_TYPES = ("DNS", "DNP")
+
+# Header names of the BOM spreadsheet columns, first match wins
+BOM_COLUMNS = {
+    "designator": ("Designator",),
+    "quantity": ("Quantity", "QTY"),
+    "value": ("Comment", "Name", "Value"),
+    "footprint": ("Footprint",),
+    "type": ("Type",),
+}
+
+SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATIONSHIP_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# One designator of a source: value and footprint None when the source has
+# none, fitted None when unknown, line: BOM item or row for messages
+Part = namedtuple("Part", ["designator", "value", "footprint", "fitted", "line"])
+
+# severity: error or warning
+Finding = namedtuple("Finding", ["board", "revision", "archive", "designator", "check", "severity",
+                                 "message"])
+
+_CELL_COLUMN = re.compile(r"[A-Z]+")
+
+
+def _column_index(reference):
+    """Returns the 0 based column of a cell reference, e.g. B7 -> 1"""
+    index = 0
+    for letter in _CELL_COLUMN.match(reference).group():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+def _first_sheet(book):
+    """Returns the member name of the first worksheet of an xlsx zip"""
+    with book.open("xl/workbook.xml") as f:
+        sheet = next(element for _, element in ET.iterparse(f) if element.tag == SPREADSHEET_NS + "sheet")
+    target_id = sheet.get(RELATIONSHIP_NS + "id")
+    with book.open("xl/_rels/workbook.xml.rels") as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == PACKAGE_NS + "Relationship" and element.get("Id") == target_id:
+                target = element.get("Target")
+                return target.lstrip("/") if target.startswith("/") else "xl/" + target
+    raise KeyError(target_id)
+
+
+def iter_xlsx_rows(stream):
+    """
+    Yields (row number, [cell text]) of the first worksheet of an xlsx
+    file, a seekable binary stream such as a zip member. Rows are parsed
+    one at a time and cleared, shared strings are resolved.
+    """
+    with zipfile.ZipFile(stream) as book:
+        strings = []
+        if "xl/sharedStrings.xml" in book.namelist():
+            with book.open("xl/sharedStrings.xml") as f:
+                for _, element in ET.iterparse(f):
+                    if element.tag == SPREADSHEET_NS + "si":
+                        strings.append("".join(t.text or "" for t in element.iter(SPREADSHEET_NS + "t")))
+                        element.clear()
+        with book.open(_first_sheet(book)) as f:
+            for _, element in ET.iterparse(f):
+                if element.tag != SPREADSHEET_NS + "row":
+                    continue
+                cells = []
+                for cell in element.iter(SPREADSHEET_NS + "c"):
+                    kind = cell.get("t")
+                    if kind == "inlineStr":
+                        text = "".join(t.text or "" for t in cell.iter(SPREADSHEET_NS + "t"))
+                    else:
+                        value = cell.find(SPREADSHEET_NS + "v")
+                        text = value.text or "" if value is not None else ""
+                        if kind == "s" and text:
+                            text = strings[int(text)]
+                    column = _column_index(cell.get("r")) if cell.get("r") else len(cells)
+                    cells.extend([""] * (column + 1 - len(cells)))
+                    cells[column] = text
+                yield int(element.get("r", 0)), cells
+                element.clear()
+
+
+def _add(index, part, source, findings):
+    if part.designator in index:
+        findings.append((part.designator, "duplicate", "{0} lists it on lines {1} and {2}".format(
+            source, index[part.designator].line, part.line)))
+    else:
+        index[part.designator] = part
+
+
+def read_bom_xlsx(stream):
+    """
+    Returns ({designator: Part}, [(designator, check, message)]) of a BOM
+    spreadsheet, the findings of the BOM on its own (duplicate designators,
+    type / quantity disagreements)
+
+    Raises
+    ------
+    ValueError
+        If no row has a Designator column
+    """
+    parts, findings, columns = {}, [], None
+    for number, cells in iter_xlsx_rows(stream):
+        if columns is None:
+            names = [cell.strip().lstrip("*").strip() for cell in cells]
+            if "Designator" in names:
+                columns = {key: next((names.index(name) for name in choices if name in names), None)
+                           for key, choices in BOM_COLUMNS.items()}
+            continue
+
+        def cell(key):
+            column = columns[key]
+            return cells[column].strip() if column is not None and column < len(cells) else ""
+
+        designators = [name.strip() for name in cell("designator").split(",") if name.strip()]
+        if not designators:
+            continue
+        line = "{0} (row {1})".format(designators[0], number)
+        dnp = cell("type").upper() in DNP_TYPES
+        try:
+            quantity = int(float(cell("quantity")))
+        except ValueError:
+            quantity = None
+        # DNS rows count either nothing or their designators, fitted rows
+        # their designators
+        if not dnp and quantity == 0:
+            findings.append((designators[0], "dnp", "BOM row {0} has quantity 0 but type {1}".format(
+                number, cell("type") or "none")))
+        elif quantity is not None and quantity != len(designators) and not (dnp and quantity == 0):
+            findings.append((designators[0], "quantity", "BOM row {0} has quantity {1} for {2} designators".format(
+                number, quantity, len(designators))))
+        for designator in designators:
+            _add(parts, Part(designator, cell("value") or None, cell("footprint") or None, not dnp, line),
+                 "BOM", findings)
+    if columns is None:
+        raise ValueError("No Designator column")
+    return parts, findings
+
+
+def archive_sources(path):
+    """
+    Returns ({source: {designator: Part}}, findings) of the pick-and-place
+    CSV and BOM spreadsheet of an archive, sources it lacks left out
+    """
+    with zipfile.ZipFile(path) as archive:
+        members = {member_role(info.filename): info.filename for info in archive.infolist()}
+    sources, findings = {}, []
+    if "Pick Place.csv" in members:
+        sources["pick_place"] = {designator: Part(designator, None, placement.footprint, True, designator)
+                                 for designator, placement in archive_pick_place(path, members["Pick Place.csv"]).items()}
+    if "BOM.xlsx" in members:
+        with zipfile.ZipFile(path) as archive:
+            with archive.open(members["BOM.xlsx"]) as stream:
+                sources["bom"], findings = read_bom_xlsx(stream)
+    return sources, findings
+
+
+def design_sources(board):
+    """
+    Returns {source: {designator: Part}} of the current design of a board:
+    the schematic components and the designators of the BomDoc's manual
+    lines
+    """
+    project = BOARD_PROJECTS.get(board)
+    sources = {}
+    if project in PROJECT_DIRS:
+        netlist = read_project(PROJECT_DIRS[project])
+        sources["schematic"] = {designator: Part(designator, _alternatives(component.value, component.comment,
+                                                                           component.lib_reference),
+                                                 None, component.kind not in NO_BOM_KINDS, component.sheet)
+                                for designator, component in netlist.components.items()}
+    if project in BOM_FILES:
+        index = BomIndex.read(BOM_FILES[project])
+        lines = {line.uid: line for line in index.lines}
+        bomdoc = {}
+        for placement in index.placements:
+            line = lines.get(placement.uid)
+            for designator in placement.designator.split(","):
+                designator = designator.strip()
+                if designator and line is not None:
+                    bomdoc.setdefault(designator, Part(designator, line.comment or None, line.footprint or None,
+                                                       placement.quantity > 0, line.item or line.comment))
+        sources["bomdoc"] = bomdoc
+    return sources
+
+
+def _alternatives(*values):
+    return tuple(value for value in values if value) or None
+
+
+def _display(value):
+    return value[0] if isinstance(value, tuple) else value
+
+
+def _same_value(a, b):
+    """
+    Returns whether two values agree as text or as SI numbers, b may be a
+    tuple of alternatives (a schematic's value, comment and library
+    reference), None agrees with anything
+    """
+    if a is None or b is None:
+        return True
+    if isinstance(b, tuple):
+        return any(_same_value(a, value) for value in b)
+    if a.strip().upper() == b.strip().upper():
+        return True
+    try:
+        x, y = fromSI(a), fromSI(b)
+    except ValueError:
+        return False
+    return abs(x - y) <= 1e-9 * max(abs(x), abs(y))
+
+
+def _same_footprint(a, b):
+    return a is None or b is None or a.strip().upper() == b.strip().upper()
+
+
+def check_sources(sources):
+    """
+    Returns [(designator, check, message, internal)] of one archive's
+    sources in a single pass over their designators, internal True for
+    pick-and-place / BOM findings
+    """
+    pick_place = sources.get("pick_place")
+    bom = sources.get("bom")
+    schematic = sources.get("schematic")
+    bomdoc = sources.get("bomdoc")
+    designators = set()
+    for index in sources.values():
+        designators.update(index)
+    findings = []
+    for designator in sorted(designators):
+        placed = pick_place.get(designator) if pick_place is not None else None
+        line = bom.get(designator) if bom is not None else None
+        component = schematic.get(designator) if schematic is not None else None
+        manual = bomdoc.get(designator) if bomdoc is not None else None
+        if pick_place is not None and bom is not None:
+            if placed and line is None:
+                findings.append((designator, "missing", "placed but not in the BOM", True))
+            elif placed and not line.fitted:
+                findings.append((designator, "dnp", "placed but {0} is not fitted in the BOM".format(
+                    line.line), True))
+            elif line and line.fitted and placed is None and manual is None:
+                findings.append((designator, "missing", "fitted in the BOM but not placed", True))
+            if placed and line and not _same_footprint(placed.footprint, line.footprint):
+                findings.append((designator, "footprint", "placed as {0}, BOM has {1}".format(
+                    placed.footprint, line.footprint), True))
+        listed = line or placed
+        if schematic is not None and listed:
+            if component is None:
+                # BomDoc manual lines (hardware, placeholders) have no symbol
+                if manual is None:
+                    findings.append((designator, "missing", "not in the schematics", False))
+            elif line and not _same_value(line.value, component.value):
+                findings.append((designator, "value", "BOM has {0}, schematic {1}".format(
+                    line.value, _display(component.value)), False))
+        if (schematic is not None and component and component.fitted and bom is not None
+                and line is None and placed is None):
+            findings.append((designator, "missing", "in the schematics ({0}) but not in the BOM".format(
+                component.line), False))
+        if manual and bom is not None:
+            if line is None:
+                findings.append((designator, "missing", "BomDoc line {0} is not in the BOM".format(
+                    manual.line), False))
+            else:
+                if not _same_value(line.value, manual.value):
+                    findings.append((designator, "value", "BOM has {0}, BomDoc {1}".format(
+                        line.value, manual.value), False))
+                if not _same_footprint(line.footprint, manual.footprint):
+                    findings.append((designator, "footprint", "BOM has {0}, BomDoc {1}".format(
+                        line.footprint, manual.footprint), False))
+    return findings
+
+
+def check_archives(paths=ARCHIVES):
+    """
+    Yields the Findings of every archive, board by board in revision
+    order. The design sources of a board are read once.
+    """
+    for board, archives in revisions(paths).items():
+        design = None
+        for path in archives:
+            sources, bom_findings = archive_sources(path)
+            if not sources:
+                continue
+            if design is None:
+                design = design_sources(board)
+            revision = ".".join(str(part) for part in board_revision(path)[1])
+            latest = path == archives[-1]
+            name = os.path.basename(path)
+            findings = [(designator, check, message, True) for designator, check, message in bom_findings]
+            findings += check_sources(dict(design, **sources))
+            for designator, check, message, internal in findings:
+                yield Finding(board, revision, name, designator, check,
+                              "error" if internal or latest else "warning", message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check pick-and-place, BOM and schematics of the fabrication archives")
+    parser.add_argument("archives", nargs="*", help="archives, default every one in Outputs/")
+    parser.add_argument("--output", metavar="PATH", help="write the findings to PATH (.csv, .ndjson)")
+    parser.add_argument("--format", choices=FORMATS, help="output format, default from the PATH extension")
+    parser.add_argument("--errors", action="store_true", help="only errors, not warnings")
+    args = parser.parse_args()
+
+    errors = 0
+    with open_sink(args.output, Finding._fields, args.format,
+                   "{2:24s} {3:12s} {4:9s} {5:7s} {6}", "archive                  designator   check     "
+                   "severity message") as sink:
+        for finding in check_archives(args.archives or ARCHIVES):
+            if args.errors and finding.severity != "error":
+                continue
+            errors += finding.severity == "error"
+            sink.write(finding)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+# Cold import time of the Support modules, measured with python -X importtime
+#
+# Usage: python3 bench_import_time.py [--budget-ms 50] [module ...]
+# Exits with status 1 if any module's cumulative import time exceeds budget
+import argparse
+import os
+import subprocess
+import sys
+
+# Numeric paths that must stay fast to import (no SymPy / NumPy)
+NUMERIC_MODULES = ["switch_bias_functions", "component_values", "device_library", "fet_bjt_vars",
+                   "divider_synthesis", "topologies"]
+
+
+def import_time_us(module, runs=5):
+    """
+    Returns the best cumulative import time of module in microseconds
+    over a number of fresh interpreter runs
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(runs):
+        # Best of several runs, the first one also warms the bytecode cache
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                              cwd=here, capture_output=True, text=True, check=True)
+        cumulative = None
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith("import time:"):
+                continue
+            fields = line[len("import time:"):].split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                cumulative = int(fields[1])
+        if cumulative is None:
+            raise RuntimeError("No import time reported for '{0}'".format(module))
+        best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the Support modules")
+    parser.add_argument("modules", nargs="*", default=NUMERIC_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    print("{0:24s} {1:>10s}".format("Module", "Import(ms)"))
+    for module in args.modules:
+        elapsed = import_time_us(module, args.runs) / 1000
+        over = elapsed > args.budget_ms
+        failed = failed or over
+        print("{0:24s} {1:>10.2f} {2}".format(module, elapsed, "OVER BUDGET" if over else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+# Benchmark of the iv_tables lookups against the analytic device models
+#
+# Each case times the analytic model and its table on the same random
+# points (best of several repeats) and reports the largest relative error
+# of the tabulated current. FET points are spread log-uniformly over the
+# whole grid, from 1mV overdrive and 0.1mV Vds up, so the threshold and
+# deep triode corners are included. BJT points are forward active
+# (Vce >= 1V), where the relative error is that of exp(Vbe / Vt)
+# interpolated over one Vbe step, about (h / Vt)**2 / 8; near Vce = 0 Ic
+# changes sign and only the absolute error is small.
+#
+# python3 bench_iv_tables.py                 report
+# python3 bench_iv_tables.py --points 100000
+# python3 bench_iv_tables.py --check         fail when an error exceeds its bound
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from device_library import default_library
+from iv_tables import VDS_MIN, VOV_MIN, bjt_table, fet_table
+from nodal_solver import VT, Bjt, hi_low_switch_circuit, saturation_current, square_law
+from switch_bias_functions import calculate_theoretical_load_resistor
+from topologies import driver_resistors
+
+
+def best_time(function, repeat=5):
+    """Returns (best seconds of one call, result)"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _relative_error(actual, expected):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error = np.abs(actual - expected) / np.abs(expected)
+    return float(np.nanmax(np.where(expected == 0, np.abs(actual), error)))
+
+
+def benchmark_cases(points, seed=0):
+    """
+    Returns [(name, analytic, table, error(analytic result, table result),
+    bound or None)], analytic and table are called without arguments
+    """
+    rng = np.random.default_rng(seed)
+    library = default_library()
+    Q1 = library.fet("dmc3016lsd", "P")
+    Q2 = library.fet("dmc3016lsd", "N")
+    Q3 = library.bjt("bc848b")
+    table_q1, table_q2, table_q3 = fet_table(Q1), fet_table(Q2), bjt_table(Q3)
+
+    Vov = np.exp(rng.uniform(np.log(VOV_MIN), np.log(abs(Q2.Vgs_max)), points))
+    Vds = np.exp(rng.uniform(np.log(VDS_MIN), np.log(30), points))
+    near_vth = VOV_MIN * np.exp(rng.uniform(0, np.log(50), points))
+
+    Is = saturation_current(Q3.Vbe_sat, 1e-3)
+    bjt = Bjt("Q", "c", "b", "e", Is, Q3.beta)
+    Vbe, Vce = rng.uniform(0.3, 0.8, points), rng.uniform(1, 30, points)
+    # Largest relative error of exp(Vbe / Vt) interpolated linearly over a step of a = h / Vt
+    a = (table_q3.x.stop - table_q3.x.start) / (table_q3.x.n - 1) / VT
+    t = 1 / a - 1 / np.expm1(a)
+    bjt_error = (1 - t + t * np.exp(a)) * np.exp(-t * a) - 1
+    V = np.stack([Vce, Vbe, np.zeros(points)], axis=1)
+
+    # hi_low_switch_bias.py design over a spread of supply and drive
+    driver = driver_resistors(Q3, drive_voltage=5, base_current=0.01e-3, collector_current=0.1e-3,
+                              design_vcc=14.7, desired_vce=Q3.Vce_sat)
+    Rload = calculate_theoretical_load_resistor(power=12.5, I=2.5)
+    Vsc = rng.uniform(5, 15, points)
+    Vsig = rng.uniform(3, 5, points)
+    nodal = max(points // 100, 1)
+
+    def circuit(tables):
+        return hi_low_switch_circuit(Vsig[:nodal], Vsc[:nodal], driver.Rb, driver.R1, Rload, Q1, Q2, Q3,
+                                     tables=tables).solve(strict=True).current("Rload")
+
+    def id_error(analytic, table):
+        return _relative_error(table[0], analytic[0])
+
+    return [
+        ("fet Id, gm, gds", lambda: square_law(Vov, Vds, Q2.K, Q2.lam),
+         lambda: table_q2.evaluate(Vov, Vds, Q2.K), id_error, table_q2.error_bound),
+        ("fet Id, gm, gds near Vth", lambda: square_law(near_vth, Vds, Q2.K, Q2.lam),
+         lambda: table_q2.evaluate(near_vth, Vds, Q2.K), id_error, table_q2.error_bound),
+        ("bjt Ic, Ib", lambda: bjt.evaluate(V, (0, 1, 2)),
+         lambda: table_q3.evaluate(Vbe, Vce), lambda a, t: _relative_error(t[0][0], a[0]), bjt_error),
+        ("hi_low_switch_circuit x{0}".format(nodal), lambda: circuit((None, None, None)),
+         lambda: circuit((table_q1, table_q2, table_q3)), _relative_error, None),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the I-V tables against the analytic models")
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="fail when an error exceeds its bound")
+    args = parser.parse_args()
+
+    failed = []
+    print("{0:28s} {1:>12s} {2:>12s} {3:>8s} {4:>10s} {5:>8s}".format(
+        "Benchmark", "analytic ms", "table ms", "speedup", "max error", "bound"))
+    for name, analytic, table, error, bound in benchmark_cases(args.points, args.seed):
+        analytic_seconds, expected = best_time(analytic)
+        table_seconds, actual = best_time(table)
+        relative = error(expected, actual)
+        if bound is not None and relative > bound:
+            failed.append(name)
+        print("{0:28s} {1:>12.1f} {2:>12.1f} {3:>7.2f}x {4:>10.3%} {5:>8s}".format(
+            name, analytic_seconds * 1e3, table_seconds * 1e3, analytic_seconds / table_seconds, relative,
+            "" if bound is None else "{0:.2%}".format(bound)))
+
+    if args.check:
+        for name in failed:
+            print("OUT OF BOUND {0}".format(name))
+        print("Tables: {0}".format("FAILED" if failed else "OK"))
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
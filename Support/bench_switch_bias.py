@@ -0,0 +1,207 @@
+#!/usr/bin/python3
+# Benchmarks and correctness fixtures for the switch_bias_functions hot paths
+#
+# Inputs are taken from the bias scripts (DMC3016LSD, DMP3028LSD, NTR1P02,
+# 2.5A load at 5/12/14.7V). Besides per-call latency the full bias scripts
+# are timed as subprocesses.
+#
+# python3 bench_switch_bias.py                          report only
+# python3 bench_switch_bias.py --save baseline.json     store a baseline
+# python3 bench_switch_bias.py --compare baseline.json  fail on regressions
+# python3 bench_switch_bias.py --check                  verify the fixtures
+# python3 bench_switch_bias.py --update-fixtures        re-pin the fixtures
+# python3 bench_switch_bias.py --check --solver sympy   cross-check SymPy
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import timeit
+
+from device_library import default_library
+from switch_bias_functions import (SOLVERS, calculate_nfet_vsaturation, calculate_pfet_vsaturation,
+                                   calculate_triode_vds, get_common_resistor_value, nfet_calculate,
+                                   npn_calculate, pfet_calculate, set_solver, toSI)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, "bench_fixtures.json")
+
+SCRIPTS = ["hi_switch_bias.py", "hi_low_switch_bias.py", "hi-low_inverted_switch_bias.py",
+           "standard_values_voltage_divider.py", "uart-pick.py"]
+
+# Stored as "_comment" of the fixture file
+FIXTURE_NOTE = ("Script outputs are pinned as printed since divider_synthesis: "
+                "standard_values_voltage_divider.py and uart-pick.py list the same divider "
+                "matches as the original scan, ordered by error instead of by R2, so their "
+                "#n numbering differs from the original scripts. The switch bias scripts "
+                "are unchanged.")
+
+# 12.5W / 2.5A load of the bias scripts
+LOAD_CURRENT = 2.5
+RLOAD = 2.0
+
+
+def benchmark_cases():
+    """
+    Returns [(name, function, kwargs)] with representative fixed inputs
+    """
+    library = default_library()
+    dmc3016_p = library.fet("dmc3016lsd", "P")
+    dmc3016_n = library.fet("dmc3016lsd", "N")
+    dmp3028 = library.fet("dmp3028lsd")
+    ntr1p02 = library.fet("ntr1p02")
+    bc848b = library.bjt("bc848b")
+
+    cases = []
+    for Vsc in (5, 12, 14.7):
+        cases += [
+            ("npn_calculate@{0}V".format(Vsc), npn_calculate,
+             dict(Vbe=bc848b.Vbe_sat, Vce_sat=bc848b.Vce_sat, beta=bc848b.beta, Vcc=Vsc,
+                  Vbb=5, Rb=390e3, Rc=120e3, Re=0)),
+            ("pfet_calculate@{0}V".format(Vsc), pfet_calculate,
+             dict(Vgs=bc848b.Vce_sat - Vsc, Vth=dmc3016_p.Vth, K=dmc3016_p.K,
+                  Isd=LOAD_CURRENT, Vss=Vsc, Rd=RLOAD)),
+            ("nfet_calculate@{0}V".format(Vsc), nfet_calculate,
+             dict(Vgs=5, Vth=dmc3016_n.Vth, K=dmc3016_n.K, Ids=LOAD_CURRENT, Vdd=Vsc, Rd=RLOAD)),
+            ("calculate_pfet_vsaturation@{0}V".format(Vsc), calculate_pfet_vsaturation,
+             dict(Vth=dmp3028.Vth, K=dmp3028.K, Rload=RLOAD, Vss=Vsc)),
+            ("calculate_nfet_vsaturation@{0}V".format(Vsc), calculate_nfet_vsaturation,
+             dict(Vth=dmc3016_n.Vth, K=dmc3016_n.K, Rload=RLOAD, Vdd=Vsc)),
+        ]
+    cases += [
+        ("calculate_triode_vds", calculate_triode_vds,
+         dict(Vgs=bc848b.Vce_sat - 14.7, Vth=ntr1p02.Vth, K=ntr1p02.K, Id=0.1225e-3)),
+        ("get_common_resistor_value", get_common_resistor_value, dict(Rx=430000)),
+        ("toSI", toSI, dict(d=0.1225e-3, unit="A")),
+    ]
+    return cases
+
+
+def time_call(function, kwargs, min_time=0.2):
+    """Returns best seconds per call over several timeit repeats"""
+    timer = timeit.Timer(lambda: function(**kwargs))
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def run_script(script):
+    """Returns (seconds, stdout) of one bias script run"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, script], cwd=HERE, capture_output=True,
+                          text=True, check=True)
+    return time.perf_counter() - start, proc.stdout
+
+
+def time_script(script, repeat=3):
+    return min(run_script(script)[0] for _ in range(repeat))
+
+
+def _to_json(value):
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, complex):
+        return {"real": value.real, "imag": value.imag}
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    # e.g. SymPy Float from the reference solver
+    return float(value)
+
+
+def _close(expected, actual, rel_tol=1e-9, abs_tol=1e-12):
+    if isinstance(expected, list):
+        return (isinstance(actual, list) and len(expected) == len(actual) and
+                all(_close(e, a, rel_tol, abs_tol) for e, a in zip(expected, actual)))
+    if isinstance(expected, dict):
+        return (isinstance(actual, dict) and
+                all(_close(expected[k], actual.get(k), rel_tol, abs_tol) for k in expected))
+    if isinstance(expected, float) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, rel_tol=rel_tol, abs_tol=abs_tol)
+    return expected == actual
+
+
+def current_outputs():
+    outputs = {"functions": {}, "scripts": {}}
+    for name, function, kwargs in benchmark_cases():
+        outputs["functions"][name] = _to_json(function(**kwargs))
+    for script in SCRIPTS:
+        outputs["scripts"][script] = run_script(script)[1]
+    return outputs
+
+
+def check_fixtures(path=FIXTURES):
+    """Returns list of fixture names whose output changed"""
+    with open(path) as f:
+        expected = json.load(f)
+    actual = current_outputs()
+    failed = []
+    for group in ("functions", "scripts"):
+        for name, value in expected[group].items():
+            if not _close(value, actual[group].get(name)):
+                failed.append(name)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the switch bias hot paths")
+    parser.add_argument("--save", metavar="JSON", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--no-scripts", action="store_true", help="skip the full script runs")
+    parser.add_argument("--check", action="store_true", help="verify outputs against the fixtures")
+    parser.add_argument("--update-fixtures", action="store_true", help="re-pin the fixture outputs")
+    parser.add_argument("--solver", choices=SOLVERS, default="numeric",
+                        help="FET solver backend for the function benchmarks")
+    args = parser.parse_args()
+    set_solver(args.solver)
+
+    if args.update_fixtures:
+        with open(FIXTURES, "w") as f:
+            json.dump(dict(current_outputs(), _comment=FIXTURE_NOTE), f, indent=1, sort_keys=True)
+            f.write("\n")
+        print("Fixtures written to {0}".format(FIXTURES))
+        return 0
+
+    if args.check:
+        failed = check_fixtures()
+        for name in failed:
+            print("MISMATCH {0}".format(name))
+        print("Fixtures: {0}".format("FAILED" if failed else "OK"))
+        return 1 if failed else 0
+
+    results = {}
+    print("{0:36s} {1:>12s} {2:>14s}".format("Benchmark", "us/call", "calls/s"))
+    for name, function, kwargs in benchmark_cases():
+        seconds = time_call(function, kwargs)
+        results[name] = seconds
+        print("{0:36s} {1:>12.3f} {2:>14,.0f}".format(name, seconds * 1e6, 1 / seconds))
+    if not args.no_scripts:
+        for script in SCRIPTS:
+            seconds = time_script(script)
+            results[script] = seconds
+            print("{0:36s} {1:>12.0f} {2:>14.2f}".format(script, seconds * 1e6, 1 / seconds))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=1, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, seconds in results.items():
+            if name in baseline and seconds > baseline[name] * (1 + args.threshold):
+                regressions.append(name)
+                print("REGRESSION {0}: {1:.3g}s vs baseline {2:.3g}s (+{3:.0%})".format(
+                    name, seconds, baseline[name], seconds / baseline[name] - 1))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/python3
+# Streaming reader and index of the Altium BOM documents (*.BomDoc)
+#
+# python3 bom_doc.py                                  # lines of every board BOM
+# python3 bom_doc.py mainboard --kind resistor --footprint RES-1206_M
+# python3 bom_doc.py mainboard --channel hi-low-switch --vsc 14.7
+# python3 bom_doc.py --check                          # series / library / design checks
+#
+# index = BomIndex.read(BOM_FILES["mainboard"])
+# index.find(kind="resistor", value=4.7e3)
+# index.channel("hi-low-switch", 14.7)        # {"Rb": [BomLine], "R1": [BomLine]}
+#
+# A BomDoc is ISO-8859-1 text with one record per line, |RECORD=<type>|KEY=
+# VALUE|... in file order: options, then every BOM line as a CatalogItem
+# followed by its ManufacturerLink and PartChoice (supplier offer) records,
+# then the Item records of manual lines. Lines are read one at a time, only
+# the record types needed are split into fields, and each BOM line becomes
+# a BomLine record. The thousands of PartChoice records are skipped on the
+# record type prefix without being parsed.
+#
+# Automatic lines carry no designators (Altium takes them from the project),
+# only manual place holders have Item records with DESIGNATOR. Which lines
+# belong to a switch channel is therefore found by value: the design values
+# of the topology at the channel's supply voltage (topologies.py) looked up
+# in the value index.
+from collections import namedtuple
+import argparse
+import csv
+import os
+import re
+
+from component_values import CAPACITORS, RESISTORS
+from device_library import DATA_DIR, default_library
+from switch_bias_functions import fromSI, toSI
+from topologies import TOPOLOGIES
+
+REPO_DIR = os.path.dirname(DATA_DIR)
+
+BOM_FILES = {
+    "mainboard": os.path.join(REPO_DIR, "Project_Mainboard", "PCB3.BomDoc"),
+    "connector": os.path.join(REPO_DIR, "Project_ConnectorBoard", "PCB1.BomDoc"),
+    "multiboard": os.path.join(REPO_DIR, "Project_Multiboard", "Multiboard_DataLogger.BomDoc"),
+}
+
+ENCODING = "iso-8859-1"
+
+# Record types turned into records, everything else is skipped unparsed
+RECORD_TYPES = ("BOM", "CatalogItem", "ManufacturerLink", "Item")
+
+# Smallest series first, the first one containing a value is reported
+SERIES_ORDER = ("E6", "E12", "E24", "E48", "E96", "E192")
+
+# Topologies of channel_design
+SWITCH_TOPOLOGIES = ("hi-switch", "hi-low-switch", "hi-low-inverted")
+
+BomHeader = namedtuple("BomHeader", ["kind", "date", "time", "currency", "quantity"])
+
+# kind: resistor, capacitor, fet, bjt or other; value: float of the comment
+# for resistors and capacitors (None if not a number, e.g. N/C);
+# manufacturers: ((manufacturer, part number), ...)
+BomLine = namedtuple("BomLine", ["uid", "item_type", "item", "description", "comment", "value",
+                                 "footprint", "status", "kind", "manufacturers"])
+
+Placement = namedtuple("Placement", ["uid", "designator", "quantity"])
+
+# severity: error or warning
+Finding = namedtuple("Finding", ["severity", "line", "message"])
+
+_FIELD = re.compile(r"\|(?=[A-Z][A-Z0-9_]*=)")
+
+
+def _fields(line):
+    """Returns {KEY: value} of a record line, values may contain '|'"""
+    fields = {}
+    for field in _FIELD.split(line.rstrip("\r\n"))[1:]:
+        key, _, value = field.partition("=")
+        fields[key] = value
+    return fields
+
+
+def iter_records(path, types=RECORD_TYPES):
+    """
+    Yields (record type, {KEY: value}) of the records of the given types,
+    line by line. Other records are skipped without splitting them.
+    """
+    prefixes = tuple("|RECORD={0}|".format(name) for name in types)
+    with open(path, encoding=ENCODING, newline="") as f:
+        for line in f:
+            if line.startswith(prefixes):
+                fields = _fields(line)
+                yield fields.pop("RECORD"), fields
+
+
+def _parameters(text):
+    """Returns {name: value} of COMPONENTPARAMETERS (quoted CSV of name=value)"""
+    parameters = {}
+    for item in next(csv.reader([text]), []):
+        name, _, value = item.partition("=")
+        parameters[name] = value
+    return parameters
+
+
+def _library_kind(part, library):
+    if not part:
+        return None
+    try:
+        library.channels(part)
+        return "fet"
+    except KeyError:
+        pass
+    try:
+        library.bjt(part)
+        return "bjt"
+    except KeyError:
+        return None
+
+
+def _line(fields, manufacturers, library):
+    parameters = _parameters(fields.get("COMPONENTPARAMETERS", ""))
+    item = fields.get("DESIGNITEMID", "")
+    description = fields.get("DESCRIPTION", "")
+    comment = fields.get("USERCOMMENTS", "") or parameters.get("Comment", "")
+    kind = None
+    if description.lower().startswith("resistor") or item.lower().startswith("res"):
+        kind, unit = "resistor", "Ohm"
+    elif description.lower().startswith("capacitor") or item.lower().startswith("cap"):
+        kind, unit = "capacitor", "F"
+    value = None
+    if kind is not None:
+        try:
+            value = fromSI(parameters.get("Value") or comment, unit)
+        except ValueError:
+            pass
+    else:
+        kind = _library_kind(comment, library) or _library_kind(item, library) or "other"
+    return BomLine(fields.get("UNIQUEID", ""), fields.get("ITEMTYPE", ""), item, description, comment,
+                   value, parameters.get("Footprint", ""), fields.get("STATUS", ""), kind,
+                   tuple(manufacturers))
+
+
+def read_bom(path, library=None):
+    """
+    Yields the BomHeader, every BomLine (with its manufacturer links) and
+    every Placement of a BomDoc in file order
+    """
+    library = default_library() if library is None else library
+    catalog_item = None
+    manufacturers = []
+    for record, fields in iter_records(path):
+        if record == "ManufacturerLink":
+            manufacturers.append((fields.get("MANUFACTURER", ""), fields.get("MPN", "")))
+            continue
+        if catalog_item is not None:
+            yield _line(catalog_item, manufacturers, library)
+            catalog_item = None
+        if record == "CatalogItem":
+            catalog_item, manufacturers = fields, []
+        elif record == "Item":
+            yield Placement(fields.get("UNIQUEID", ""), fields.get("DESIGNATOR", ""),
+                            int(fields.get("QUANTITY") or 1))
+        elif record == "BOM":
+            yield BomHeader(fields.get("KIND", ""), fields.get("DATE", ""), fields.get("TIME", ""),
+                            fields.get("CURRENCY", ""), int(fields.get("PRODUCTIONQUANTITY") or 1))
+    if catalog_item is not None:
+        yield _line(catalog_item, manufacturers, library)
+
+
+def _value_key(value):
+    return float("{0:.6g}".format(value))
+
+
+def standard_series(value, kind):
+    """Returns the smallest E-series containing value, None if none does"""
+    indexes = RESISTORS if kind == "resistor" else CAPACITORS
+    for name in SERIES_ORDER:
+        nearest = indexes[name].nearest(value)
+        if abs(nearest - value) <= 1e-9 * value:
+            return name
+    return None
+
+
+class BomIndex:
+    """
+    BOM lines of one BomDoc indexed by designator, (kind, value) and
+    footprint. Lists hold positions in lines, file order.
+    """
+    def __init__(self, lines, placements=(), header=None, path=None):
+        self.path = path
+        self.header = header
+        self.lines = list(lines)
+        self.placements = list(placements)
+        self.by_uid = {}
+        self.by_value = {}
+        self.by_footprint = {}
+        self.by_designator = {}
+        for i, line in enumerate(self.lines):
+            self.by_uid.setdefault(line.uid, []).append(i)
+            if line.value is not None:
+                self.by_value.setdefault((line.kind, _value_key(line.value)), []).append(i)
+            if line.footprint:
+                self.by_footprint.setdefault(line.footprint.upper(), []).append(i)
+        for placement in self.placements:
+            for i in self.by_uid.get(placement.uid, ()):
+                self.by_designator.setdefault(placement.designator.upper(), []).append(i)
+
+    @classmethod
+    def read(cls, path, library=None):
+        lines, placements, header = [], [], None
+        for record in read_bom(path, library):
+            if isinstance(record, BomLine):
+                lines.append(record)
+            elif isinstance(record, Placement):
+                placements.append(record)
+            else:
+                header = record
+        return cls(lines, placements, header, path)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def designators(self, line):
+        """Returns the designators of a BomLine (only manual lines have any)"""
+        return [p.designator for p in self.placements if p.uid == line.uid]
+
+    def find(self, kind=None, value=None, footprint=None, designator=None):
+        """
+        Returns the BomLines matching every criterion given, value in SI
+        units or as text ("4k7"), designator as a prefix ("P1" matches
+        "P1-20.1")
+        """
+        rows = None
+        if value is not None:
+            value = fromSI(value) if isinstance(value, str) else value
+            key = _value_key(value)
+            rows = [i for (k, v), found in self.by_value.items()
+                    if v == key and kind in (None, k) for i in found]
+        if footprint is not None:
+            found = self.by_footprint.get(footprint.upper(), [])
+            rows = found if rows is None else [i for i in rows if i in found]
+        if designator is not None:
+            prefix = designator.upper()
+            found = {i for name, positions in self.by_designator.items()
+                     if name.startswith(prefix) for i in positions}
+            rows = sorted(found) if rows is None else [i for i in rows if i in found]
+        if rows is None:
+            rows = range(len(self.lines))
+        return [self.lines[i] for i in sorted(set(rows)) if kind is None or self.lines[i].kind == kind]
+
+    def channel(self, topology, Vsc, **params):
+        """
+        Returns {design value name: [BomLine]} of the resistors of a switch
+        topology designed for the supply Vsc, e.g. channel("hi-low-switch",
+        14.7). An empty list is a design value missing from the BOM.
+        """
+        return {name: self.find(kind="resistor", value=value)
+                for name, value in channel_design(topology, Vsc, **params).items()}
+
+    def check(self, library=None, designs=()):
+        """
+        Returns the Findings of the BOM: resistor and capacitor values
+        outside the E-series (or not numbers), semiconductors not in the
+        device library, and the design values of designs (topology, Vsc)
+        that no line has (skipped for boards without resistors)
+        """
+        library = default_library() if library is None else library
+        findings = []
+        for line in self.lines:
+            if line.kind in ("resistor", "capacitor"):
+                if line.value is None:
+                    findings.append(Finding("warning", line, "no value '{0}'".format(line.comment)))
+                elif standard_series(line.value, line.kind) is None:
+                    findings.append(Finding("error", line, "{0} is not an E-series value".format(
+                        line.comment)))
+            elif line.kind == "other" and re.search(r"mosfet|transistor", line.description, re.I):
+                findings.append(Finding("warning", line, "{0} is not in the device library".format(
+                    line.comment or line.item)))
+        if not any(line.kind == "resistor" for line in self.lines):
+            designs = ()
+        for topology, Vsc in designs:
+            for name, lines in self.channel(topology, Vsc).items():
+                if not lines:
+                    value = channel_design(topology, Vsc)[name]
+                    findings.append(Finding("error", None, "{0} {1}V: {2}={3} has no BOM line".format(
+                        topology, Vsc, name, toSI(value))))
+        return findings
+
+
+def channel_design(topology, Vsc, **params):
+    """
+    Returns {name: Ohm} of the resistors of a switch topology designed for
+    the supply Vsc (design_vcc), the load resistance excluded
+
+    Raises
+    ------
+    KeyError
+        If topology is not in topologies.TOPOLOGIES
+    """
+    params.setdefault("design_vcc", Vsc)
+    params.setdefault("Vsc", (Vsc,))
+    design = TOPOLOGIES[topology](**params).design
+    return {name: value for name, value in design.items()
+            if name.startswith("R") and name != "Rload"}
+
+
+def _line_text(index, line):
+    value = toSI(line.value) if line.value is not None else ""
+    designators = ",".join(index.designators(line))
+    return "{0:9s} {1:24.24s} {2:>8s} {3:34.34s} {4}".format(
+        line.kind, line.comment or line.item, value, line.footprint, designators)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read and check the Altium BomDoc files")
+    parser.add_argument("boards", nargs="*", help="{0} or BomDoc paths, default all".format(
+        ", ".join(BOM_FILES)))
+    parser.add_argument("--kind", choices=("resistor", "capacitor", "fet", "bjt", "other"))
+    parser.add_argument("--value", help="component value, e.g. 4k7 or 100n")
+    parser.add_argument("--footprint")
+    parser.add_argument("--designator", help="designator prefix")
+    parser.add_argument("--channel", choices=SWITCH_TOPOLOGIES, help="resistors of a switch topology design")
+    parser.add_argument("--vsc", type=float, default=14.7, help="supply voltage of --channel")
+    parser.add_argument("--check", action="store_true",
+                        help="check values, library parts and the --channel design")
+    args = parser.parse_args()
+
+    library = default_library()
+    designs = [(args.channel, args.vsc)] if args.channel else []
+    for board in args.boards or list(BOM_FILES):
+        index = BomIndex.read(BOM_FILES.get(board, board), library)
+        header = index.header
+        print("{0}: {1} lines, {2} placements{3}".format(
+            board, len(index), len(index.placements),
+            ", {0} {1}".format(header.date, header.time) if header else ""))
+        if args.check:
+            for finding in index.check(library, designs):
+                name = (finding.line.comment or finding.line.item) if finding.line else ""
+                print("  {0:7s} {1:24.24s} {2}".format(finding.severity, name, finding.message))
+        elif args.channel:
+            for name, lines in index.channel(args.channel, args.vsc).items():
+                print("  {0}:".format(name))
+                for line in lines:
+                    print("    " + _line_text(index, line))
+        else:
+            for line in index.find(args.kind, args.value, args.footprint, args.designator):
+                print("  " + _line_text(index, line))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+# Standard component values (IEC 60063 E-series) and sorted lookup indexes
+from bisect import bisect_left, bisect_right
+
+E6 = (10, 15, 22, 33, 47, 68)
+E12 = (10, 12, 15, 18, 22, 27, 33, 39, 47, 56, 68, 82)
+E24 = (10, 11, 12, 13, 15, 16, 18, 20, 22, 24, 27, 30, 33, 36, 39, 43, 47, 51,
+       56, 62, 68, 75, 82, 91)
+E192 = (100, 101, 102, 104, 105, 106, 107, 109, 110, 111, 113, 114, 115, 117,
+        118, 120, 121, 123, 124, 126, 127, 129, 130, 132, 133, 135, 137, 138,
+        140, 142, 143, 145, 147, 149, 150, 152, 154, 156, 158, 160, 162, 164,
+        165, 167, 169, 172, 174, 176, 178, 180, 182, 184, 187, 189, 191, 193,
+        196, 198, 200, 203, 205, 208, 210, 213, 215, 218, 221, 223, 226, 229,
+        232, 234, 237, 240, 243, 246, 249, 252, 255, 258, 261, 264, 267, 271,
+        274, 277, 280, 284, 287, 291, 294, 298, 301, 305, 309, 312, 316, 320,
+        324, 328, 332, 336, 340, 344, 348, 352, 357, 361, 365, 370, 374, 379,
+        383, 388, 392, 397, 402, 407, 412, 417, 422, 427, 432, 437, 442, 448,
+        453, 459, 464, 470, 475, 481, 487, 493, 499, 505, 511, 517, 523, 530,
+        536, 542, 549, 556, 562, 569, 576, 583, 590, 597, 604, 612, 619, 626,
+        634, 642, 649, 657, 665, 673, 681, 690, 698, 706, 715, 723, 732, 741,
+        750, 759, 768, 777, 787, 796, 806, 816, 825, 835, 845, 856, 866, 876,
+        887, 898, 909, 920, 931, 942, 953, 965, 976, 988)
+E96 = E192[::2]
+E48 = E192[::4]
+
+E_SERIES = {"E6": E6, "E12": E12, "E24": E24, "E48": E48, "E96": E96, "E192": E192}
+
+# Decade exponents covered by the indexes, 1 Ohm - 9.88 MOhm and 1 pF - 9.88 mF
+RESISTOR_DECADES = (0, 6)
+CAPACITOR_DECADES = (-12, -3)
+
+# Values kept in stock (preferred subset)
+STOCK_RESISTORS = [10, 12, 15, 18, 22, 27, 33, 39, 47, 56, 100, 120, 150, 180,\
+                   220, 270, 330, 390, 470, 560, 680, 820, 1e3, 1.2e3, 1.5e3,\
+                   1.8e3, 2.2e3, 2.7e3, 3.3e3, 3.9e3, 4.7e3, 5.6e3, 6.8e3,\
+                   8.2e3, 10e3, 12e3, 15e3, 18e3, 22e3, 27e3, 33e3, 39e3, 47e3,\
+                   56e3, 68e3, 82e3, 100e3, 120e3, 150e3, 180e3, 220e3, 270e3,\
+                   330e3, 390e3, 470e3, 510e3, 560e3, 620e3, 680e3, 820e3, 1e6]
+
+STOCK_CAPACITORS = [1e-12, 2.2e-12, 3.3e-12, 3.9e-12, 4.7e-12, 5.6e-12, 6.8e-12,\
+                    8.2e-12, 10e-12, 15e-12, 22e-12, 27e-12, 33e-12, 39e-12, 47e-12,\
+                    56e-12, 82e-12, 100e-12, 150e-12, 180e-12, 220e-12, 330e-12,\
+                    470e-12, 680e-12, 820e-12, 1e-9, 1.5e-9, 1.8e-9, 2.2e-9, 2.7e-9,\
+                    3.3e-9, 3.9e-9, 4.7e-9, 5.6e-9, 6.8e-9, 8.2e-9, 10e-9, 15e-9,\
+                    22e-9, 33e-9, 39e-9, 47e-9, 56e-9, 68e-9, 0.1e-6, 0.22e-6,\
+                    0.33e-6, 0.47e-6, 0.68e-6, 1e-6, 2.2e-6, 3.3e-6, 4.7e-6, 10e-6,\
+                    22e-6, 33e-6, 47e-6, 100e-6, 220e-6, 470e-6]
+
+
+def series_values(series, decade_min, decade_max):
+    """
+    Returns the sorted values of an E-series (name or mantissa tuple)
+    for every decade 10**decade_min ... 10**decade_max
+    """
+    if isinstance(series, str):
+        series = E_SERIES[series.upper()]
+    values = []
+    for decade in range(decade_min, decade_max + 1):
+        for mantissa in series:
+            # Exact integer arithmetic so 47 -> 4.7e-12 matches the literal
+            exponent = decade - (len(str(mantissa)) - 1)
+            if exponent >= 0:
+                values.append(mantissa * 10**exponent)
+            else:
+                values.append(mantissa / 10**-exponent)
+    return values
+
+
+class ComponentIndex:
+    """
+    Sorted, de-duplicated set of component values with O(log n) queries.
+    Distances are relative (ratio), which is how E-series values are spaced.
+    """
+    __slots__ = ("values", "_array")
+
+    def __init__(self, values):
+        self.values = tuple(sorted(set(values)))
+        self._array = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __contains__(self, value):
+        index = bisect_left(self.values, value)
+        return index < len(self.values) and self.values[index] == value
+
+    def floor(self, x):
+        """Returns largest value <= x, None if x is below the index"""
+        index = bisect_right(self.values, x)
+        return self.values[index - 1] if index > 0 else None
+
+    def ceil(self, x):
+        """Returns smallest value >= x, None if x is above the index"""
+        index = bisect_left(self.values, x)
+        return self.values[index] if index < len(self.values) else None
+
+    def nearest(self, x):
+        """Returns value with the smallest ratio error to x"""
+        return self.k_nearest(x, 1)[0]
+
+    def k_nearest(self, x, k):
+        """
+        Returns the k values closest to x by ratio error, closest first
+
+        Raises
+        ------
+        ValueError
+            If x is non-positive
+        """
+        if x <= 0:
+            raise ValueError("Component value must be positive")
+        values = self.values
+        hi = bisect_left(values, x)
+        lo = hi - 1
+        result = []
+        while len(result) < k and (lo >= 0 or hi < len(values)):
+            if hi >= len(values) or (lo >= 0 and x / values[lo] <= values[hi] / x):
+                result.append(values[lo])
+                lo -= 1
+            else:
+                result.append(values[hi])
+                hi += 1
+        return result
+
+    def snap(self, x, mode="nearest"):
+        """
+        Vectorized floor/ceil/nearest over a NumPy array of ideal values.
+        Values outside the index are clamped to the first/last value.
+        """
+        import numpy as np
+
+        if self._array is None:
+            self._array = np.array(self.values, dtype=float)
+        values = self._array
+        x = np.asarray(x, dtype=float)
+
+        hi = np.clip(np.searchsorted(values, x, side="left"), 0, len(values) - 1)
+        lo = np.clip(np.searchsorted(values, x, side="right") - 1, 0, len(values) - 1)
+        if mode == "floor":
+            return values[lo]
+        if mode == "ceil":
+            return values[hi]
+        if mode != "nearest":
+            raise ValueError("Unknown snap mode '{0}'".format(mode))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            use_lo = (x / values[lo]) <= (values[hi] / x)
+        return np.where(use_lo, values[lo], values[hi])
+
+
+# Preloaded indexes, "stock" holds the preferred subset
+RESISTORS = {name: ComponentIndex(series_values(name, *RESISTOR_DECADES)) for name in E_SERIES}
+RESISTORS["stock"] = ComponentIndex(STOCK_RESISTORS)
+
+CAPACITORS = {name: ComponentIndex(series_values(name, *CAPACITOR_DECADES)) for name in E_SERIES}
+CAPACITORS["stock"] = ComponentIndex(STOCK_CAPACITORS)
@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+# Worst-case corner analysis of the high/low switch (hi_low_switch_bias.py)
+#
+# Every parameter keeps its min/typ/max levels instead of the midpoint the
+# bias scripts use. The 3^n corners are searched by branch and bound on the
+# interval bounds of switch_bias_intervals.py: a box fixes some parameters
+# to a level and leaves the others free over [min, max]. The bound of a box
+# encloses the metric of every corner in it, a box is pruned only when its
+# bound is not worse than the worst corner found so far by more than
+# PRUNE_RTOL, far above the rounding of the bounds; the others are split
+# into the three levels of one free parameter until they are single
+# corners, which are evaluated on the array engine. The worst corner is
+# therefore proven, not sampled, and takes a few hundred corners instead of
+# 3^12 for the twelve parameters of the switch. Without bounds
+# (--exhaustive, or iv_tables of parts with channel-length modulation,
+# which have no interval form) every corner is evaluated in one batch.
+# Corners where the switch cannot reach its operating point (NaN) count as
+# the worst, so a NaN worst case is a failure, not a margin.
+from collections import namedtuple
+from itertools import product
+import argparse
+
+import numpy as np
+
+from device_library import default_library
+from switch_bias_arrays import hi_low_switch_array
+from switch_bias_functions import calculate_theoretical_load_resistor, toSI
+from switch_bias_intervals import Interval, hi_low_switch_interval
+from topologies import driver_resistors
+
+LEVELS = ("min", "typ", "max")
+
+# Boxes are pruned unless their bound is worse than the worst corner found
+# by more than PRUNE_RTOL (relative), the result is within it of the worst
+PRUNE_RTOL = 1e-9
+
+Parameter = namedtuple("Parameter", ["name", "min", "typ", "max"])
+
+# corner: {parameter: (level, value)}, value: NaN if the corner fails to
+# reach the operating point, evaluations: corners evaluated, boxes: boxes
+# bounded (0 when every corner was enumerated)
+WorstCase = namedtuple("WorstCase", ["metric", "value", "corner", "evaluations", "boxes"])
+
+# Metric: "max" or "min" is the worse direction
+HI_LOW_METRICS = {"load_current": "min", "drop": "max", "P_q1": "max", "P_q2": "max", "P_q3": "max"}
+
+
+def tolerance(name, nominal, tol):
+    """Returns a Parameter of nominal -+ tol (relative)"""
+    return Parameter(name, nominal * (1 - tol), nominal, nominal * (1 + tol))
+
+
+def _typ(typ, lo, hi):
+    return typ if typ == typ else (lo + hi) / 2
+
+
+def hi_low_parameters(Q1, Q2, Q3, Rb, R1, Rload, Vsc=14.7, Vsig=5, resistor_tolerance=0.05,
+                      supply_tolerance=0.05, drive_tolerance=0.05, K_tolerance=0.2,
+                      Vbe_tolerance=0.1, Vce_tolerance=0.5):
+    """
+    Returns the Parameters of the high/low switch. Vth and beta levels come
+    from the device library, the other spreads are the relative tolerances
+    given (the library has no min/max for K, Vbe_sat and Vce_sat).
+    """
+    return [
+        Parameter("Vth_q1", Q1.Vth_min, _typ(Q1.Vth_typ, Q1.Vth_min, Q1.Vth_max), Q1.Vth_max),
+        tolerance("K_q1", Q1.K, K_tolerance),
+        Parameter("Vth_q2", Q2.Vth_min, _typ(Q2.Vth_typ, Q2.Vth_min, Q2.Vth_max), Q2.Vth_max),
+        tolerance("K_q2", Q2.K, K_tolerance),
+        Parameter("beta", Q3.beta_min, Q3.beta, Q3.beta_max),
+        tolerance("Vbe_sat", Q3.Vbe_sat, Vbe_tolerance),
+        tolerance("Vce_sat", Q3.Vce_sat, Vce_tolerance),
+        tolerance("Rb", Rb, resistor_tolerance),
+        tolerance("R1", R1, resistor_tolerance),
+        tolerance("Rload", Rload, resistor_tolerance),
+        tolerance("Vsc", Vsc, supply_tolerance),
+        tolerance("Vsig", Vsig, drive_tolerance),
+    ]
+
+
+def hi_low_metrics(load_current, active_load=False, tables=(None, None)):
+    """
+    Returns evaluate(values) -> {metric: array} of the switch in the
+    on-state, tables: iv_tables FetTable of (Q1, Q2) or None for the square
+    law. A table scales with the K corner, Vth is an offset of its overdrive.
+    """
+    def evaluate(values):
+        result = hi_low_switch_array(load_current=load_current, active_load=active_load,
+                                     table_q1=tables[0], table_q2=tables[1], **values)
+        return {"load_current": result["Id"],
+                "drop": values["Vsc"] - result["Vdrop"],
+                "P_q1": result["P_q1"],
+                "P_q2": result["P_q2"],
+                "P_q3": result["P_q3"]}
+    return evaluate
+
+
+def hi_low_bounds(load_current, active_load=False, tables=(None, None)):
+    """
+    Returns bounds(lo, hi) -> {metric: Interval} of the metrics of
+    hi_low_metrics over the box lo <= values <= hi, or None when a table
+    has channel-length modulation (the array engine then refines the
+    square law on the table, which has no interval form)
+    """
+    if any(table is not None and table.lam for table in tables):
+        return None
+
+    def bounds(lo, hi):
+        result = hi_low_switch_interval(load_current=load_current, active_load=active_load,
+                                        **{name: Interval(lo[name], hi[name]) for name in lo})
+        return {"load_current": result["Id"],
+                "drop": result["drop"],
+                "P_q1": result["P_q1"],
+                "P_q2": result["P_q2"],
+                "P_q3": result["P_q3"]}
+    return bounds
+
+
+class CornerSearch:
+    """
+    Evaluates corners given as (m, n) arrays of level indices 0/1/2, and
+    bounds boxes given the same way with -1 for a free parameter
+    """
+    def __init__(self, parameters, evaluate, bounds=None):
+        self.parameters = parameters
+        self.evaluate = evaluate
+        self.bounds = bounds
+        self.levels = np.array([[p.min, p.typ, p.max] for p in parameters], dtype=float)
+        self.evaluations = 0
+        self.boxes = 0
+
+    def __call__(self, corners, metric, sense):
+        """Returns the metric signed so that larger is worse, NaN as +inf"""
+        corners = np.asarray(corners)
+        values = {p.name: self.levels[i][corners[:, i]] for i, p in enumerate(self.parameters)}
+        self.evaluations += len(corners)
+        score = np.asarray(self.evaluate(values)[metric], dtype=float)
+        score = score if sense == "max" else -score
+        return np.where(np.isnan(score), np.inf, score)
+
+    def bound(self, boxes, metric, sense):
+        """Returns an upper bound of the signed metric over each box, +inf where NaN is possible"""
+        lo, hi = {}, {}
+        for i, p in enumerate(self.parameters):
+            level = boxes[:, i]
+            free = level < 0
+            lo[p.name] = np.where(free, self.levels[i].min(), self.levels[i][level])
+            hi[p.name] = np.where(free, self.levels[i].max(), self.levels[i][level])
+        self.boxes += len(boxes)
+        interval = self.bounds(lo, hi)[metric]
+        upper = interval.hi if sense == "max" else -interval.lo
+        return np.where(interval.nan, np.inf, upper)
+
+    def ascend(self, corner, metric, sense):
+        """
+        Returns (corner, score) of a local worst from single-parameter
+        changes, the first bound for the branch and bound
+        """
+        n = len(self.parameters)
+        best = self(corner[None], metric, sense)[0]
+        while best != np.inf:
+            moves = np.repeat(corner[None], 2 * n, axis=0)
+            for i in range(n):
+                moves[2 * i:2 * i + 2, i] = [level for level in range(3) if level != corner[i]]
+            score = self(moves, metric, sense)
+            if score.max() <= best:
+                break
+            corner, best = moves[int(np.argmax(score))], score.max()
+        return corner, best
+
+
+def _split(search, boxes, metric, sense):
+    """
+    Returns (children, bounds): every box split into the three levels of
+    the free parameter whose worst child bound is lowest
+    """
+    m, n = boxes.shape
+    children = np.repeat(boxes[:, None, None, :], 3, axis=2).repeat(n, axis=1)   # (m, n, 3, n)
+    for i in range(n):
+        children[:, i, :, i] = np.arange(3)
+    free = boxes < 0
+    upper = np.full((m, n, 3), np.inf)
+    upper[free] = search.bound(children[free].reshape(-1, n), metric, sense).reshape(-1, 3)
+    # A fixed parameter is never split, a free one with unbounded children may be
+    cost = np.where(free, np.minimum(upper.max(axis=2), np.finfo(float).max), np.inf)
+    split = np.argmin(cost, axis=1)
+    return children[np.arange(m), split].reshape(-1, n), upper[np.arange(m), split].ravel()
+
+
+def worst_case(parameters, evaluate, metric, sense, bounds=None, exhaustive=False):
+    """
+    Returns the WorstCase of one metric over the min/typ/max corners
+
+    sense: "max" when large values are worse, "min" when small ones are,
+    bounds: bounds(lo, hi) -> {metric: Interval} of the box, e.g.
+            hi_low_bounds(), None evaluates every corner
+    exhaustive: True evaluates every corner even with bounds
+    """
+    search = CornerSearch(parameters, evaluate, bounds)
+    n = len(parameters)
+    if bounds is None or exhaustive:
+        corners = np.array(list(product(range(3), repeat=n)))
+        score = search(corners, metric, sense)
+        best, best_score = corners[int(np.argmax(score))], score.max()
+    else:
+        best, best_score = search.ascend(np.ones(n, dtype=int), metric, sense)
+        boxes = np.full((1, n), -1)
+        upper = search.bound(boxes, metric, sense)
+        # Nothing is worse than a failing corner, boxes that may fail are kept
+        while len(boxes) and best_score != np.inf:
+            worse = upper - best_score > PRUNE_RTOL * np.maximum(np.abs(upper), abs(best_score))
+            boxes = boxes[worse | (upper == np.inf)]
+            corners = (boxes >= 0).all(axis=1)
+            if corners.any():
+                score = search(boxes[corners], metric, sense)
+                if score.max() > best_score:
+                    best, best_score = boxes[corners][int(np.argmax(score))], score.max()
+                boxes = boxes[~corners]
+            if len(boxes):
+                boxes, upper = _split(search, boxes, metric, sense)
+
+    if best_score == np.inf:
+        value = float("nan")
+    else:
+        value = best_score if sense == "max" else -best_score
+    corner = {p.name: (LEVELS[best[i]], search.levels[i][best[i]]) for i, p in enumerate(parameters)}
+    return WorstCase(metric, float(value), corner, search.evaluations, search.boxes)
+
+
+def analyze(parameters, evaluate, metrics=HI_LOW_METRICS, bounds=None, exhaustive=False):
+    """Returns {metric: WorstCase}"""
+    return {metric: worst_case(parameters, evaluate, metric, sense, bounds, exhaustive)
+            for metric, sense in metrics.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worst-case corners of the high/low switch")
+    parser.add_argument("--vsc", type=float, default=14.7)
+    parser.add_argument("--vsig", type=float, default=5)
+    parser.add_argument("--load-current", type=float, default=2.5)
+    parser.add_argument("--load-power", type=float, default=12.5)
+    parser.add_argument("--resistor-tolerance", type=float, default=0.05)
+    parser.add_argument("--supply-tolerance", type=float, default=0.05)
+    parser.add_argument("--drive-tolerance", type=float, default=0.05, help="relative tolerance of Vsig")
+    parser.add_argument("--k-tolerance", type=float, default=0.2)
+    parser.add_argument("--vbe-tolerance", type=float, default=0.1, help="relative tolerance of Vbe_sat")
+    parser.add_argument("--vce-tolerance", type=float, default=0.5, help="relative tolerance of Vce_sat")
+    parser.add_argument("--active-load", action="store_true")
+    parser.add_argument("--exhaustive", action="store_true",
+                        help="evaluate every corner instead of the branch and bound")
+    args = parser.parse_args()
+
+    library = default_library()
+    Q1 = library.fet("dmc3016lsd", "P")
+    Q2 = library.fet("dmc3016lsd", "N")
+    Q3 = library.bjt("bc848b")
+    driver = driver_resistors(Q3, drive_voltage=args.vsig, base_current=0.01e-3, collector_current=0.1e-3,
+                              design_vcc=args.vsc, desired_vce=Q3.Vce_sat)
+    Rload = calculate_theoretical_load_resistor(power=args.load_power, I=args.load_current)
+    parameters = hi_low_parameters(Q1, Q2, Q3, driver.Rb, driver.R1, Rload, args.vsc, args.vsig,
+                                   resistor_tolerance=args.resistor_tolerance,
+                                   supply_tolerance=args.supply_tolerance,
+                                   drive_tolerance=args.drive_tolerance, K_tolerance=args.k_tolerance,
+                                   Vbe_tolerance=args.vbe_tolerance, Vce_tolerance=args.vce_tolerance)
+    results = analyze(parameters, hi_low_metrics(args.load_current, args.active_load),
+                      bounds=hi_low_bounds(args.load_current, args.active_load),
+                      exhaustive=args.exhaustive)
+
+    print("Fet\tP(Q1): {0}\tN(Q2): {1}\tRb(Ohm)={2}\tR1(Ohm)={3}\tVsc={4}V\tVsig={5}V".format(
+        Q1.name.upper(), Q2.name.upper(), toSI(driver.Rb), toSI(driver.R1), args.vsc, args.vsig))
+    print("{0:13s} {1:>10s} {2:>8s} {3:>6s} {4:>8s}   {5}".format(
+        "Metric", "Worst", "Evals", "Boxes", "3^n", "Corner"))
+    for metric, worst in results.items():
+        corner = " ".join("{0}={1}".format(name, level) for name, (level, _) in worst.corner.items()
+                          if level != "typ")
+        value = "fails" if np.isnan(worst.value) else "{0:.4g}".format(worst.value)
+        print("{0:13s} {1:>10s} {2:>8d} {3:>6d} {4:>8d}   {5}".format(
+            metric, value, worst.evaluations, worst.boxes, 3**len(parameters), corner))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+# Command line for the circuit topologies of topologies.py
+#
+# python3 datalogger_design.py hi-low-switch --Vsc 5 12 --load-current 1.5
+# python3 datalogger_design.py hi-switch --spec hi_switch.json --output sweep.csv
+# python3 datalogger_design.py batch specs.json
+#
+# The flags of a subcommand are the keyword arguments of its topology
+# function (--Vsc, --Q1 dmc3016lsd:P, --load-power, --no-active-load, ...).
+# A spec file is a JSON object of the same names, flags given on the command
+# line override it. Numbers may be given as component values, "4k7" or
+# "100m" (fromSI), in both. A batch file is a JSON list of spec objects, each with a
+# "topology" key and optionally "output" / "format". All specs of a batch
+# run in this one process, so the device library is loaded once. With
+# --output - and a csv / ndjson format only the rows go to stdout, the
+# design preambles and table separators go to stderr.
+from inspect import signature
+import argparse
+import json
+import sys
+
+from result_sinks import FORMATS, open_sink, sink_format, sink_path
+from switch_bias_functions import fromSI
+from topologies import TOPOLOGIES
+
+# Spec keys that are not topology parameters
+OUTPUT_KEYS = ("output", "format")
+
+
+def _flag(name):
+    return "--" + name.replace("_", "-")
+
+
+def add_topology_arguments(parser, function):
+    """Adds a flag for every keyword argument of a topology function"""
+    for name, parameter in signature(function).parameters.items():
+        default = parameter.default
+        help = "default: {0}".format(default)
+        if isinstance(default, bool):
+            parser.add_argument(_flag(name), dest=name, action=argparse.BooleanOptionalAction, help=help)
+        elif isinstance(default, (tuple, list)):
+            parser.add_argument(_flag(name), dest=name, type=fromSI, nargs="+", metavar="V", help=help)
+        elif isinstance(default, str):
+            parser.add_argument(_flag(name), dest=name, help=help)
+        else:
+            parser.add_argument(_flag(name), dest=name, type=fromSI, metavar="V", help=help)
+
+
+def _number(name, value):
+    """
+    Returns value as a number, component value strings ("4k7") parsed
+
+    Raises
+    ------
+    ValueError
+        If value is neither a number nor a string fromSI can read
+    """
+    if isinstance(value, str):
+        try:
+            return fromSI(value)
+        except ValueError as error:
+            raise ValueError("{0}: {1}".format(name, error)) from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("{0}: {1!r} is not a number".format(name, value))
+    return value
+
+
+def coerce_params(function, params):
+    """
+    Returns params with the list parameters of a topology function (Vsc,
+    Vsig, ...) as tuples, a single value given for one becomes a 1-tuple,
+    and component value strings ("4k7") of numeric parameters as floats
+
+    Raises
+    ------
+    ValueError
+        If a list parameter is empty or a numeric value is not a number
+    """
+    params = dict(params)
+    for name, parameter in signature(function).parameters.items():
+        if name not in params:
+            continue
+        default, value = parameter.default, params[name]
+        if isinstance(default, (tuple, list)):
+            values = value if isinstance(value, (tuple, list)) else (value,)
+            if not values:
+                raise ValueError("{0} needs at least one value".format(name))
+            params[name] = tuple(_number(name, v) for v in values)
+        elif isinstance(default, (int, float)) and not isinstance(default, bool):
+            params[name] = _number(name, value)
+    return params
+
+
+def load_specs(path):
+    """Returns the list of spec objects of a spec or batch file"""
+    with open(path) as f:
+        specs = json.load(f)
+    return specs if isinstance(specs, list) else [specs]
+
+
+def run_topology(topology, params, output=None, format=None):
+    """
+    Evaluates one topology and writes its tables, the human table to
+    stdout by default
+
+    Raises
+    ------
+    ValueError
+        If the topology or a parameter is unknown
+    TypeError
+        If a parameter value has the wrong type
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError("Unknown topology {0}, use one of {1}".format(topology, sorted(TOPOLOGIES)))
+    function = TOPOLOGIES[topology]
+    unknown = set(params) - set(signature(function).parameters)
+    if unknown:
+        raise ValueError("Unknown parameters for {0}: {1}".format(topology, sorted(unknown)))
+    result = function(**coerce_params(function, params))
+    render(result, output, format)
+    return result
+
+
+def text_stream(output=None, format=None):
+    """
+    Returns the stream of the text around the tables (preambles and
+    separators): stdout for the human table, stderr for the other formats
+    so that csv / ndjson on stdout stay parseable
+
+    Raises
+    ------
+    ValueError
+        If the format of output is not known
+    """
+    if format is None:
+        format = "table" if output is None or output == "-" else sink_format(output)
+    return sys.stdout if format == "table" else sys.stderr
+
+
+def render(result, output=None, format=None):
+    """Writes the tables of a TopologyResult to sinks"""
+    text = text_stream(output, format)
+    for i, table in enumerate(result.tables):
+        if i:
+            print("\r\n", file=text)
+        for line in table.preamble:
+            print(line, file=text)
+        path = output if len(result.tables) == 1 else sink_path(output, table.name)
+        with open_sink(path, table.row_type._fields, format, table.row_format, table.header,
+                       table.si_fields) as sink:
+            sink.write_many(table.rows)
+
+
+def run_batch(paths):
+    """Returns the number of failed specs, errors are reported on stderr"""
+    failed = 0
+    for path in paths:
+        for index, spec in enumerate(load_specs(path)):
+            spec = dict(spec)
+            topology = spec.pop("topology", None)
+            output = {key: spec.pop(key, None) for key in OUTPUT_KEYS}
+            try:
+                if index or path != paths[0]:
+                    print(file=text_stream(**output))
+                run_topology(topology, spec, **output)
+            except (ValueError, KeyError, TypeError, ImportError) as error:
+                failed += 1
+                print("{0}[{1}] {2}: {3}".format(path, index, topology, error), file=sys.stderr)
+    return failed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Datalogger circuit design calculations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for topology, function in TOPOLOGIES.items():
+        subparser = subparsers.add_parser(topology, help=(function.__doc__ or "").strip().splitlines()[0],
+                                          argument_default=argparse.SUPPRESS)
+        subparser.add_argument("--spec", metavar="JSON", help="parameters from a spec file")
+        subparser.add_argument("--output", metavar="PATH",
+                               help="write the sweep rows to PATH (.csv, .ndjson, .parquet, .arrow)")
+        subparser.add_argument("--format", choices=FORMATS, help="output format, default from the PATH extension")
+        add_topology_arguments(subparser, function)
+    batch = subparsers.add_parser("batch", help="evaluate every spec of one or more batch files")
+    batch.add_argument("files", nargs="+", metavar="JSON")
+    return parser
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    command = args.pop("command")
+    if command == "batch":
+        return 1 if run_batch(args["files"]) else 0
+
+    params = {}
+    if "spec" in args:
+        spec = load_specs(args.pop("spec"))
+        if len(spec) != 1:
+            raise SystemExit("--spec takes a single spec object, use batch for lists")
+        params.update(spec[0])
+        params.pop("topology", None)
+    params.update(args)
+    output = {key: params.pop(key, None) for key in OUTPUT_KEYS}
+    run_topology(command, params, **output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+# Design-space explorer for the high/low switch (hi_low_switch_bias.py)
+#
+# Every (P-FET Q1, N-FET Q2, driver BJT Q3, Rb, R1) combination of the device
+# library and a standard resistor series is evaluated over all Vsig/Vsc
+# corners with hi_low_switch_array. Candidates are enumerated by flat index
+# in chunks, each chunk is reduced to its Pareto front in a worker process and
+# the fronts are merged, so memory stays bounded for the full catalog.
+#
+# Objectives (all minimized, worst case over the corners):
+#   drop       load path voltage drop Vsc - Vload with the switch on
+#   quiescent  driver current Ib + Ic with the switch on
+#   power      total dissipation of Q1 + Q2 + Q3
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+
+import numpy as np
+
+from component_values import RESISTORS
+from device_library import default_library
+from switch_bias_arrays import hi_low_switch_array
+from switch_bias_functions import calculate_theoretical_load_resistor, toSI
+from topologies import hi_low_corners
+
+OBJECTIVES = ("drop", "quiescent", "power")
+
+# (Vsig, Vsc) corners of hi_low_switch_bias.py
+HI_LOW_CORNERS = list(hi_low_corners(Vsig=(0, 3.3, 5), Vsc=(3.3, 5, 12, 14.7)))
+
+
+class Catalog:
+    """Candidate parameters as arrays, indexed by the unravelled flat index"""
+    def __init__(self, library, Rb_values, R1_values, p_rows=None, n_rows=None, bjt_parts=None):
+        self.p_rows = library.query(channel="P") if p_rows is None else p_rows
+        self.n_rows = library.query(channel="N") if n_rows is None else n_rows
+        self.bjts = [library.bjt(part) for part in (bjt_parts or library.bjts["part"])]
+
+        column = lambda name, rows: np.array([library.column(name)[row] for row in rows])
+        self.p_names = [library.fets["part"][row] for row in self.p_rows]
+        self.n_names = [library.fets["part"][row] for row in self.n_rows]
+        self.p_Vth, self.p_K, self.p_Vgs_max = (column(name, self.p_rows) for name in ("Vth", "K", "Vgs_max"))
+        self.n_Vth, self.n_K, self.n_Vgs_max = (column(name, self.n_rows) for name in ("Vth", "K", "Vgs_max"))
+        self.b_Vbe_sat = np.array([b.Vbe_sat for b in self.bjts])
+        self.b_Vce_sat = np.array([b.Vce_sat for b in self.bjts])
+        self.b_beta = np.array([b.beta for b in self.bjts])
+        self.Rb = np.asarray(Rb_values, dtype=float)
+        self.R1 = np.asarray(R1_values, dtype=float)
+        self.shape = (len(self.p_rows), len(self.n_rows), len(self.bjts), len(self.Rb), len(self.R1))
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def describe(self, index):
+        p, n, b, rb, r1 = np.unravel_index(index, self.shape)
+        return (self.p_names[p], self.n_names[n], self.bjts[b].name, self.Rb[rb], self.R1[r1])
+
+
+def pareto_front(objectives):
+    """
+    Returns indices of the non-dominated rows of an (n, m) array, minimizing
+    every column. Rows with NaN are dropped.
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    candidates = np.flatnonzero(~np.isnan(objectives).any(axis=1))
+    # Lexicographic order, a row can only be dominated by rows before it
+    order = candidates[np.lexsort(objectives[candidates].T[::-1])]
+    front = []
+    for index in order:
+        row = objectives[index]
+        if front:
+            kept = objectives[front]
+            if np.any(np.all(kept <= row, axis=1) & np.any(kept < row, axis=1)):
+                continue
+            if np.any(np.all(kept == row, axis=1)):
+                continue
+        front.append(index)
+    return np.array(front, dtype=int)
+
+
+def evaluate_candidates(catalog, indices, corners, load_current, Rload):
+    """
+    Returns (n, 3) objectives for the flat candidate indices, NaN where a
+    candidate fails to switch the load or exceeds a FET Vgs_max
+    """
+    p, n, b, rb, r1 = (axis[:, None] for axis in np.unravel_index(indices, catalog.shape))
+    Vsig = np.array([corner[0] for corner in corners], dtype=float)[None, :]
+    Vsc = np.array([corner[1] for corner in corners], dtype=float)[None, :]
+
+    result = hi_low_switch_array(Vsig=Vsig, Vsc=Vsc, Rb=catalog.Rb[rb], R1=catalog.R1[r1],
+                                 Rload=Rload, load_current=load_current,
+                                 Vbe_sat=catalog.b_Vbe_sat[b], Vce_sat=catalog.b_Vce_sat[b],
+                                 beta=catalog.b_beta[b], Vth_q1=catalog.p_Vth[p], K_q1=catalog.p_K[p],
+                                 Vth_q2=catalog.n_Vth[n], K_q2=catalog.n_K[n])
+    on = np.broadcast_to(Vsig > 0, result.shape)
+
+    # Switch must deliver the load current when on and nothing when off
+    switches = np.where(on, result["Id"] >= load_current, result["Id"] == 0).all(axis=1)
+    gate_ok = ((np.abs(result["Vgs_q1"]) <= catalog.p_Vgs_max[p]) &
+               (np.abs(result["Vgs_q2"]) <= catalog.n_Vgs_max[n])).all(axis=1)
+
+    drop = np.where(on, Vsc - result["Vdrop"], -np.inf).max(axis=1)
+    quiescent = np.where(on, result["Ib"] + result["Ic"], -np.inf).max(axis=1)
+    power = (result["P_q1"] + result["P_q2"] + result["P_q3"]).max(axis=1)
+
+    objectives = np.column_stack([drop, quiescent, power])
+    objectives[~(switches & gate_ok)] = np.nan
+    return objectives
+
+
+def _explore_chunk(catalog, start, stop, corners, load_current, Rload):
+    indices = np.arange(start, stop)
+    objectives = evaluate_candidates(catalog, indices, corners, load_current, Rload)
+    front = pareto_front(objectives)
+    return indices[front], objectives[front]
+
+
+def explore(catalog, corners=HI_LOW_CORNERS, load_current=2.5, Rload=2, chunk_size=20000, workers=None):
+    """
+    Returns (flat indices, objectives) of the Pareto front over the catalog
+
+    workers: None uses os.cpu_count() processes, 1 runs in this process
+    """
+    bounds = [(start, min(start + chunk_size, catalog.size))
+              for start in range(0, catalog.size, chunk_size)]
+    if workers == 1:
+        chunks = [_explore_chunk(catalog, start, stop, corners, load_current, Rload)
+                  for start, stop in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [executor.submit(_explore_chunk, catalog, start, stop, corners, load_current, Rload)
+                       for start, stop in bounds]
+            chunks = [future.result() for future in futures]
+
+    if not chunks:
+        return np.array([], dtype=int), np.empty((0, len(OBJECTIVES)))
+    indices = np.concatenate([chunk[0] for chunk in chunks])
+    objectives = np.concatenate([chunk[1] for chunk in chunks])
+    front = pareto_front(objectives)
+    return indices[front], objectives[front]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pareto search over high/low switch designs")
+    parser.add_argument("--series", default="E12", help="resistor series for Rb and R1")
+    parser.add_argument("--rb", type=float, nargs=2, default=(10e3, 1e6), metavar=("MIN", "MAX"))
+    parser.add_argument("--r1", type=float, nargs=2, default=(10e3, 1e6), metavar=("MIN", "MAX"))
+    parser.add_argument("--load-current", type=float, default=2.5)
+    parser.add_argument("--load-power", type=float, default=12.5)
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    series = RESISTORS[args.series]
+    Rb_values = [R for R in series if args.rb[0] <= R <= args.rb[1]]
+    R1_values = [R for R in series if args.r1[0] <= R <= args.r1[1]]
+    catalog = Catalog(default_library(), Rb_values, R1_values)
+    Rload = calculate_theoretical_load_resistor(power=args.load_power, I=args.load_current)
+
+    indices, objectives = explore(catalog, HI_LOW_CORNERS, args.load_current, Rload,
+                                  args.chunk_size, args.workers)
+
+    print("Candidates: {0}\tPareto front: {1}".format(catalog.size, len(indices)))
+    print("{0:12s} {1:12s} {2:8s} {3:>8s} {4:>8s}   {5:>8s} {6:>10s} {7:>8s}".format(
+        "P(Q1)", "N(Q2)", "Q3", "Rb", "R1", "Vdrop(V)", "Iq(A)", "P(W)"))
+    for order in np.argsort(objectives[:, 0]):
+        Q1, Q2, Q3, Rb, R1 = catalog.describe(indices[order])
+        drop, quiescent, power = objectives[order]
+        print("{0:12s} {1:12s} {2:8s} {3:>8s} {4:>8s}   {5:>8.3f} {6:>10.2e} {7:>8.3f}".format(
+            Q1, Q2, Q3, toSI(Rb), toSI(R1), drop, quiescent, power))
+
+
+if __name__ == "__main__":
+    main()
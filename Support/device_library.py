@@ -0,0 +1,275 @@
+#!/usr/bin/python3
+# Device library loaded from devices_fet.csv / devices_bjt.csv
+#
+# One row per FET channel (dual parts such as DMC3016LSD have a P and an N
+# row) with a uniform schema. Vth is the midpoint of Vth_min/Vth_max and K is
+# derived from the two (Vgs, Id) saturation points, both computed once and
+# cached on disk together with the parsed columns. Where fet_fit.py has
+# written Vth_fit / K_fit / lambda_fit from digitized curves those are used
+# instead.
+#
+# The disk caches of this and the other modules (iv_tables, revision_diff)
+# live in CACHE_DIR, hardware-datalogger under the user cache directory.
+# DATALOGGER_CACHE_DIR moves them, set to "" or "off" it turns them off.
+#
+# library = default_library()
+# Q1 = library.fet("dmc3016lsd", "P")        # Q1.Vth, Q1.K, Q1.name
+# rows = library.query(channel="P", Vgs_max=(20, None), Vth=(-2, None))
+from array import array
+import csv
+import json
+import os
+
+from switch_bias_functions import calculate_fet_K
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+FET_DATA = os.path.join(DATA_DIR, "devices_fet.csv")
+BJT_DATA = os.path.join(DATA_DIR, "devices_bjt.csv")
+
+
+def _cache_dir():
+    """Returns the disk cache directory, None when caching is turned off"""
+    path = os.environ.get("DATALOGGER_CACHE_DIR")
+    if path is not None:
+        return None if path.strip().lower() in ("", "0", "off", "none") else path
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        base = os.environ["LOCALAPPDATA"]
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "hardware-datalogger")
+
+
+CACHE_DIR = _cache_dir()
+
+# Bump when the derived columns change so stale caches are ignored
+CACHE_VERSION = 3
+
+FET_TEXT_COLUMNS = ("part", "channel", "package", "note")
+FET_NUMBER_COLUMNS = ("Vgs_max", "Vth_min", "Vth_max", "Vth_typ", "Vgs1", "Id1",
+                      "Vgs2", "Id2", "Rds_on", "Rds_on_Vgs", "Vth_fit", "K_fit",
+                      "lambda_fit", "Vth", "K", "lam")
+BJT_TEXT_COLUMNS = ("part", "polarity", "package", "note")
+BJT_NUMBER_COLUMNS = ("Vbe_sat", "Vce_sat", "beta", "beta_min", "beta_max")
+
+
+class FetParams:
+    """Parameters of one FET channel"""
+    __slots__ = ("name", "channel", "package", "Vgs_max", "Vth_min", "Vth_max",
+                 "Vth_typ", "Vth", "K", "Rds_on", "lam")
+
+    def __init__(self, name, channel, package, Vgs_max, Vth_min, Vth_max,
+                 Vth_typ, Vth, K, Rds_on, lam=0.0):
+        self.name = name
+        self.channel = channel
+        self.package = package
+        self.Vgs_max = Vgs_max
+        self.Vth_min = Vth_min
+        self.Vth_max = Vth_max
+        self.Vth_typ = Vth_typ
+        self.Vth = Vth
+        self.K = K
+        self.Rds_on = Rds_on
+        self.lam = lam
+
+    def __repr__(self):
+        return "FetParams({0} {1}, Vth={2:.3f}, K={3:.3f})".format(
+            self.name, self.channel, self.Vth, self.K)
+
+
+class BjtParams:
+    """Parameters of one BJT"""
+    __slots__ = ("name", "polarity", "package", "Vbe_sat", "Vce_sat", "beta",
+                 "beta_min", "beta_max")
+
+    def __init__(self, name, polarity, package, Vbe_sat, Vce_sat, beta,
+                 beta_min, beta_max):
+        self.name = name
+        self.polarity = polarity
+        self.package = package
+        self.Vbe_sat = Vbe_sat
+        self.Vce_sat = Vce_sat
+        self.beta = beta
+        self.beta_min = beta_min
+        self.beta_max = beta_max
+
+    def __repr__(self):
+        return "BjtParams({0}, beta={1})".format(self.name, self.beta)
+
+
+def _number(text):
+    text = text.strip()
+    return float(text) if text else float("nan")
+
+
+def _read_columns(path, text_columns, number_columns):
+    columns = {name: [] for name in text_columns}
+    columns.update({name: array("d") for name in number_columns})
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            for name in text_columns:
+                columns[name].append(row[name].strip())
+            for name in number_columns:
+                if name in row:
+                    columns[name].append(_number(row[name]))
+    return columns
+
+
+def _derive_fet_columns(columns):
+    # Vth is the datasheet min/max midpoint, K from the two saturation points,
+    # unless fitted values are present
+    for part, Vth_min, Vth_max, Vgs1, Id1, Vgs2, Id2, Vth_fit, K_fit, lambda_fit in zip(
+            columns["part"], columns["Vth_min"], columns["Vth_max"], columns["Vgs1"],
+            columns["Id1"], columns["Vgs2"], columns["Id2"], columns["Vth_fit"],
+            columns["K_fit"], columns["lambda_fit"]):
+        # Datasheets plot P-Chan currents either signed or as magnitudes, a
+        # row mixing both is a typo that abs() in calculate_fet_K would hide
+        if Id1 * Id2 < 0:
+            raise ValueError("{0}: Id1={1} and Id2={2} have different signs".format(part, Id1, Id2))
+        columns["Vth"].append(Vth_fit if Vth_fit == Vth_fit else (Vth_min + Vth_max) / 2)
+        columns["K"].append(K_fit if K_fit == K_fit else
+                            calculate_fet_K(Vgs1=Vgs1, Id1=Id1, Vgs2=Vgs2, Id2=Id2))
+        columns["lam"].append(lambda_fit if lambda_fit == lambda_fit else 0.0)
+
+
+def _source_stamp(paths):
+    stamp = [CACHE_VERSION]
+    for path in paths:
+        stat = os.stat(path)
+        stamp.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return stamp
+
+
+class DeviceLibrary:
+    """
+    Columnar store of the FET and BJT tables. Columns are lists (text) or
+    array('d') (numbers) indexed by row, rows are turned into FetParams /
+    BjtParams only on request.
+    """
+    def __init__(self, fet_path=FET_DATA, bjt_path=BJT_DATA, cache_dir=CACHE_DIR):
+        self.fet_path = fet_path
+        self.bjt_path = bjt_path
+        self.cache_dir = cache_dir
+        self.fets, self.bjts = self._load()
+        self._fet_rows = {}
+        for row, (part, channel) in enumerate(zip(self.fets["part"], self.fets["channel"])):
+            self._fet_rows.setdefault(part.lower(), {})[channel] = row
+        self._bjt_rows = {part.lower(): row for row, part in enumerate(self.bjts["part"])}
+
+    def _cache_path(self):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, "device_library.json")
+
+    def _load(self):
+        stamp = _source_stamp([self.fet_path, self.bjt_path])
+        cache_path = self._cache_path()
+        if cache_path is not None:
+            try:
+                with open(cache_path) as f:
+                    cached = json.load(f)
+                if cached["stamp"] == stamp:
+                    return (self._from_json(cached["fets"], FET_NUMBER_COLUMNS),
+                            self._from_json(cached["bjts"], BJT_NUMBER_COLUMNS))
+            except (OSError, ValueError, KeyError):
+                pass
+
+        fets = _read_columns(self.fet_path, FET_TEXT_COLUMNS, FET_NUMBER_COLUMNS)
+        _derive_fet_columns(fets)
+        bjts = _read_columns(self.bjt_path, BJT_TEXT_COLUMNS, BJT_NUMBER_COLUMNS)
+
+        if cache_path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = cache_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"stamp": stamp,
+                               "fets": {k: list(v) for k, v in fets.items()},
+                               "bjts": {k: list(v) for k, v in bjts.items()}}, f)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                # Cache is optional, e.g. read-only home directory
+                pass
+        return fets, bjts
+
+    @staticmethod
+    def _from_json(columns, number_columns):
+        return {name: array("d", values) if name in number_columns else values
+                for name, values in columns.items()}
+
+    def __len__(self):
+        return len(self.fets["part"])
+
+    def parts(self):
+        """Returns the FET part names in file order"""
+        return list(dict.fromkeys(self.fets["part"]))
+
+    def channels(self, part):
+        return list(self._fet_rows[part.lower()])
+
+    def fet_row(self, part, channel=None):
+        """
+        Returns the row index of a FET channel
+
+        Raises
+        ------
+        KeyError
+            If the part or channel is not in the library
+        ValueError
+            If channel is omitted for a dual (P and N) part
+        """
+        rows = self._fet_rows[part.lower()]
+        if channel is None:
+            if len(rows) != 1:
+                raise ValueError("{0} has channels {1}, give one".format(part, list(rows)))
+            return next(iter(rows.values()))
+        return rows[channel.upper()]
+
+    def fet(self, part, channel=None):
+        return self.fet_record(self.fet_row(part, channel))
+
+    def fet_record(self, row):
+        f = self.fets
+        return FetParams(f["part"][row], f["channel"][row], f["package"][row],
+                         f["Vgs_max"][row], f["Vth_min"][row], f["Vth_max"][row],
+                         f["Vth_typ"][row], f["Vth"][row], f["K"][row], f["Rds_on"][row],
+                         f["lam"][row])
+
+    def bjt(self, part):
+        row = self._bjt_rows[part.lower()]
+        b = self.bjts
+        return BjtParams(b["part"][row], b["polarity"][row], b["package"][row],
+                         b["Vbe_sat"][row], b["Vce_sat"][row], b["beta"][row],
+                         b["beta_min"][row], b["beta_max"][row])
+
+    def column(self, name):
+        """Returns a FET column, array('d') for numbers (np.frombuffer friendly)"""
+        return self.fets[name]
+
+    def query(self, channel=None, **ranges):
+        """
+        Returns FET row indices matching channel and inclusive column ranges,
+        e.g. query(channel="P", Vgs_max=(20, None), Vth=(-2, None)).
+        Vgs_max is stored as a magnitude.
+        """
+        rows = range(len(self))
+        if channel is not None:
+            channels = self.fets["channel"]
+            rows = [row for row in rows if channels[row] == channel.upper()]
+        for name, (lo, hi) in ranges.items():
+            column = self.fets[name]
+            if lo is not None:
+                rows = [row for row in rows if column[row] >= lo]
+            if hi is not None:
+                rows = [row for row in rows if column[row] <= hi]
+        return list(rows)
+
+
+_default_library = None
+
+
+def default_library():
+    """Returns the library loaded from the files next to this module"""
+    global _default_library
+    if _default_library is None:
+        _default_library = DeviceLibrary()
+    return _default_library
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+# Voltage divider synthesis from standard resistor values
+#
+#   Vin
+#    |
+#    >
+#    < R1
+#    >
+#    |
+#    +------ Vo       ratio = Vo / Vin = R2 / (R1 + R2)
+#    |
+#    >
+#    < R2
+#    >
+#    |
+#   GND
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+import heapq
+
+from component_values import RESISTORS
+
+DividerMatch = namedtuple("DividerMatch", ["R1", "R2", "ratio", "error"])
+
+
+def divider_ratio(R1, R2):
+    return R2 / (R1 + R2)
+
+
+def _resistor_values(values, r_min):
+    if values is None:
+        values = RESISTORS["stock"]
+    elif isinstance(values, str):
+        values = RESISTORS[values]
+    return sorted(set(R for R in values if R >= r_min))
+
+
+def _match_divider(target, values, k, vin, i_max, z_out_max, max_error, direction):
+    # R1 / R2 needed for the target ratio
+    q = (1 - target) / target
+    count = len(values)
+
+    # Every R2 contributes two candidate streams walking away from the ideal
+    # R1 = q * R2, lo (ratio above target) and hi (ratio below target).
+    # Error grows monotonically along a stream, so a heap merge of the
+    # streams yields candidates in global order of error.
+    split = bisect_right if direction == "above" else bisect_left
+    heap = []
+    for j, R2 in enumerate(values):
+        p = split(values, q * R2)
+        if direction != "below" and p > 0:
+            R1 = values[p - 1]
+            heap.append((abs(divider_ratio(R1, R2) - target), p - 1, j, -1))
+        if direction != "above" and p < count:
+            R1 = values[p]
+            heap.append((abs(divider_ratio(R1, R2) - target), p, j, 1))
+    heapq.heapify(heap)
+
+    matches = []
+    while heap and (k is None or len(matches) < k):
+        deviation, i, j, step = heapq.heappop(heap)
+        if max_error is not None and deviation / target > max_error:
+            break
+
+        R1 = values[i]
+        R2 = values[j]
+        if ((i_max is None or vin / (R1 + R2) <= i_max) and
+                (z_out_max is None or (R1 * R2) / (R1 + R2) <= z_out_max)):
+            ratio = divider_ratio(R1, R2)
+            matches.append(DividerMatch(R1, R2, ratio, (ratio - target) / target))
+
+        i += step
+        if 0 <= i < count:
+            heapq.heappush(heap, (abs(divider_ratio(values[i], R2) - target), i, j, step))
+    return matches
+
+
+def synthesize_divider(target, values=None, k=5, r_min=0, vin=1, i_max=None,
+                       z_out_max=None, max_error=None, direction=None):
+    """
+    Returns the best R1/R2 pairs for ratio = R2 / (R1 + R2)
+
+    target: desired ratio, 0 < target < 1
+    values: resistor values, a series name of component_values.RESISTORS
+            or an iterable, defaults to the stock resistors
+    k: number of pairs to return, None for all within max_error
+    r_min: minimum resistance of R1 and R2
+    vin: divider input voltage used for the current limit
+    i_max: maximum current through the divider at vin
+    z_out_max: maximum output impedance R1 || R2
+    max_error: maximum relative ratio error, (ratio - target) / target
+    direction: None for either side, "below" for ratio <= target or
+               "above" for ratio >= target
+
+    Returns
+    -------
+    list of DividerMatch(R1, R2, ratio, error) ordered by |error|
+
+    Raises
+    ------
+    ValueError
+        If target is not between 0 and 1 or direction is unknown
+    """
+    return synthesize_dividers([target], values, k, r_min, vin, i_max,
+                               z_out_max, max_error, direction)[0]
+
+
+def synthesize_dividers(targets, values=None, k=5, r_min=0, vin=1, i_max=None,
+                        z_out_max=None, max_error=None, direction=None):
+    """
+    Batch form of synthesize_divider, the resistor values are filtered and
+    sorted once for all targets
+
+    Returns
+    -------
+    list with a list of DividerMatch for each target
+    """
+    if direction not in (None, "below", "above"):
+        raise ValueError("Unknown direction '{0}'".format(direction))
+    values = _resistor_values(values, r_min)
+
+    results = []
+    for target in targets:
+        if not 0 < target < 1:
+            raise ValueError("Divider ratio must be between 0 and 1, got {0}".format(target))
+        results.append(_match_divider(target, values, k, vin, i_max, z_out_max,
+                                      max_error, direction))
+    return results
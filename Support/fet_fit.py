@@ -0,0 +1,257 @@
+#!/usr/bin/python3
+# Least-squares square-law fit of FETs to digitized datasheet curves
+#
+# python3 fet_fit.py                    # fit every curve file, print the fits
+# python3 fet_fit.py --write            # ... and store them in devices_fet.csv
+# python3 fet_fit.py --curves DIR --no-lambda dmc3016lsd_P.csv
+#
+# One CSV per FET channel in fet_curves/, named <part>.csv or
+# <part>_<channel>.csv for dual parts, with columns Vgs, Id and optionally
+# Vds. Transfer curves (Id over Vgs) may leave Vds empty, such points are
+# taken as saturated. Output curves (Id over Vds at fixed Vgs) give the
+# triode region and lambda. Points are digitized as the datasheet plots
+# them: P-Chan columns may be signed (negative Vgs, Vds, Id) or magnitudes,
+# each column is checked for a single sign instead of taking abs() per point.
+#
+# The model is Id = K (Vov Vds - Vds^2/2) (1 + lambda Vds) in triode and
+# K/2 Vov^2 (1 + lambda Vds) in saturation. For a fixed Vth it is linear in
+# K and K*lambda, so every part is fitted at once on a grid of Vth
+# candidates with the 2x2 normal equations solved in closed form, and the
+# grid is refined around the best candidate. Residuals are relative to Id
+# by default so the 100 mA points weigh as much as the 20 A ones.
+from collections import namedtuple
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+from device_library import DATA_DIR, FET_DATA, default_library
+from nodal_solver import square_law
+
+CURVE_DIR = os.path.join(DATA_DIR, "fet_curves")
+
+# Vth signed as in the library (negative for P-Chan), lam per volt of |Vds|,
+# rms in A, relative = rms of the relative error, points used in the fit
+FetFit = namedtuple("FetFit", ["part", "channel", "Vth", "K", "lam", "rms", "relative", "points"])
+
+# Curve: points of one channel in device polarity (magnitudes), Vds NaN
+# for saturated transfer curve points
+Curve = namedtuple("Curve", ["part", "channel", "Vgs", "Vds", "Id"])
+
+
+def _magnitudes(values, polarity, column, path):
+    """
+    Returns the column in device polarity
+
+    Raises
+    ------
+    ValueError
+        If the column mixes signs, or an N-Chan column is negative
+    """
+    nonzero = values[np.isfinite(values) & (values != 0)]
+    if (nonzero > 0).any() and (nonzero < 0).any():
+        raise ValueError("{0}: {1} has both signs, digitize it signed or as magnitudes".format(path, column))
+    if (nonzero < 0).any():
+        if polarity > 0:
+            raise ValueError("{0}: negative {1} for an N-Chan".format(path, column))
+        return -values
+    return values
+
+
+def read_curve(path, part, channel):
+    """
+    Returns the Curve of a CSV with columns Vgs, Id and optionally Vds
+
+    Raises
+    ------
+    ValueError
+        If a column is missing or its signs are inconsistent
+    """
+    columns = {"Vgs": [], "Vds": [], "Id": []}
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        missing = {"Vgs", "Id"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError("{0}: missing columns {1}".format(path, sorted(missing)))
+        for row in reader:
+            for name in columns:
+                text = (row.get(name) or "").strip()
+                columns[name].append(float(text) if text else np.nan)
+    polarity = -1 if channel == "P" else 1
+    Vgs, Vds, Id = (_magnitudes(np.array(columns[name]), polarity, name, path) for name in ("Vgs", "Vds", "Id"))
+    keep = np.isfinite(Vgs) & np.isfinite(Id)
+    return Curve(part, channel, Vgs[keep], Vds[keep], Id[keep])
+
+
+def load_curves(directory=CURVE_DIR, names=None, library=None):
+    """
+    Returns the Curves of the curve files in directory (all *.csv by
+    default), channels resolved against the device library
+
+    Raises
+    ------
+    KeyError
+        If a part or channel is not in the library
+    ValueError
+        If a single-file name is given for a dual part, or a file is invalid
+    """
+    library = default_library() if library is None else library
+    if names is None:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".csv")) \
+            if os.path.isdir(directory) else []
+    curves = []
+    for name in names:
+        stem = os.path.splitext(os.path.basename(name))[0]
+        part, _, channel = stem.rpartition("_")
+        if not part or channel.upper() not in ("P", "N"):
+            part, channel = stem, None
+        row = library.fet_row(part, channel)
+        curves.append(read_curve(os.path.join(directory, name), library.fets["part"][row],
+                                 library.fets["channel"][row]))
+    return curves
+
+
+def _pad(curves):
+    """Returns (Vgs, Vds, Id, mask) of shape (parts, points), zero padded"""
+    n = max(len(curve.Id) for curve in curves)
+    arrays = [np.zeros((len(curves), n)) for _ in range(3)] + [np.zeros((len(curves), n), dtype=bool)]
+    for i, curve in enumerate(curves):
+        for array, values in zip(arrays, (curve.Vgs, curve.Vds, curve.Id)):
+            array[i, :len(values)] = values
+        arrays[3][i, :len(curve.Id)] = True
+    return arrays
+
+
+def _solve(Vth, Vgs, Vds, Id, weight, fit_lambda):
+    """
+    Returns (K, Klam, sse) for Vth candidates of shape (parts, m), points of
+    shape (parts, points)
+    """
+    Vov = Vgs[:, None, :] - Vth[:, :, None]
+    saturated = np.isnan(Vds)[:, None, :]
+    Vds = np.where(saturated, np.maximum(Vov, 0), Vds[:, None, :])
+    with np.errstate(invalid="ignore", over="ignore"):
+        a = square_law(Vov, Vds, 1, 0)[0]
+    b = np.where(saturated, 0, a * Vds) if fit_lambda else np.zeros_like(a)
+    w = weight[:, None, :]
+    y = Id[:, None, :]
+    Saa, Sab, Sbb = (w * a * a).sum(-1), (w * a * b).sum(-1), (w * b * b).sum(-1)
+    Say, Sby = (w * a * y).sum(-1), (w * b * y).sum(-1)
+
+    det = Saa * Sbb - Sab**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        joint = det > 1e-12 * np.maximum(Saa * Sbb, 1e-300)
+        K = np.where(joint, (Say * Sbb - Sab * Sby) / det, Say / Saa)
+        Klam = np.where(joint, (Saa * Sby - Sab * Say) / det, 0)
+    sse = (w * (y - K[..., None] * a - Klam[..., None] * b)**2).sum(-1)
+    sse = np.where(np.isfinite(K) & (K > 0), sse, np.inf)
+    return K, Klam, sse
+
+
+def fit_curves(curves, fit_lambda=True, relative=True, candidates=256, refine=4):
+    """
+    Returns the FetFit of every Curve, all fitted together
+
+    fit_lambda: fit channel-length modulation, else lambda = 0 (it is only
+                identifiable from points with Vds given)
+    relative: minimize relative instead of absolute Id errors
+    """
+    if not curves:
+        return []
+    Vgs, Vds, Id, mask = _pad(curves)
+    Id_max = np.where(mask, Id, 0).max(axis=1, keepdims=True)
+    if relative:
+        weight = np.where(mask, 1 / np.maximum(Id, 1e-3 * Id_max)**2, 0)
+    else:
+        weight = mask.astype(float)
+
+    # Vth between 0 and the largest Vgs, then zoom in around the best
+    lo = np.zeros(len(curves))
+    hi = np.where(mask, Vgs, 0).max(axis=1)
+    for _ in range(refine + 1):
+        Vth = np.linspace(lo, hi, candidates, axis=1)
+        K, Klam, sse = _solve(Vth, Vgs, Vds, Id, weight, fit_lambda)
+        best = np.argmin(sse, axis=1)
+        step = (hi - lo) / (candidates - 1)
+        centre = Vth[np.arange(len(curves)), best]
+        lo, hi = np.maximum(centre - 2 * step, 0), centre + 2 * step
+
+    rows = np.arange(len(curves))
+    Vth, K, Klam = centre, K[rows, best], Klam[rows, best]
+    fits = []
+    for i, curve in enumerate(curves):
+        lam = Klam[i] / K[i]
+        Vds_i = np.where(np.isnan(curve.Vds), np.maximum(curve.Vgs - Vth[i], 0), curve.Vds)
+        clm = np.where(np.isnan(curve.Vds), 1, 1 + lam * Vds_i)
+        model = square_law(curve.Vgs - Vth[i], Vds_i, K[i], 0)[0] * clm
+        error = model - curve.Id
+        polarity = -1 if curve.channel == "P" else 1
+        fits.append(FetFit(curve.part, curve.channel, float(polarity * Vth[i]), float(K[i]), float(lam),
+                           float(np.sqrt(np.mean(error**2))),
+                           float(np.sqrt(np.mean((error / np.maximum(curve.Id, 1e-3 * Id_max[i, 0]))**2))),
+                           len(curve.Id)))
+    return fits
+
+
+def write_fits(fits, path=FET_DATA):
+    """
+    Stores Vth_fit, K_fit and lambda_fit of the fits in the device CSV,
+    other rows and columns are kept as they are
+
+    Raises
+    ------
+    KeyError
+        If a fitted channel has no row in the file
+    """
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    index = {(row["part"].strip().lower(), row["channel"].strip()): row for row in rows}
+    for fit in fits:
+        row = index[(fit.part.lower(), fit.channel)]
+        row["Vth_fit"] = "{0:.6g}".format(fit.Vth)
+        row["K_fit"] = "{0:.6g}".format(fit.K)
+        row["lambda_fit"] = "{0:.6g}".format(fit.lam)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit Vth, K and lambda to digitized FET curves")
+    parser.add_argument("files", nargs="*", help="curve files in --curves, default all")
+    parser.add_argument("--curves", default=CURVE_DIR, help="curve directory")
+    parser.add_argument("--no-lambda", dest="fit_lambda", action="store_false")
+    parser.add_argument("--absolute", action="store_true", help="minimize absolute instead of relative errors")
+    parser.add_argument("--write", action="store_true", help="store the fits in devices_fet.csv")
+    args = parser.parse_args()
+
+    library = default_library()
+    curves = load_curves(args.curves, args.files or None, library)
+    if not curves:
+        print("No curve files in {0}".format(args.curves), file=sys.stderr)
+        return 1
+    fits = fit_curves(curves, args.fit_lambda, not args.absolute)
+
+    print("{0:12s} {1:2s} {2:>6s} {3:>8s} {4:>8s} {5:>9s} {6:>9s} {7:>7s} {8:>8s} {9:>8s}".format(
+        "Part", "Ch", "Points", "Vth", "K", "lambda", "rms(A)", "rel", "Vth lib", "K lib"))
+    for fit in fits:
+        Q = library.fet(fit.part, fit.channel)
+        print("{0:12s} {1:2s} {2:6d} {3:8.3f} {4:8.3f} {5:9.4f} {6:9.3g} {7:6.1f}% {8:8.3f} {9:8.3f}".format(
+            fit.part, fit.channel, fit.points, fit.Vth, fit.K, fit.lam, fit.rms, 100 * fit.relative,
+            Q.Vth, Q.K))
+    if args.write:
+        write_fits(fits)
+        print("Wrote {0} fits to {1}".format(len(fits), FET_DATA))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
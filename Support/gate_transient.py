@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+# Gate-drive switching transients of a FET with a resistive load
+#
+# The gate is charged through Rg_on and discharged through Rg_off (e.g. the
+# saturated driver BJT and the R1/R2 pull-up of the bias scripts) into Cgs,
+# the Miller capacitance Cgd and an optional external capacitor. The
+# square-law FET of switch_bias_functions drives the load through cutoff,
+# saturation and triode.
+#
+# State is (vg, vd) = (Vgs, Vds) in device polarity, so a P-Chan high side
+# switch is simulated with Vsg / Vsd and |Vth|. Every argument may be an
+# array, all parameter sets are integrated together with a fixed number of
+# linearly implicit (Rosenbrock-Euler) steps per edge, which stays stable
+# for the stiff drain node (Rload * Cgd is nanoseconds against microsecond
+# gate edges). Metrics are accumulated while stepping, no waveforms are kept.
+#
+# FET capacitances are inputs, take them from the datasheet (Ciss = Cgs +
+# Cgd, Crss = Cgd, Coss = Cds + Cgd) at the operating Vds.
+import argparse
+
+import numpy as np
+
+from component_values import CAPACITORS
+from nodal_solver import square_law
+from switch_bias_functions import toSI
+
+SWITCHING_DTYPE = np.dtype([
+    ("delay_on", "f8"),     # drive edge to 10% of the load swing
+    ("edge_on", "f8"),      # 10% to 90% of the load swing
+    ("plateau_on", "f8"),   # time in saturation (Miller plateau)
+    ("energy_on", "f8"),    # FET loss above the final conduction loss (J)
+    ("delay_off", "f8"),
+    ("edge_off", "f8"),
+    ("plateau_off", "f8"),
+    ("energy_off", "f8"),
+    ("vds_on", "f8"),       # settled on-state Vds
+    ("id_on", "f8"),        # settled on-state drain current
+])
+
+# Edges whose load swing is below this fraction of Vdd are not switching
+MIN_SWING = 1e-3
+
+
+def on_state(Vgs, Vdd, Rload, Vth, K):
+    """Returns (Vds, Id) of the FET at Vgs with Rload to Vdd (device polarity)"""
+    Vov = np.maximum(Vgs - Vth, 0)
+    # Saturation: Vds = Vdd - Rload K/2 Vov**2
+    Vds_sat = Vdd - Rload * K/2 * Vov**2
+    # Triode: (K Rload / 2) Vds**2 - (1 + K Rload Vov) Vds + Vdd = 0, smaller root
+    a = K * Rload / 2
+    b = 1 + K * Rload * Vov
+    with np.errstate(invalid="ignore"):
+        Vds_tri = 2 * Vdd / (b + np.sqrt(np.maximum(b**2 - 4 * a * Vdd, 0)))
+    Vds = np.where(Vds_sat >= Vov, Vds_sat, Vds_tri)
+    return Vds, (Vdd - Vds) / Rload
+
+
+def _edge(vg, vd, Vdrive, Vdd, Rload, Rg, Cg, Cgd, Cds, Vth, K, dt, steps, v_start, v_end):
+    """
+    Integrates one edge in place, returns (delay, edge, plateau, energy)
+
+    The 10% / 90% levels are of the load swing v_start -> v_end of vd,
+    energy is the FET loss in excess of the final (settled) loss. All four
+    are NaN where the swing is below MIN_SWING of Vdd.
+    """
+    swing = v_end - v_start
+    switching = np.abs(swing) > MIN_SWING * np.abs(Vdd)
+    # +1 falling, -1 rising, 0 never crosses
+    direction = np.where(switching, np.sign(swing), 0)
+    level_10 = v_start + 0.1 * swing
+    level_90 = v_start + 0.9 * swing
+    t_10 = np.full(vg.shape, np.nan)
+    t_90 = np.full(vg.shape, np.nan)
+    plateau = np.zeros(vg.shape)
+    energy = np.zeros(vg.shape)
+    Id_end, _, _ = square_law(Vdrive - Vth, np.maximum(v_end, 0), K, 0)
+    P_end = Id_end * v_end
+
+    # Linearly implicit step: (C/dt - df/dx) dx = f(x)
+    C11 = (Cg + Cgd) / dt
+    C12 = -Cgd / dt
+    C22 = (Cgd + Cds) / dt
+    t = 0.0
+    for _ in range(steps):
+        vds = np.maximum(vd, 0)
+        Id, gm, gds = square_law(vg - Vth, vds, K, 0)
+        fg = (Vdrive - vg) / Rg
+        fd = (Vdd - vd) / Rload - Id
+        A11 = C11 + 1 / Rg
+        A21 = C12 + gm
+        A22 = C22 + 1 / Rload + gds
+        det = A11 * A22 - C12 * A21
+        dvg = (fg * A22 - C12 * fd) / det
+        dvd = (A11 * fd - A21 * fg) / det
+
+        saturated = (vg > Vth) & (vds >= vg - Vth)
+        plateau += np.where(saturated, dt, 0)
+        energy += (Id * vds - P_end) * dt
+
+        vd_next = vd + dvd
+        for level, crossed in ((level_10, t_10), (level_90, t_90)):
+            # Strictly before the level at vd, at or past it at vd_next
+            hit = (np.isnan(crossed) & (direction * (vd - level) < 0)
+                   & (direction * (vd_next - level) >= 0))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossed[hit] = (t + dt * (vd - level) / (vd - vd_next))[hit]
+        vg += dvg
+        vd[...] = vd_next
+        t = t + dt
+    plateau[~switching] = np.nan
+    energy[~switching] = np.nan
+    return t_10, t_90 - t_10, plateau, energy
+
+
+def simulate_switching(Vdrive, Vdd, Rload, Vth, K, Cgs, Cgd, Rg_on, Rg_off=None, Cds=0, Cext=0,
+                       polarity=1, steps=4000, duration=None):
+    """
+    Turn-on then turn-off of a FET switching Rload from Vdd, gate driven
+    from 0 to Vdrive through Rg_on and back through Rg_off
+
+    Vdrive, Vdd: magnitudes of the gate drive and the supply
+    Vth, K: library parameters, Vth signed as in the library with
+            polarity -1 for P-Chan
+    Cgs, Cgd, Cds: FET capacitances (F), Cgd + Cds must be > 0
+    Cext: external capacitor from gate to source
+    duration: simulated time per edge (s), by default ten gate time
+              constants plus the Miller charge Cgd * Vdd at the plateau
+              current
+
+    Returns
+    -------
+    numpy structured array of SWITCHING_DTYPE, times in s and energies in J.
+    Edges which do not cross their 10% / 90% levels are NaN, all edge
+    metrics are NaN where Vdrive <= Vth (the FET never turns on).
+    """
+    Rg_off = Rg_on if Rg_off is None else Rg_off
+    Vdrive, Vdd, Rload, Vth, K, Cgs, Cgd, Cds, Cext, Rg_on, Rg_off = np.broadcast_arrays(
+        *[np.asarray(value, dtype=float) for value in
+          (Vdrive, Vdd, Rload, Vth, K, Cgs, Cgd, Cds, Cext, Rg_on, Rg_off)])
+    Vth = polarity * Vth
+    Cg = Cgs + Cext
+
+    vds_on, id_on = on_state(Vdrive, Vdd, Rload, Vth, K)
+    if duration is None:
+        plateau_drive = np.maximum(Vdrive - Vth, 0.1 * Vdrive)
+        miller = Cgd * Vdd / plateau_drive
+        duration = 10 * (Cg + Cgd) + miller
+        duration_on = duration * Rg_on
+        duration_off = duration * Rg_off
+    else:
+        duration_on = duration_off = np.broadcast_to(np.asarray(duration, dtype=float), Vdd.shape)
+
+    result = np.empty(Vdd.shape, dtype=SWITCHING_DTYPE)
+    result["vds_on"] = vds_on
+    result["id_on"] = id_on
+
+    vg = np.zeros(Vdd.shape)
+    vd = Vdd.copy()
+    with np.errstate(invalid="ignore"):
+        on = _edge(vg, vd, Vdrive, Vdd, Rload, Rg_on, Cg, Cgd, Cds, Vth, K,
+                   duration_on / steps, steps, Vdd, vds_on)
+        # Turn-off starts from the settled on-state
+        vg[...] = Vdrive
+        vd[...] = vds_on
+        off = _edge(vg, vd, np.zeros(Vdd.shape), Vdd, Rload, Rg_off, Cg, Cgd, Cds, Vth, K,
+                    duration_off / steps, steps, vds_on, Vdd)
+    off_drive = Vdrive <= Vth
+    for prefix, metrics in (("on", on), ("off", off)):
+        for name, value in zip(("delay", "edge", "plateau", "energy"), metrics):
+            result["{0}_{1}".format(name, prefix)] = np.where(off_drive, np.nan, value)
+    return result
+
+
+def pick_gate_capacitor(target_edge, Vdrive, Vdd, Rload, Vth, K, Cgs, Cgd, Rg_on, Rg_off=None,
+                        Cds=0, polarity=1, series="stock", edge="on", position="gs", steps=4000):
+    """
+    Returns (capacitor, achieved edge time) of the standard capacitor whose
+    10-90% load edge is closest (by ratio) to target_edge, all capacitors
+    of the series are simulated in one batch. Scalar circuit parameters.
+
+    edge: "on" or "off", the edge to match
+    position: "gs" gate to source, "gd" gate to drain (Miller capacitor)
+
+    Raises
+    ------
+    ValueError
+        If no capacitor of the series produces a complete edge
+    """
+    values = np.array(CAPACITORS[series].values, dtype=float)
+    Cext_gs = values if position == "gs" else 0
+    Cgd_total = Cgd + values if position == "gd" else Cgd
+    result = simulate_switching(Vdrive, Vdd, Rload, Vth, K, Cgs, Cgd_total, Rg_on, Rg_off, Cds,
+                                Cext_gs, polarity, steps)
+    edges = result["edge_" + edge]
+    valid = np.isfinite(edges) & (edges > 0)
+    if not valid.any():
+        raise ValueError("No {0} capacitor gives a complete {1} edge".format(series, edge))
+    error = np.where(valid, np.abs(np.log(edges / target_edge)), np.inf)
+    best = int(np.argmin(error))
+    return values[best], edges[best]
+
+
+def _si(value, unit):
+    return "n/a" if np.isnan(value) else toSI(value, unit)
+
+
+def main():
+    from device_library import default_library
+
+    parser = argparse.ArgumentParser(description="Gate drive switching transients")
+    parser.add_argument("--part", default="dmc3016lsd:P", help="library FET, part[:channel]")
+    parser.add_argument("--cgs", type=float, required=True, help="gate-source capacitance (F)")
+    parser.add_argument("--cgd", type=float, required=True, help="gate-drain capacitance (F)")
+    parser.add_argument("--cds", type=float, default=0, help="drain-source capacitance (F)")
+    parser.add_argument("--vdrive", type=float, default=5)
+    parser.add_argument("--vdd", type=float, default=12)
+    parser.add_argument("--rload", type=float, default=2)
+    parser.add_argument("--rg-on", type=float, default=1e3)
+    parser.add_argument("--rg-off", type=float, default=120e3)
+    parser.add_argument("--target-edge", type=float, help="pick a gate capacitor for this edge time (s)")
+    parser.add_argument("--edge", choices=("on", "off"), default="on")
+    parser.add_argument("--position", choices=("gs", "gd"), default="gs")
+    args = parser.parse_args()
+
+    part, _, channel = args.part.partition(":")
+    Q = default_library().fet(part, channel or None)
+    polarity = -1 if Q.channel == "P" else 1
+    result = simulate_switching(args.vdrive, args.vdd, args.rload, Q.Vth, Q.K, args.cgs, args.cgd,
+                                args.rg_on, args.rg_off, args.cds, polarity=polarity)
+    print("Fet: {0} {1}\tVdrive={2}V\tVdd={3}V\tRload={4}\tRg on/off={5}/{6}".format(
+        Q.name.upper(), Q.channel, args.vdrive, args.vdd, toSI(args.rload), toSI(args.rg_on), toSI(args.rg_off)))
+    print("On-state\tVds={0:.3f}V\tId={1:.3f}A".format(abs(result["vds_on"]), result["id_on"]))
+    print("{0:5s} {1:>10s} {2:>10s} {3:>10s} {4:>10s}".format("Edge", "Delay", "10-90%", "Plateau", "Energy"))
+    for edge in ("on", "off"):
+        print("{0:5s} {1:>10s} {2:>10s} {3:>10s} {4:>10s}".format(
+            edge, _si(result["delay_" + edge], "s"), _si(result["edge_" + edge], "s"),
+            _si(result["plateau_" + edge], "s"), _si(result["energy_" + edge], "J")))
+
+    if args.target_edge:
+        C, achieved = pick_gate_capacitor(args.target_edge, args.vdrive, args.vdd, args.rload, Q.Vth, Q.K,
+                                          args.cgs, args.cgd, args.rg_on, args.rg_off, args.cds,
+                                          polarity=polarity, edge=args.edge, position=args.position)
+        print("C_{0}={1}\t{2} edge {3} (target {4})".format(
+            args.position, toSI(C, "F"), args.edge, toSI(achieved, "s"), toSI(args.target_edge, "s")))
+
+
+if __name__ == "__main__":
+    main()
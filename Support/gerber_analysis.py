@@ -0,0 +1,544 @@
+#!/usr/bin/python3
+# Board outline, drill and copper statistics of the fabrication archives
+#
+# python3 gerber_analysis.py                          # every Outputs/*.zip
+# python3 gerber_analysis.py ../Outputs/DL-3.2.1-MB_PCB4.zip --resolution 0.05
+# python3 gerber_analysis.py --workers 1 --no-copper
+#
+# report = analyze_archive(ARCHIVES[-1])
+# report.outline, report.fits, report.layers["GTL"].copper_area
+#
+# Gerber (RS-274X) layers and the Excellon drill file are read straight
+# from the zip members as text streams in fixed size chunks, nothing is
+# extracted. Every layer is an independent task for a process pool; workers
+# get the archive path and member name and open the zip themselves.
+#
+# Only the subset Altium writes is interpreted: FS / MO, C, R and O
+# apertures, D01/D02/D03, G01/G02/G03 with G75 arcs, G36/G37 regions and
+# LPD/LPC polarity. Silkscreen and mechanical layers are reduced to counts
+# and the bounding box while streaming. Copper layers keep their geometry
+# and are rasterized at the end (resolution mm per pixel, clear polarity
+# erases), so the copper area is exact up to the pixel size. Apertures
+# drawn as strokes are taken as round.
+#
+# The outline is the bounding box of the mechanical 1 layer (GM1, the keep
+# out layer GKO if there is none), checked against the README limits in
+# either orientation: 24 x 18 cm for the primary (mainboard) and 24 x 13 cm
+# for the secondary (connector board) archives.
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import glob
+import io
+import math
+import os
+import re
+import sys
+import zipfile
+
+import numpy as np
+
+from device_library import DATA_DIR
+
+OUTPUT_DIR = os.path.join(os.path.dirname(DATA_DIR), "Outputs")
+ARCHIVES = sorted(glob.glob(os.path.join(OUTPUT_DIR, "*.zip")))
+
+# Board limits in mm (README), larger side first
+BOARD_LIMITS = {"primary": (240.0, 180.0), "secondary": (240.0, 130.0)}
+
+# Outline tolerance in mm, the boards are drawn exactly at the limit
+OUTLINE_TOLERANCE = 0.05
+
+LAYER_NAMES = {
+    "GTL": "top copper", "GBL": "bottom copper", "GTO": "top overlay", "GBO": "bottom overlay",
+    "GTS": "top solder mask", "GBS": "bottom solder mask", "GTP": "top paste", "GBP": "bottom paste",
+    "GKO": "keep out", "GD1": "drill drawing", "GG1": "drill guide", "GPT": "top pad master",
+    "GPB": "bottom pad master", "TXT": "drill",
+}
+COPPER_LAYER = re.compile(r"^(GTL|GBL|G\d+)$")
+MECHANICAL_LAYER = re.compile(r"^GM\d+$")
+OUTLINE_LAYERS = ("GM1", "GKO")
+
+CHUNK = 1 << 16
+
+# bbox: (xmin, ymin, xmax, ymax) in mm including the aperture sizes, None
+# for an empty layer; extent: the same of the coordinates alone (the centre
+# line of an outline); copper_area in mm^2, None when not rasterized
+LayerStats = namedtuple("LayerStats", ["name", "kind", "bbox", "extent", "flashes", "draws", "arcs",
+                                       "regions", "copper_area"])
+
+# tools: {tool number: (diameter mm, plated, hits)}
+DrillStats = namedtuple("DrillStats", ["name", "bbox", "holes", "tools"])
+
+# outline: (width, height) mm, limit: key of BOARD_LIMITS, fits: outline
+# within the limit (None without an outline layer)
+BoardReport = namedtuple("BoardReport", ["archive", "outline", "limit", "fits", "layers", "drills"])
+
+_COORDINATE = re.compile(r"(?:G0?([123]))?(?:X([+-]?\d+))?(?:Y([+-]?\d+))?(?:I([+-]?\d+))?(?:J([+-]?\d+))?"
+                         r"D0?([123])$")
+_FORMAT = re.compile(r"FS([LT])([AI])X(\d)(\d)Y(\d)(\d)")
+_APERTURE = re.compile(r"ADD(\d+)([A-Za-z]\w*),([\d.X]+)")
+_DRILL_TOOL = re.compile(r"T(\d+)(?:F\d+)?(?:S\d+)?C([\d.]+)")
+OPERATIONS = ("D01", "D02", "D03", "D1", "D2", "D3")
+
+_DRILL_HIT = re.compile(r"(?:X([+-]?[\d.]+))?(?:Y([+-]?[\d.]+))?$")
+
+
+def layer_kind(name):
+    extension = name.rsplit(".", 1)[-1]
+    if COPPER_LAYER.match(extension):
+        return LAYER_NAMES.get(extension, "inner copper")
+    if MECHANICAL_LAYER.match(extension):
+        return "mechanical {0}".format(extension[2:])
+    return LAYER_NAMES.get(extension)
+
+
+def board_limit(archive):
+    """Returns the BOARD_LIMITS key of an archive, connector boards (CB) are secondary"""
+    return "secondary" if re.search(r"(^|[-_])CB([-_]|$)", os.path.basename(archive)) else "primary"
+
+
+def _text_stream(archive, name):
+    return io.TextIOWrapper(archive.open(name), encoding="ascii", errors="replace")
+
+
+def gerber_words(stream, chunk=CHUNK):
+    """Yields the '*' terminated words of a Gerber stream, % delimiters removed"""
+    tail = ""
+    while True:
+        data = stream.read(chunk)
+        if not data:
+            break
+        words = (tail + data).split("*")
+        tail = words.pop()
+        for word in words:
+            word = word.replace("%", "").strip()
+            if word:
+                yield word
+    tail = tail.replace("%", "").strip()
+    if tail:
+        yield tail
+
+
+def _arc(x0, y0, x1, y1, i, j, clockwise, max_step=math.radians(10)):
+    """Returns the points after (x0, y0) of a G75 arc around (x0 + i, y0 + j)"""
+    cx, cy = x0 + i, y0 + j
+    a0 = math.atan2(y0 - cy, x0 - cx)
+    a1 = math.atan2(y1 - cy, x1 - cx)
+    sweep = a1 - a0
+    if clockwise:
+        sweep = sweep - 2 * math.pi if sweep >= 0 else sweep
+    else:
+        sweep = sweep + 2 * math.pi if sweep <= 0 else sweep
+    if abs(x1 - x0) + abs(y1 - y0) > 0 and abs(abs(sweep) - 2 * math.pi) < 1e-9:
+        sweep = 0.0
+    r = math.hypot(x0 - cx, y0 - cy)
+    n = max(1, int(math.ceil(abs(sweep) / max_step)))
+    points = [(cx + r * math.cos(a0 + sweep * k / n), cy + r * math.sin(a0 + sweep * k / n)) for k in range(1, n)]
+    points.append((x1, y1))
+    return points
+
+
+class GerberLayer:
+    """
+    Interpreter state of one Gerber layer. feed() every word, counts and
+    the bounding box are kept as it goes, the geometry only with keep=True
+    as (dark, kind, data) items in file order.
+    """
+    def __init__(self, name, keep=False):
+        self.name = name
+        self.keep = keep
+        self.scale = 25.4      # mm per unit
+        self.divisor = 1e5
+        self.apertures = {}    # D code: (shape, sizes in mm)
+        self.aperture = None
+        self.mode = 1
+        self.region = None
+        self.dark = True
+        self.x = self.y = 0.0
+        self.bbox = [math.inf, math.inf, -math.inf, -math.inf]
+        self.extent = [math.inf, math.inf, -math.inf, -math.inf]
+        self.counts = Counter()
+        self.objects = []
+
+    def _extend(self, x, y, r=0.0):
+        extent = self.extent
+        if x < extent[0]:
+            extent[0] = x
+        if y < extent[1]:
+            extent[1] = y
+        if x > extent[2]:
+            extent[2] = x
+        if y > extent[3]:
+            extent[3] = y
+        bbox = self.bbox
+        if x - r < bbox[0]:
+            bbox[0] = x - r
+        if y - r < bbox[1]:
+            bbox[1] = y - r
+        if x + r > bbox[2]:
+            bbox[2] = x + r
+        if y + r > bbox[3]:
+            bbox[3] = y + r
+
+    def _radius(self):
+        shape, sizes = self.apertures.get(self.aperture, ("C", (0.0,)))
+        return max(sizes) / 2 if shape != "C" else sizes[0] / 2
+
+    def _coordinate(self, match):
+        mode, x, y, i, j, operation = match.groups()
+        if mode:
+            self.mode = int(mode)
+        scale = self.scale / self.divisor
+        x0, y0 = self.x, self.y
+        x1 = int(x) * scale if x is not None else x0
+        y1 = int(y) * scale if y is not None else y0
+        operation = int(operation)
+        if operation == 1:
+            if self.mode == 1:
+                points = [(x1, y1)]
+            else:
+                self.counts["arcs"] += 1
+                points = _arc(x0, y0, x1, y1, int(i or 0) * scale, int(j or 0) * scale, self.mode == 2)
+            if self.region is not None:
+                self.region.extend(points)
+                for px, py in points:
+                    self._extend(px, py)
+            else:
+                self.counts["draws"] += 1
+                r = self._radius()
+                px, py = x0, y0
+                for qx, qy in points:
+                    self._extend(qx, qy, r)
+                    if self.keep:
+                        self.objects.append((self.dark, "line", (px, py, qx, qy, r)))
+                    px, py = qx, qy
+                self._extend(x0, y0, r)
+        elif operation == 2:
+            if self.region is not None:
+                self._close_region()
+                self.region = [(x1, y1)]
+        else:
+            self.counts["flashes"] += 1
+            shape, sizes = self.apertures.get(self.aperture, ("C", (0.0,)))
+            if shape == "C":
+                self._extend(x1, y1, sizes[0] / 2)
+            else:
+                w, h = sizes[0] / 2, sizes[-1] / 2
+                self._extend(x1 - w, y1 - h)
+                self._extend(x1 + w, y1 + h)
+            if self.keep:
+                self.objects.append((self.dark, "flash", (x1, y1, shape, sizes)))
+        self.x, self.y = x1, y1
+
+    def _close_region(self):
+        if self.region is not None and len(self.region) > 2:
+            self.counts["regions"] += 1
+            if self.keep:
+                self.objects.append((self.dark, "region", np.array(self.region)))
+
+    def feed(self, word):
+        first = word[0]
+        if first in "XYIJ" or word in OPERATIONS or (first == "G" and len(word) > 3 and word[3] in "XYIJD"):
+            match = _COORDINATE.match(word)
+            if match:
+                self._coordinate(match)
+                return
+        if first == "D":
+            self.aperture = int(word[1:])
+        elif word.startswith("G04"):
+            return
+        elif word in ("G01", "G02", "G03"):
+            self.mode = int(word[1:])
+        elif word == "G36":
+            self.region = [(self.x, self.y)]
+        elif word == "G37":
+            self._close_region()
+            self.region = None
+        elif word.startswith("FS"):
+            match = _FORMAT.match(word)
+            self.divisor = 10.0**int(match.group(4))
+        elif word in ("MOIN", "G70"):
+            self.scale = 25.4
+        elif word in ("MOMM", "G71"):
+            self.scale = 1.0
+        elif word.startswith("ADD"):
+            match = _APERTURE.match(word)
+            sizes = tuple(float(size) * self.scale for size in match.group(3).split("X"))
+            self.apertures[int(match.group(1))] = (match.group(2), sizes)
+        elif word in ("LPD", "LPC"):
+            self.dark = word == "LPD"
+
+    def stats(self, kind, copper_area=None):
+        empty = self.bbox[0] > self.bbox[2]
+        return LayerStats(self.name, kind, None if empty else tuple(self.bbox),
+                          None if empty else tuple(self.extent), self.counts["flashes"], self.counts["draws"],
+                          self.counts["arcs"], self.counts["regions"], copper_area)
+
+
+class Raster:
+    """Boolean pixel grid over a bounding box, pixel centres are sampled"""
+    def __init__(self, bbox, resolution):
+        self.x0, self.y0 = bbox[0], bbox[1]
+        self.resolution = resolution
+        nx = int(math.ceil((bbox[2] - bbox[0]) / resolution)) + 1
+        ny = int(math.ceil((bbox[3] - bbox[1]) / resolution)) + 1
+        self.pixels = np.zeros((ny, nx), dtype=bool)
+
+    def _window(self, xmin, ymin, xmax, ymax):
+        """Returns (row slice, column slice, pixel centre y, x) of a box"""
+        res = self.resolution
+        ny, nx = self.pixels.shape
+        c0 = max(int(math.floor((xmin - self.x0) / res)), 0)
+        c1 = min(int(math.ceil((xmax - self.x0) / res)) + 1, nx)
+        r0 = max(int(math.floor((ymin - self.y0) / res)), 0)
+        r1 = min(int(math.ceil((ymax - self.y0) / res)) + 1, ny)
+        y = self.y0 + (np.arange(r0, r1) + 0.5) * res
+        x = self.x0 + (np.arange(c0, c1) + 0.5) * res
+        return slice(r0, r1), slice(c0, c1), y[:, None], x[None, :]
+
+    def segment(self, x0, y0, x1, y1, r, dark):
+        rows, cols, y, x = self._window(min(x0, x1) - r, min(y0, y1) - r, max(x0, x1) + r, max(y0, y1) + r)
+        dx, dy = x1 - x0, y1 - y0
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else np.clip(((x - x0) * dx + (y - y0) * dy) / length2, 0, 1)
+        inside = (x - x0 - t * dx)**2 + (y - y0 - t * dy)**2 <= r * r
+        self._paint(rows, cols, inside, dark)
+
+    def rectangle(self, x, y, w, h, dark):
+        rows, cols, py, px = self._window(x - w / 2, y - h / 2, x + w / 2, y + h / 2)
+        inside = (np.abs(px - x) <= w / 2) & (np.abs(py - y) <= h / 2)
+        self._paint(rows, cols, inside, dark)
+
+    def flash(self, x, y, shape, sizes, dark):
+        if shape == "C":
+            self.segment(x, y, x, y, sizes[0] / 2, dark)
+        elif shape == "R":
+            self.rectangle(x, y, sizes[0], sizes[-1], dark)
+        else:
+            # Obround: a stroke of the smaller size between the end centres
+            w, h = sizes[0], sizes[-1]
+            r = min(w, h) / 2
+            dx, dy = (w / 2 - r, 0.0) if w >= h else (0.0, h / 2 - r)
+            self.segment(x - dx, y - dy, x + dx, y + dy, r, dark)
+
+    def polygon(self, points, dark):
+        """Even-odd fill: crossings of every edge with the pixel rows toggle a running parity"""
+        xs, ys = points[:, 0], points[:, 1]
+        rows, cols, y, x = self._window(xs.min(), ys.min(), xs.max(), ys.max())
+        if x.size == 0 or y.size == 0:
+            return
+        y = y[:, 0]
+        x0, y0 = xs, ys
+        x1, y1 = np.roll(xs, -1), np.roll(ys, -1)
+        lo, hi = np.minimum(y0, y1), np.maximum(y0, y1)
+        first = np.searchsorted(y, lo, side="left")
+        last = np.searchsorted(y, hi, side="left")
+        n = last - first
+        edge = np.repeat(np.arange(len(xs)), n)
+        if edge.size == 0:
+            return
+        row = np.arange(edge.size) - np.repeat(np.cumsum(n) - n, n) + first[edge]
+        t = (y[row] - y0[edge]) / (y1[edge] - y0[edge])
+        crossing = x0[edge] + t * (x1[edge] - x0[edge])
+        column = np.clip(np.ceil((crossing - x[0, 0]) / self.resolution).astype(np.intp), 0, x.size)
+        toggles = np.zeros((y.size, x.size + 1), dtype=np.uint8)
+        np.add.at(toggles, (row, column), 1)
+        inside = np.bitwise_xor.accumulate(toggles & 1, axis=1)[:, :-1].astype(bool)
+        self._paint(rows, cols, inside, dark)
+
+    def _paint(self, rows, cols, inside, dark):
+        window = self.pixels[rows, cols]
+        if dark:
+            window |= inside
+        else:
+            window &= ~inside
+
+    def area(self):
+        return float(self.pixels.sum()) * self.resolution**2
+
+
+def copper_area(layer, resolution):
+    """Returns the copper area in mm^2 of a GerberLayer read with keep=True"""
+    if layer.bbox[0] > layer.bbox[2]:
+        return 0.0
+    raster = Raster(layer.bbox, resolution)
+    for dark, kind, data in layer.objects:
+        if kind == "line":
+            raster.segment(*data, dark)
+        elif kind == "flash":
+            raster.flash(*data, dark)
+        else:
+            raster.polygon(data, dark)
+    return raster.area()
+
+
+def read_gerber(stream, name, keep=False):
+    layer = GerberLayer(name, keep)
+    for word in gerber_words(stream):
+        layer.feed(word)
+    layer._close_region()
+    return layer
+
+
+def _drill_number(text, integer, decimals, zeros):
+    if "." in text:
+        return float(text)
+    sign = -1 if text.startswith("-") else 1
+    digits = text.lstrip("+-")
+    if zeros == "LZ":
+        # Leading zeros kept, trailing zeros suppressed
+        digits = digits.ljust(integer + decimals, "0")
+    return sign * int(digits) / 10.0**decimals
+
+
+def read_drills(stream, name):
+    """Returns the DrillStats of an Excellon stream"""
+    scale, integer, decimals, zeros = 25.4, 2, 4, "TZ"
+    tools, hits = {}, Counter()
+    plated = True
+    tool = None
+    header = True
+    x = y = 0.0
+    bbox = [math.inf, math.inf, -math.inf, -math.inf]
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if header:
+            if line.startswith(";FILE_FORMAT="):
+                integer, decimals = (int(part) for part in line.split("=", 1)[1].split(":"))
+            elif line.startswith(";TYPE="):
+                plated = line == ";TYPE=PLATED"
+            elif line.startswith(("INCH", "METRIC")):
+                scale = 25.4 if line.startswith("INCH") else 1.0
+                zeros = "LZ" if line.endswith("LZ") else "TZ"
+            elif line in ("%", "M95"):
+                header = False
+            else:
+                match = _DRILL_TOOL.match(line)
+                if match:
+                    tools[int(match.group(1))] = (float(match.group(2)) * scale, plated)
+            continue
+        if line[0] == "T":
+            tool = int(line[1:]) if line[1:].isdigit() else tool
+        elif line[0] in "XY":
+            match = _DRILL_HIT.match(line)
+            if match:
+                if match.group(1):
+                    x = _drill_number(match.group(1), integer, decimals, zeros) * scale
+                if match.group(2):
+                    y = _drill_number(match.group(2), integer, decimals, zeros) * scale
+                hits[tool] += 1
+                bbox = [min(bbox[0], x), min(bbox[1], y), max(bbox[2], x), max(bbox[3], y)]
+        elif line == "M30":
+            break
+    table = {number: (diameter, plated, hits[number]) for number, (diameter, plated) in tools.items()}
+    return DrillStats(name, tuple(bbox) if bbox[0] <= bbox[2] else None, sum(hits.values()), table)
+
+
+def analyze_member(path, name, resolution=0.05, copper=True):
+    """
+    Returns the LayerStats (DrillStats for the drill file) of one member
+    of the archive at path, read as a stream
+    """
+    with zipfile.ZipFile(path) as archive:
+        with _text_stream(archive, name) as stream:
+            if name.endswith(".TXT"):
+                return read_drills(stream, name)
+            kind = layer_kind(name)
+            keep = copper and COPPER_LAYER.match(name.rsplit(".", 1)[-1]) is not None
+            layer = read_gerber(stream, name, keep)
+    return layer.stats(kind, copper_area(layer, resolution) if keep else None)
+
+
+def layer_members(path):
+    """Returns the Gerber and drill members of an archive"""
+    with zipfile.ZipFile(path) as archive:
+        return [name for name in archive.namelist() if layer_kind(name) is not None]
+
+
+def _report(path, results):
+    layers = {}
+    drills = None
+    for result in results:
+        if isinstance(result, DrillStats):
+            drills = result
+        else:
+            layers[result.name.rsplit(".", 1)[-1]] = result
+    outline = None
+    for name in OUTLINE_LAYERS:
+        if name in layers and layers[name].extent is not None:
+            xmin, ymin, xmax, ymax = layers[name].extent
+            outline = (xmax - xmin, ymax - ymin)
+            break
+    limit = board_limit(path)
+    fits = None
+    if outline is not None:
+        fits = all(size <= maximum + OUTLINE_TOLERANCE
+                   for size, maximum in zip(sorted(outline, reverse=True), BOARD_LIMITS[limit]))
+    return BoardReport(os.path.basename(path), outline, limit, fits, layers, drills)
+
+
+def analyze_archives(paths=ARCHIVES, resolution=0.05, copper=True, workers=None):
+    """
+    Returns the BoardReports of the archives, every layer of every archive
+    is one task of a process pool (workers=1 runs in this process)
+    """
+    tasks = [(path, name) for path in paths for name in layer_members(path)]
+    args = ([path for path, _ in tasks], [name for _, name in tasks],
+            [resolution] * len(tasks), [copper] * len(tasks))
+    if workers == 1:
+        results = list(map(analyze_member, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(analyze_member, *args))
+    return [_report(path, [result for (task_path, _), result in zip(tasks, results) if task_path == path])
+            for path in paths]
+
+
+def analyze_archive(path, resolution=0.05, copper=True, workers=None):
+    return analyze_archives([path], resolution, copper, workers)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outline, drill and copper statistics of Gerber archives")
+    parser.add_argument("archives", nargs="*", help="zip archives, default Outputs/*.zip")
+    parser.add_argument("--resolution", type=float, default=0.05, help="copper raster pixel (mm)")
+    parser.add_argument("--no-copper", dest="copper", action="store_false", help="skip the copper areas")
+    parser.add_argument("--workers", type=int, help="worker processes, default one per core")
+    args = parser.parse_args()
+
+    reports = analyze_archives(args.archives or ARCHIVES, args.resolution, args.copper, args.workers)
+    failed = False
+    for report in reports:
+        if report.outline is None:
+            print("{0}: no outline layer".format(report.archive))
+        else:
+            maximum = BOARD_LIMITS[report.limit]
+            print("{0}: outline {1:.2f} x {2:.2f} mm, {3} limit {4:.0f} x {5:.0f} mm: {6}".format(
+                report.archive, report.outline[0], report.outline[1], report.limit, maximum[0], maximum[1],
+                "OK" if report.fits else "TOO LARGE"))
+            failed |= not report.fits
+        for name, layer in sorted(report.layers.items()):
+            area = ""
+            if layer.copper_area is not None:
+                area = "copper {0:9.1f} mm^2".format(layer.copper_area)
+                if report.outline is not None:
+                    area += " ({0:4.1f}% of outline box)".format(
+                        100 * layer.copper_area / (report.outline[0] * report.outline[1]))
+            print("  {0:5s} {1:18s} flashes {2:6d} draws {3:7d} arcs {4:5d} regions {5:5d} {6}".format(
+                name, layer.kind, layer.flashes, layer.draws, layer.arcs, layer.regions, area))
+        if report.drills is not None:
+            drills = report.drills
+            plated = sum(hits for _, is_plated, hits in drills.tools.values() if is_plated)
+            print("  drill {0} holes ({1} plated, {2} non-plated), {3} tools".format(
+                drills.holes, plated, drills.holes - plated, len(drills.tools)))
+            for number, (diameter, is_plated, hits) in sorted(drills.tools.items()):
+                print("    T{0:<3d} {1:6.3f} mm {2:10s} {3:5d}".format(
+                    number, diameter, "plated" if is_plated else "non-plated", hits))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+#!/usr/bin/python3
+# Monte Carlo tolerance analysis of the high/low switch (hi_low_switch_bias.py)
+#
+# All samples of a chunk are drawn as NumPy arrays and the whole circuit is
+# evaluated in one call of hi_low_switch_array. Samples are drawn in blocks
+# of SAMPLE_BLOCK by global sample index, block b from child b of
+# numpy.random.SeedSequence(seed), so sample i is the same board for any
+# chunk size, chunk order or number of worker processes. The yield is
+# exactly reproducible, the statistics up to the rounding of the chunk merge.
+#
+# The load is an active (constant current) load unless --resistive-load,
+# its current is then always load_current and only the power limits decide
+# the yield. The minimum load current is checked on the resistive load.
+#
+# python3 monte_carlo.py --samples 1000000
+# python3 monte_carlo.py --resistive-load --vsc 5
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+
+import numpy as np
+
+from device_library import default_library
+from switch_bias_arrays import hi_low_switch_array
+from switch_bias_functions import calculate_theoretical_load_resistor, toSI
+from topologies import driver_resistors
+
+# Metrics of HI_LOW_DTYPE tracked by the summary statistics
+METRICS = ("Id", "Vdrop", "P_q1", "P_q2", "P_q3")
+
+# Samples drawn from one child seed, chunks not aligned to it draw the
+# partial blocks at their ends in full
+SAMPLE_BLOCK = 8192
+
+
+class RunningStats:
+    """
+    Streaming count/mean/variance/min/max, chunks are merged with the
+    parallel variance update so memory does not grow with the sample count
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        other = RunningStats()
+        other.count = values.size
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean)**2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        return (self.m2 / (self.count - 1))**0.5 if self.count > 1 else 0.0
+
+
+class HiLowSwitchSpec:
+    """
+    Nominal design and spreads of the high/low switch
+
+    Resistors and supply are uniform within +-tolerance, Vth uniform between
+    the library Vth_min/Vth_max and beta uniform between beta_min/beta_max
+
+    tables: (table of Q1, table of Q2) from iv_tables.fet_table for parts
+    with channel-length modulation (fet_fit), which hi_low_switch_array
+    refines on, None for the closed forms. The tables pickle as their file
+    paths.
+    """
+    def __init__(self, Q1, Q2, Q3, Rb, R1, Vsc, Vsig, load_current, Rload,
+                 resistor_tolerance=0.05, supply_ripple=0.05, active_load=True, tables=None):
+        self.Q1 = Q1
+        self.Q2 = Q2
+        self.Q3 = Q3
+        self.Rb = Rb
+        self.R1 = R1
+        self.Vsc = Vsc
+        self.Vsig = Vsig
+        self.load_current = load_current
+        self.Rload = Rload
+        self.resistor_tolerance = resistor_tolerance
+        self.supply_ripple = supply_ripple
+        self.active_load = active_load
+        self.tables = tables
+
+    def sample(self, rng, n):
+        """Returns the hi_low_switch_array arguments for n random boards"""
+        def tolerance(nominal, tol):
+            return nominal * rng.uniform(1 - tol, 1 + tol, n)
+
+        def between(a, b):
+            return rng.uniform(min(a, b), max(a, b), n)
+
+        table_q1, table_q2 = self.tables if self.tables is not None else (None, None)
+        return dict(Vsig=self.Vsig,
+                    Vsc=tolerance(self.Vsc, self.supply_ripple),
+                    Rb=tolerance(self.Rb, self.resistor_tolerance),
+                    R1=tolerance(self.R1, self.resistor_tolerance),
+                    Rload=self.Rload,
+                    load_current=self.load_current,
+                    Vbe_sat=self.Q3.Vbe_sat,
+                    Vce_sat=self.Q3.Vce_sat,
+                    beta=between(self.Q3.beta_min, self.Q3.beta_max),
+                    Vth_q1=between(self.Q1.Vth_min, self.Q1.Vth_max),
+                    K_q1=self.Q1.K,
+                    Vth_q2=between(self.Q2.Vth_min, self.Q2.Vth_max),
+                    K_q2=self.Q2.K,
+                    active_load=self.active_load,
+                    table_q1=table_q1,
+                    table_q2=table_q2)
+
+
+class YieldCriteria:
+    """Pass limits for one board, None disables a limit"""
+    def __init__(self, min_load_current=None, max_q2_power=None, max_q3_power=None):
+        self.min_load_current = min_load_current
+        self.max_q2_power = max_q2_power
+        self.max_q3_power = max_q3_power
+
+    def passed(self, result):
+        ok = np.ones(result.shape, dtype=bool)
+        if self.min_load_current is not None:
+            ok &= result["Id"] >= self.min_load_current
+        if self.max_q2_power is not None:
+            ok &= result["P_q2"] <= self.max_q2_power
+        if self.max_q3_power is not None:
+            ok &= result["P_q3"] <= self.max_q3_power
+        return ok
+
+
+def _draw(spec, seed, start, stop):
+    """Returns the hi_low_switch_array arguments of the samples start to stop"""
+    blocks = []
+    for block in range(start // SAMPLE_BLOCK, -(-stop // SAMPLE_BLOCK)):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+        offset = block * SAMPLE_BLOCK
+        window = slice(max(start - offset, 0), min(stop - offset, SAMPLE_BLOCK))
+        blocks.append({name: value[window] if isinstance(value, np.ndarray) else value
+                       for name, value in spec.sample(rng, SAMPLE_BLOCK).items()})
+    return {name: np.concatenate([b[name] for b in blocks]) if isinstance(value, np.ndarray) else value
+            for name, value in blocks[0].items()}
+
+
+def _run_chunk(spec, criteria, seed, start, stop):
+    result = hi_low_switch_array(**_draw(spec, seed, start, stop))
+    stats = {name: RunningStats() for name in METRICS}
+    for name in METRICS:
+        stats[name].update(result[name])
+    return int(criteria.passed(result).sum()), stats
+
+
+def run_monte_carlo(spec, criteria, samples=100000, seed=0, chunk_size=100000, workers=None):
+    """
+    Evaluate samples random boards in chunks of chunk_size
+
+    workers: None or 1 runs in this process, otherwise the chunks are spread
+             over a ProcessPoolExecutor with that many processes
+
+    Returns
+    -------
+    (yield fraction, {metric: RunningStats})
+    """
+    starts = list(range(0, samples, chunk_size))
+    stops = [min(start + chunk_size, samples) for start in starts]
+
+    if workers is None or workers <= 1:
+        chunks = (_run_chunk(spec, criteria, seed, start, stop) for start, stop in zip(starts, stops))
+        return _summarize(chunks, samples)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(_run_chunk, [spec] * len(starts), [criteria] * len(starts), [seed] * len(starts),
+                              starts, stops)
+        return _summarize(chunks, samples)
+
+
+def _summarize(chunks, samples):
+    passed = 0
+    stats = {name: RunningStats() for name in METRICS}
+    for chunk_passed, chunk_stats in chunks:
+        passed += chunk_passed
+        for name in METRICS:
+            stats[name].merge(chunk_stats[name])
+    return passed / samples, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo yield of the high/low switch")
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--vsc", type=float, default=14.7)
+    parser.add_argument("--vsig", type=float, default=5)
+    parser.add_argument("--max-q2-power", type=float, default=0.5)
+    parser.add_argument("--max-q3-power", type=float, default=0.25)
+    parser.add_argument("--resistive-load", action="store_true",
+                        help="resistive instead of active load, the yield then also requires a load current "
+                             "of at least the design load current (an active load always draws it)")
+    args = parser.parse_args()
+
+    library = default_library()
+    Q1 = library.fet("dmc3016lsd", "P")
+    Q2 = library.fet("dmc3016lsd", "N")
+    Q3 = library.bjt("bc848b")
+
+    # Same design procedure as hi_low_switch_bias.py
+    load_current = 2.5
+    driver = driver_resistors(Q3, drive_voltage=5, base_current=0.01e-3, collector_current=0.1e-3,
+                              design_vcc=14.7, desired_vce=Q3.Vce_sat)
+    Rb, R1 = driver.Rb, driver.R1
+    Rload = calculate_theoretical_load_resistor(power=12.5, I=load_current)
+
+    active_load = not args.resistive_load
+    spec = HiLowSwitchSpec(Q1, Q2, Q3, Rb, R1, args.vsc, args.vsig, load_current, Rload, active_load=active_load)
+    # Id of an active load is load_current by construction
+    criteria = YieldCriteria(min_load_current=None if active_load else load_current,
+                             max_q2_power=args.max_q2_power,
+                             max_q3_power=args.max_q3_power)
+    yield_fraction, stats = run_monte_carlo(spec, criteria, args.samples, args.seed,
+                                            args.chunk_size, args.workers)
+
+    print("Fet\tP(Q1): {0}\tN(Q2): {1}\tRb(Ohm)={2}\tR1(Ohm)={3}".format(
+        Q1.name.upper(), Q2.name.upper(), toSI(Rb), toSI(R1)))
+    print("Samples: {0}\tSeed: {1}\tYield: {2:.4%}".format(args.samples, args.seed, yield_fraction))
+    print("{0:8s} {1:>10s} {2:>10s} {3:>10s} {4:>10s}".format("Metric", "Mean", "Std", "Min", "Max"))
+    for name in METRICS:
+        s = stats[name]
+        print("{0:8s} {1:>10.4g} {2:>10.4g} {3:>10.4g} {4:>10.4g}".format(name, s.mean, s.std, s.min, s.max))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/python3
+# Series / parallel resistor networks of up to three standard values
+#
+# synthesizer = NetworkSynthesizer("E96")
+# synthesizer.resistance([3.14e3, 0.05], k=3, bom=[10e3, 4.7e3])
+# synthesizer.ratio([0.2487], k=3, total=(10e3, 1e6))
+#
+# python3 network_synthesis.py 3140 27.3k --series E96 -k 5
+# python3 network_synthesis.py --ratio 0.2487 --total 10k 1M
+#
+# Topologies: R, R+R, R||R, R+R+R, (R+R)||R, (R||R)+R, R||R||R. Networks are
+# found meet-in-the-middle: all two-resistor networks are built and sorted
+# once, a three-resistor network is one standard value c in series with or
+# across a two-resistor network, whose needed value for the target is
+# looked up by bisection for every c at once. The k neighbours on either
+# side of every lookup are the k best networks for that c, so the top k
+# overall are among them without enumerating the ~10^8 triples.
+#
+# Ranking is by error, networks within tolerance of the target count as
+# equally good and are ordered by part count, then by the number of values
+# which are not already on the BOM. With a tolerance every lookup takes the
+# whole band of inner networks that land within it plus k either side, so
+# the top k stay exact under that ranking; targets that already have k
+# in-band networks of fewer parts skip the larger networks, which cannot
+# rank above them.
+from collections import namedtuple
+import argparse
+
+import numpy as np
+
+from component_values import RESISTORS
+from switch_bias_functions import fromSI, toSI
+
+# values: the resistors in the order they appear in topology
+Network = namedtuple("Network", ["resistance", "topology", "values", "error"])
+RatioMatch = namedtuple("RatioMatch", ["R1", "R2", "ratio", "error"])
+
+TOPOLOGIES = ("R", "R+R", "R||R", "R+R+R", "(R+R)||R", "(R||R)+R", "R||R||R")
+_PARTS = np.array([1, 2, 2, 3, 3, 3, 3])
+# Topology code of an inner network with one more resistor in series, in parallel
+_SERIES = np.array([1, 3, 5])
+_PARALLEL = np.array([2, 4, 6])
+
+# Targets evaluated together, bounds the size of the candidate arrays
+CHUNK = 64
+# Three-resistor candidates evaluated together when a tolerance widens the
+# lookups, fewer targets per chunk the wider their bands
+CANDIDATES = 1 << 20
+
+
+class _Table:
+    """Networks sorted by resistance, components (n, 3) NaN padded"""
+    def __init__(self, resistance, topology, components):
+        order = np.argsort(resistance, kind="stable")
+        self.resistance = resistance[order]
+        self.topology = topology[order]
+        self.components = components[order]
+        self.parts = _PARTS[self.topology[0]]
+
+    def __len__(self):
+        return len(self.resistance)
+
+    def count(self, low, high):
+        """Returns the number of entries in [low, high]"""
+        return np.searchsorted(self.resistance, high, side="right") - np.searchsorted(self.resistance, low)
+
+    def window(self, low, high, k):
+        """
+        Returns indices (..., w) of the entries in [low, high] and the k
+        either side, rows narrower than w padded by repeating their last
+        """
+        start = np.searchsorted(self.resistance, low) - k
+        stop = np.searchsorted(self.resistance, high, side="right") + k
+        width = int((stop - start).max(initial=2 * k))
+        index = np.minimum(start[..., None] + np.arange(width), stop[..., None] - 1)
+        return np.clip(index, 0, len(self) - 1)
+
+
+def _flat(array, rows, trailing=0):
+    return array.reshape((rows, -1) + array.shape[array.ndim - trailing:])
+
+
+def _scatter(candidates, mask):
+    """Returns (resistance, topology, components) of the rows in mask padded with NaN networks"""
+    R, topology, components = candidates
+    rows = len(mask)
+    full = (np.full((rows,) + R.shape[1:], np.nan), np.zeros((rows,) + topology.shape[1:], dtype=np.intp),
+            np.full((rows,) + components.shape[1:], np.nan))
+    full[0][mask], full[1][mask], full[2][mask] = R, topology, components
+    return full
+
+
+def _parallel_need(target, c):
+    """Returns R with R || c = target, inf where no R reaches it"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(target < c, 1 / (1 / target - 1 / c), np.inf)
+
+
+def _canonical(topology, values):
+    """Returns a key equal for the same network with swapped values"""
+    values = tuple(float(v) for v in values[:_PARTS[topology]])
+    if topology in (4, 5):
+        return topology, tuple(sorted(values[:2])), values[2]
+    return topology, tuple(sorted(values))
+
+
+def _network(resistance, topology, components, error):
+    return Network(float(resistance), TOPOLOGIES[topology],
+                   tuple(float(v) for v in components[:_PARTS[topology]]), float(error))
+
+
+def _new_values(components, bom):
+    """Returns the number of distinct values of each candidate not in bom"""
+    new = np.zeros(components.shape[:-1], dtype=np.intp)
+    for slot in range(components.shape[-1]):
+        value = components[..., slot]
+        repeated = np.zeros(new.shape, dtype=bool)
+        for earlier in range(slot):
+            repeated |= components[..., earlier] == value
+        new += ~np.isnan(value) & ~np.isin(value, bom) & ~repeated
+    return new
+
+
+def _rank(error, parts, new, k, tolerance, canonical):
+    """
+    Returns for every row the indices of the k best candidates, duplicates
+    (same canonical(row, index)) removed
+    """
+    error = np.where(np.isfinite(error), np.abs(error), np.inf)
+    order = np.lexsort((error, new, parts, np.maximum(error, tolerance)), axis=-1)
+    results = []
+    for row in range(len(error)):
+        chosen, seen = [], set()
+        for index in order[row]:
+            if len(chosen) == k or not np.isfinite(error[row, index]):
+                break
+            key = canonical(row, index)
+            if key not in seen:
+                seen.add(key)
+                chosen.append(index)
+        results.append(chosen)
+    return results
+
+
+def network_str(network):
+    """Returns e.g. '(4.7k+220)||10k' of a Network"""
+    values = iter(toSI(value) for value in network.values)
+    return network.topology.replace("R", "{}").format(*values)
+
+
+class NetworkSynthesizer:
+    """
+    Resistor networks of one value set, the sorted two-resistor networks
+    are built once and shared by every query
+
+    values: a series name of component_values.RESISTORS or an iterable
+    max_parts: 1, 2 or 3 resistors per network (per divider for ratio)
+
+    Raises
+    ------
+    ValueError
+        If max_parts is not 1, 2 or 3
+    """
+    def __init__(self, values="E96", max_parts=3):
+        if max_parts not in (1, 2, 3):
+            raise ValueError("max_parts must be 1, 2 or 3, got {0}".format(max_parts))
+        if isinstance(values, str):
+            values = RESISTORS[values]
+        self.values = np.array(sorted(set(values)), dtype=float)
+        self.max_parts = max_parts
+        n = len(self.values)
+        components = np.full((n, 3), np.nan)
+        components[:, 0] = self.values
+        self.singles = _Table(self.values, np.zeros(n, dtype=np.intp), components)
+
+        # Every unordered pair once, in series and in parallel
+        self.pairs = None
+        if max_parts >= 2:
+            i, j = np.triu_indices(n)
+            a, b = self.values[i], self.values[j]
+            components = np.full((2 * len(i), 3), np.nan)
+            components[:, 0] = np.concatenate([a, a])
+            components[:, 1] = np.concatenate([b, b])
+            self.pairs = _Table(np.concatenate([a + b, a * b / (a + b)]),
+                                np.repeat(np.array([1, 2]), len(i)), components)
+
+    def _needed(self, low, high):
+        """
+        Returns ((low, high) in series, (low, high) in parallel) of shape
+        (t, n): the inner resistance that brings every standard value c
+        within [low, high]
+        """
+        c = self.values
+        low, high = low[:, None], high[:, None]
+        return (low - c, high - c), (_parallel_need(low, c), _parallel_need(high, c))
+
+    def _chunks(self, targets, k, tolerance):
+        """
+        Yields slices of at most CHUNK consecutive targets, with a tolerance
+        as many as keep their three-resistor candidates within CANDIDATES
+        """
+        start = 0
+        while start < len(targets):
+            stop = min(start + CHUNK, len(targets))
+            if tolerance > 0 and self.max_parts >= 3:
+                chunk = targets[start:stop]
+                low, high = chunk * (1 - tolerance), chunk * (1 + tolerance)
+                width = np.max([self.pairs.count(*need).max(axis=1) for need in self._needed(low, high)],
+                               axis=0) + 2 * k
+                width[self.singles.count(low, high) + self.pairs.count(low, high) >= k] = 0
+                size = 2 * len(self.values) * np.maximum.accumulate(width) * np.arange(1, len(chunk) + 1)
+                stop = start + max(1, int(np.searchsorted(size, CANDIDATES, side="right")))
+            yield slice(start, stop)
+            start = stop
+
+    def _extend(self, inner, low, high, k):
+        """
+        Returns [(resistance, topology, components)] of shape (t, n, w) of
+        every standard value c in series with and across the inner
+        networks that bring it within [low, high] of the targets, and the
+        k next to those
+        """
+        c = np.broadcast_to(self.values, (len(low), len(self.values)))
+        results = []
+        for parallel, (need_low, need_high) in enumerate(self._needed(low, high)):
+            index = inner.window(need_low, need_high, k)
+            R = inner.resistance[index]
+            outer = c[..., None]
+            components = inner.components[index]
+            components[..., inner.parts] = outer
+            topology = (_PARALLEL if parallel else _SERIES)[inner.topology[index]]
+            results.append((R * outer / (R + outer) if parallel else R + outer, topology, components))
+        return results
+
+    def _networks(self, targets, k, tolerance):
+        """
+        Returns (resistance, topology, components) candidates of shape
+        (t, C), larger networks only for targets with fewer than k
+        networks of fewer parts within tolerance
+        """
+        low, high = targets * (1 - tolerance), targets * (1 + tolerance)
+        candidates, in_band = [], 0
+        for table in (self.singles, self.pairs)[:self.max_parts]:
+            index = table.window(low, high, k)
+            candidates.append((table.resistance[index], table.topology[index], table.components[index]))
+            in_band = in_band + table.count(low, high)
+        mask = in_band < k
+        if self.max_parts >= 3 and mask.any():
+            candidates += [_scatter(extended, mask)
+                           for extended in self._extend(self.pairs, low[mask], high[mask], k)]
+        rows = len(targets)
+        return (np.concatenate([_flat(c[0], rows) for c in candidates], axis=1),
+                np.concatenate([_flat(c[1], rows) for c in candidates], axis=1),
+                np.concatenate([_flat(c[2], rows, 1) for c in candidates], axis=1))
+
+    def resistance(self, targets, k=5, tolerance=0.0, bom=()):
+        """
+        Returns the k best networks for every target resistance
+
+        tolerance: relative error below which networks count as exact and
+                   are ranked by part count and BOM reuse instead
+        bom: resistor values already used on the board
+
+        Returns
+        -------
+        list with a list of Network, best first, for each target
+
+        Raises
+        ------
+        ValueError
+            If a target is not positive
+        """
+        targets = np.atleast_1d(np.asarray(targets, dtype=float))
+        if (targets <= 0).any():
+            raise ValueError("Target resistance must be positive")
+        bom = np.asarray(list(bom), dtype=float)
+        results = []
+        for rows in self._chunks(targets, k, tolerance):
+            chunk = targets[rows]
+            R, topology, components = self._networks(chunk, k, tolerance)
+            error = R / chunk[:, None] - 1
+            chosen = _rank(error, _PARTS[topology], _new_values(components, bom), k, tolerance,
+                           lambda row, i: _canonical(topology[row, i], components[row, i]))
+            for row, indices in enumerate(chosen):
+                results.append([_network(R[row, i], topology[row, i], components[row, i], error[row, i])
+                                for i in indices])
+        return results
+
+    def _dividers(self, targets, k, tolerance, prune=True):
+        """
+        Returns (R1, R2) candidates, each (resistance, topology,
+        components) of shape (t, C): R1 single with R2 single or pair, and
+        R2 single with R1 pair. The pairs are left out when prune is True
+        and every target has k two-resistor dividers within tolerance,
+        which rank above any three-resistor one.
+        """
+        low, high = targets * (1 - tolerance), np.minimum(targets * (1 + tolerance), 1)
+        with np.errstate(divide="ignore"):
+            m_low, m_high = (low / (1 - low))[:, None], (high / (1 - high))[:, None]    # R2 / R1
+        single = np.broadcast_to(self.values, (len(targets), len(self.values)))
+        lookups = [(self.singles, single * m_low, single * m_high, False)]
+        pairs = not prune or (self.singles.count(single * m_low, single * m_high).sum(axis=1) < k).any()
+        if self.max_parts >= 3 and pairs:
+            lookups += [(self.pairs, single * m_low, single * m_high, False),
+                        (self.pairs, single / m_high, single / m_low, True)]
+
+        sides = ([], [])
+        for inner, need_low, need_high, inner_is_R1 in lookups:
+            index = inner.window(need_low, need_high, k)
+            outer = np.broadcast_to(single[..., None], index.shape)
+            components = np.full(index.shape + (3,), np.nan)
+            components[..., 0] = outer
+            looked_up = (inner.resistance[index], inner.topology[index], inner.components[index])
+            alone = (outer, np.zeros(index.shape, dtype=np.intp), components)
+            for side, network in zip(sides, (looked_up, alone) if inner_is_R1 else (alone, looked_up)):
+                side.append(network)
+        rows = len(targets)
+        return tuple(tuple(np.concatenate([_flat(network[i], rows, 1 if i == 2 else 0) for network in side],
+                                          axis=1) for i in range(3)) for side in sides)
+
+    def ratio(self, targets, k=5, tolerance=0.0, bom=(), total=None):
+        """
+        Returns the k best R1 / R2 networks for every divider ratio
+        R2 / (R1 + R2), with at most max_parts resistors in both together
+
+        total: (min, max) of R1 + R2, either may be None
+
+        Returns
+        -------
+        list with a list of RatioMatch(R1, R2, ratio, error), best first,
+        for each target. R1 and R2 are Networks (error NaN), error is
+        (ratio - target) / target as in divider_synthesis
+
+        Raises
+        ------
+        ValueError
+            If a target is not between 0 and 1 or max_parts is 1
+        """
+        targets = np.atleast_1d(np.asarray(targets, dtype=float))
+        if ((targets <= 0) | (targets >= 1)).any():
+            raise ValueError("Divider ratio must be between 0 and 1")
+        if self.max_parts < 2:
+            raise ValueError("A divider needs max_parts of at least 2")
+        bom = np.asarray(list(bom), dtype=float)
+        lo, hi = total if total is not None else (None, None)
+        results = []
+        # With a tolerance the lookup bands set the candidate count, one
+        # target at a time keeps it to that target's bands
+        step = CHUNK if tolerance == 0 else 1
+        for start in range(0, len(targets), step):
+            chunk = targets[start:start + step]
+            # Dividers outside total are no candidates, so they cannot prune
+            (R1, top1, comp1), (R2, top2, comp2) = self._dividers(chunk, k, tolerance, prune=total is None)
+            ratio = R2 / (R1 + R2)
+            error = ratio / chunk[:, None] - 1
+            if lo is not None:
+                error = np.where(R1 + R2 >= lo, error, np.inf)
+            if hi is not None:
+                error = np.where(R1 + R2 <= hi, error, np.inf)
+
+            components = np.concatenate([comp1, comp2], axis=-1)
+            chosen = _rank(error, _PARTS[top1] + _PARTS[top2], _new_values(components, bom), k, tolerance,
+                           lambda row, i: (_canonical(top1[row, i], comp1[row, i]),
+                                           _canonical(top2[row, i], comp2[row, i])))
+            for row, indices in enumerate(chosen):
+                results.append([RatioMatch(_network(R1[row, i], top1[row, i], comp1[row, i], np.nan),
+                                           _network(R2[row, i], top2[row, i], comp2[row, i], np.nan),
+                                           float(ratio[row, i]), float(error[row, i]))
+                                for i in indices])
+        return results
+
+
+def _ohms(text):
+    """Returns the value of '4.7k', '4k7' or '10kΩ'"""
+    return fromSI(text, "Ω")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Series/parallel resistor networks for target values")
+    parser.add_argument("targets", nargs="+", type=_ohms, help="resistances (Ohm, 4.7k style) or ratios")
+    parser.add_argument("--ratio", action="store_true", help="targets are divider ratios R2 / (R1 + R2)")
+    parser.add_argument("--series", default="E96", choices=sorted(RESISTORS))
+    parser.add_argument("--max-parts", type=int, default=3, choices=(1, 2, 3))
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.0, help="relative error counted as exact")
+    parser.add_argument("--bom", nargs="*", type=_ohms, default=(), help="values already on the BOM")
+    parser.add_argument("--total", nargs=2, type=_ohms, metavar=("MIN", "MAX"), help="R1 + R2 range")
+    args = parser.parse_args()
+
+    synthesizer = NetworkSynthesizer(args.series, args.max_parts)
+    if args.ratio:
+        results = synthesizer.ratio(args.targets, args.k, args.tolerance, args.bom, args.total)
+        for target, matches in zip(args.targets, results):
+            print("Ratio {0}".format(target))
+            for match in matches:
+                print("  R1={0:24s} R2={1:24s} ratio={2:.6f}\terror={3:+.4%}".format(
+                    network_str(match.R1), network_str(match.R2), match.ratio, match.error))
+    else:
+        results = synthesizer.resistance(args.targets, args.k, args.tolerance, args.bom)
+        for target, networks in zip(args.targets, results):
+            print("R {0}".format(toSI(target)))
+            for network in networks:
+                print("  {0:24s} {1:>10s}\terror={2:+.4%}".format(
+                    network_str(network), toSI(network.resistance), network.error))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/python3
+# Batched nodal DC operating point solver
+#
+# A Circuit is a list of elements between named nodes. Supplies are fixed
+# node voltages (to ground), every other node is an unknown of the KCL
+# equations, which are solved by damped Newton-Raphson with analytic
+# Jacobians. Element parameters may be NumPy arrays, all of them are
+# broadcast to one batch shape and every parameter set converges together.
+#
+# circuit = Circuit()
+# circuit.supply("vsc", np.linspace(3.3, 14.7, 1000))
+# circuit.resistor("vsc", "d", 2)
+# circuit.nfet("d", "vsig", "gnd", Vth=Q2.Vth, K=Q2.K)
+# circuit.supply("vsig", 5)
+# op = circuit.solve()
+# op.voltage("d"), op.current("M1"), op.converged
+#
+# Devices use the models of switch_bias_functions: square-law FETs with
+# the library Vth/K (Id = K/2 (Vgs - Vth)**2 in saturation) and Ebers-Moll
+# BJTs whose saturation current is set from Vbe_sat and beta. With table=
+# the I-V table of the part (iv_tables) replaces the analytic model.
+import copy
+
+import numpy as np
+
+GROUND = ("gnd", "0")
+
+# Thermal voltage at 300K
+VT = 0.02585
+
+# exp() is continued linearly above this argument (about 1V of Vbe), keeps
+# the first Newton steps of a junction finite
+EXP_LIMIT = 40.0
+
+
+class ConvergenceError(Exception):
+    pass
+
+
+def _limexp(x):
+    """Returns (exp(x), d/dx) with exp continued linearly above EXP_LIMIT"""
+    clipped = np.minimum(x, EXP_LIMIT)
+    e = np.exp(clipped)
+    return np.where(x > EXP_LIMIT, e * (1 + x - EXP_LIMIT), e), e
+
+
+class Resistor:
+    def __init__(self, name, a, b, R):
+        self.name = name
+        self.nodes = (a, b)
+        self.G = 1 / np.asarray(R, dtype=float)
+
+    def stamp(self, V, F, J, index):
+        a, b = index
+        G = self.G
+        I = G * (V[:, a] - V[:, b])
+        F[:, a] += I
+        F[:, b] -= I
+        J[:, a, a] += G
+        J[:, a, b] -= G
+        J[:, b, a] -= G
+        J[:, b, b] += G
+
+    def currents(self, V, index):
+        a, b = index
+        I = self.G * (V[:, a] - V[:, b])
+        return {"a": I, "b": -I}
+
+
+class CurrentSource:
+    """Constant current I flowing from node a through the source to node b"""
+    def __init__(self, name, a, b, I):
+        self.name = name
+        self.nodes = (a, b)
+        self.I = np.asarray(I, dtype=float)
+
+    def stamp(self, V, F, J, index):
+        a, b = index
+        F[:, a] += self.I
+        F[:, b] -= self.I
+
+    def currents(self, V, index):
+        I = np.broadcast_to(self.I, V.shape[:1])
+        return {"a": I, "b": -I}
+
+
+def square_law(Vov, Vds, K, lam):
+    """
+    Returns (Id, gm, gds) of the square-law model for Vds >= 0, zero in
+    cutoff (Vov <= 0)
+    """
+    on = Vov > 0
+    sat = on & (Vds >= Vov)
+    tri = on & ~sat
+    clm = 1 + lam * Vds
+    Id_sat = K/2 * Vov**2
+    Id_tri = K * (Vov * Vds - Vds**2 / 2)
+    Id = np.select([sat, tri], [Id_sat * clm, Id_tri * clm], 0)
+    gm = np.select([sat, tri], [K * Vov * clm, K * Vds * clm], 0)
+    gds = np.select([sat, tri], [Id_sat * lam, K * (Vov - Vds) * clm + Id_tri * lam], 0)
+    return Id, gm, gds
+
+
+class Fet:
+    """
+    Square-law MOSFET, polarity +1 (N-Chan) or -1 (P-Chan). Vth is signed
+    as in the device library (negative for P-Chan). The channel is
+    symmetric, drain and source swap when Vds changes sign.
+
+    table: iv_tables.FetTable of the part, used instead of the square law
+           and lam (Vth and K still apply)
+    """
+    def __init__(self, name, d, g, s, Vth, K, lam=0, polarity=1, table=None):
+        self.name = name
+        self.nodes = (d, g, s)
+        self.Vth = np.asarray(Vth, dtype=float)
+        self.K = np.asarray(K, dtype=float)
+        self.lam = np.asarray(lam, dtype=float)
+        self.polarity = polarity
+        self.table = table
+
+    def evaluate(self, V, index):
+        """Returns (Ids into the drain, dIds/dVd, dIds/dVg, dIds/dVs)"""
+        d, g, s = index
+        p = self.polarity
+        Vds = p * (V[:, d] - V[:, s])
+        swap = Vds < 0
+        # Gate to the lower (source side) terminal of the channel
+        Vgs = p * (V[:, g] - np.where(swap, V[:, d], V[:, s]))
+        if self.table is None:
+            Id, gm, gds = square_law(Vgs - p * self.Vth, np.abs(Vds), self.K, self.lam)
+        else:
+            Id, gm, gds = self.table.evaluate(Vgs - p * self.Vth, np.abs(Vds), self.K)
+        Ids = np.where(swap, -p * Id, p * Id)
+        dVd = np.where(swap, gm + gds, gds)
+        dVg = np.where(swap, -gm, gm)
+        dVs = np.where(swap, -gds, -(gm + gds))
+        return Ids, dVd, dVg, dVs
+
+    def stamp(self, V, F, J, index):
+        d, g, s = index
+        Ids, dVd, dVg, dVs = self.evaluate(V, index)
+        F[:, d] += Ids
+        F[:, s] -= Ids
+        J[:, d, d] += dVd
+        J[:, d, g] += dVg
+        J[:, d, s] += dVs
+        J[:, s, d] -= dVd
+        J[:, s, g] -= dVg
+        J[:, s, s] -= dVs
+
+    def currents(self, V, index):
+        Ids = self.evaluate(V, index)[0]
+        return {"d": Ids, "g": np.zeros_like(Ids), "s": -Ids}
+
+
+class Bjt:
+    """
+    Ebers-Moll (transport form) BJT, polarity +1 (NPN) or -1 (PNP)
+
+    Is: saturation current, beta: forward beta, beta_r: reverse beta
+    table: IVTable of (Ic, Ib)(Vbe, Vce) in device polarity
+           (iv_tables.bjt_table), used instead of the Ebers-Moll equations
+    """
+    def __init__(self, name, c, b, e, Is, beta, beta_r=1, Vt=VT, polarity=1, table=None):
+        self.name = name
+        self.nodes = (c, b, e)
+        self.Is = np.asarray(Is, dtype=float)
+        self.beta = np.asarray(beta, dtype=float)
+        self.beta_r = np.asarray(beta_r, dtype=float)
+        self.Vt = Vt
+        self.polarity = polarity
+        self.table = table
+
+    def evaluate(self, V, index):
+        """
+        Returns (Ic, Ib) into the collector and base and their derivatives
+        ((dIc/dVbe, dIc/dVbc), (dIb/dVbe, dIb/dVbc)) in device polarity
+        """
+        c, b, e = index
+        p = self.polarity
+        if self.table is not None:
+            (Ic, Ib), dVbe, dVce = self.table.evaluate(p * (V[:, b] - V[:, e]), p * (V[:, c] - V[:, e]))
+            # Vce = Vbe - Vbc
+            return Ic, Ib, (dVbe[0] + dVce[0], -dVce[0]), (dVbe[1] + dVce[1], -dVce[1])
+        ef, def_ = _limexp(p * (V[:, b] - V[:, e]) / self.Vt)
+        er, der = _limexp(p * (V[:, b] - V[:, c]) / self.Vt)
+        Is, Vt = self.Is, self.Vt
+        Ic = Is * (ef - er) - Is / self.beta_r * (er - 1)
+        Ib = Is / self.beta * (ef - 1) + Is / self.beta_r * (er - 1)
+        dIc = (Is * def_ / Vt, -Is * der / Vt * (1 + 1 / self.beta_r))
+        dIb = (Is / self.beta * def_ / Vt, Is / self.beta_r * der / Vt)
+        return Ic, Ib, dIc, dIb
+
+    def stamp(self, V, F, J, index):
+        c, b, e = index
+        p = self.polarity
+        Ic, Ib, dIc, dIb = self.evaluate(V, index)
+        F[:, c] += p * Ic
+        F[:, b] += p * Ib
+        F[:, e] -= p * (Ic + Ib)
+        # Vbe = p (Vb - Ve) and Vbc = p (Vb - Vc), the polarity cancels
+        for node, (dbe, dbc), sign in ((c, dIc, 1), (b, dIb, 1),
+                                       (e, (dIc[0] + dIb[0], dIc[1] + dIb[1]), -1)):
+            J[:, node, b] += sign * (dbe + dbc)
+            J[:, node, e] -= sign * dbe
+            J[:, node, c] -= sign * dbc
+
+    def currents(self, V, index):
+        p = self.polarity
+        Ic, Ib = self.evaluate(V, index)[:2]
+        return {"c": p * Ic, "b": p * Ib, "e": -p * (Ic + Ib)}
+
+
+def saturation_current(Vbe, Ic, Vt=VT):
+    """Returns the Ebers-Moll Is for which the junction drops Vbe at Ic"""
+    return Ic / np.exp(np.asarray(Vbe, dtype=float) / Vt)
+
+
+class OperatingPoint:
+    """Solved node voltages, arrays of the circuit batch shape"""
+    def __init__(self, circuit, elements, V, converged, iterations, shape):
+        self.circuit = circuit
+        self.elements = {element.name: element for element in elements}
+        self.V = V
+        self.converged = converged.reshape(shape)
+        self.iterations = iterations
+        self.shape = shape
+
+    def voltage(self, node):
+        return self.V[:, self.circuit.node_index(node)].reshape(self.shape)
+
+    def currents(self, name):
+        """Returns {terminal: current into the element} of an element"""
+        element = self.elements[name]
+        index = [self.circuit.node_index(node) for node in element.nodes]
+        return {terminal: I.reshape(self.shape) for terminal, I in element.currents(self.V, index).items()}
+
+    def current(self, name):
+        """
+        Returns the main current of an element: a to b through a resistor
+        or source, into the drain of a FET, into the collector of a BJT
+        """
+        currents = self.currents(name)
+        return currents[next(iter(currents))]
+
+
+class Circuit:
+    """
+    Netlist of elements between named nodes, "gnd" (or "0") is ground.
+    Element names default to R1, I1, M1, Q1, ... in order of addition.
+    """
+    def __init__(self):
+        self.nodes = list(GROUND[:1])
+        self.supplies = {}
+        self.elements = []
+        self._counts = {}
+
+    def node_index(self, node):
+        if node in GROUND:
+            return 0
+        return self.nodes.index(node)
+
+    def element(self, name):
+        for element in self.elements:
+            if element.name == name:
+                return element
+        raise KeyError(name)
+
+    def _add(self, prefix, cls, name, *args, **kwargs):
+        if name is None:
+            self._counts[prefix] = self._counts.get(prefix, 0) + 1
+            name = "{0}{1}".format(prefix, self._counts[prefix])
+        element = cls(name, *args, **kwargs)
+        for node in element.nodes:
+            if node not in GROUND and node not in self.nodes:
+                self.nodes.append(node)
+        self.elements.append(element)
+        return name
+
+    def supply(self, node, V):
+        """
+        Fixes a node at voltage V against ground
+
+        Raises
+        ------
+        ValueError
+            For ground or a node which already has a supply
+        """
+        if node in GROUND or node in self.supplies:
+            raise ValueError("Node {0} already has a fixed voltage".format(node))
+        if node not in self.nodes:
+            self.nodes.append(node)
+        self.supplies[node] = np.asarray(V, dtype=float)
+
+    def resistor(self, a, b, R, name=None):
+        return self._add("R", Resistor, name, a, b, R)
+
+    def current_source(self, a, b, I, name=None):
+        return self._add("I", CurrentSource, name, a, b, I)
+
+    def nfet(self, d, g, s, Vth, K, lam=0, name=None, table=None):
+        return self._add("M", Fet, name, d, g, s, Vth, K, lam, polarity=1, table=table)
+
+    def pfet(self, d, g, s, Vth, K, lam=0, name=None, table=None):
+        return self._add("M", Fet, name, d, g, s, Vth, K, lam, polarity=-1, table=table)
+
+    def npn(self, c, b, e, beta, Vbe_sat=0.7, Ic_ref=1e-3, beta_r=1, name=None, table=None):
+        """
+        NPN with Is chosen so Vbe = Vbe_sat at Ic_ref, e.g.
+        circuit.npn("c", "b", "gnd", beta=Q3.beta, Vbe_sat=Q3.Vbe_sat)
+        """
+        return self._add("Q", Bjt, name, c, b, e, saturation_current(Vbe_sat, Ic_ref), beta, beta_r,
+                         table=table)
+
+    def pnp(self, c, b, e, beta, Vbe_sat=0.7, Ic_ref=1e-3, beta_r=1, name=None, table=None):
+        return self._add("Q", Bjt, name, c, b, e, saturation_current(Vbe_sat, Ic_ref), beta, beta_r,
+                         polarity=-1, table=table)
+
+    def _batch_shape(self):
+        arrays = list(self.supplies.values())
+        for element in self.elements:
+            arrays += [value for value in vars(element).values() if isinstance(value, np.ndarray)]
+        return np.broadcast_shapes(*[array.shape for array in arrays])
+
+    def _flat_elements(self, shape):
+        # Copies of the elements with every parameter as a flat (n,) array
+        n = int(np.prod(shape))
+        elements = []
+        for element in self.elements:
+            element = copy.copy(element)
+            for key, value in list(vars(element).items()):
+                if isinstance(value, np.ndarray):
+                    setattr(element, key, np.broadcast_to(value, shape).reshape(n))
+            elements.append(element)
+        return elements
+
+    def solve(self, guess=None, max_iter=200, max_step=1.0, vtol=1e-9, gmin=1e-12, strict=False):
+        """
+        Damped Newton-Raphson on the KCL equations of the unknown nodes
+
+        guess: {node: voltage} start values, other nodes start at 0V
+        max_step: largest change of a node voltage in one iteration,
+                  longer Newton steps are clipped per node
+        gmin: conductance from every unknown node to ground, keeps the
+              Jacobian regular for nodes only connected to gates or cut
+              off devices
+
+        Returns
+        -------
+        OperatingPoint, converged marks the parameter sets whose last
+        Newton step was below vtol (relative to the node voltages)
+
+        Raises
+        ------
+        ConvergenceError
+            If strict and any parameter set did not converge
+        """
+        shape = self._batch_shape()
+        n = int(np.prod(shape))
+        size = len(self.nodes)
+        fixed = [self.node_index(node) for node in self.supplies]
+        unknown = np.array([i for i in range(1, size) if i not in fixed], dtype=int)
+        index = [[self.node_index(node) for node in element.nodes] for element in self.elements]
+
+        V = np.zeros((n, size))
+        for node, value in self.supplies.items():
+            V[:, self.node_index(node)] = np.broadcast_to(value, shape).reshape(n)
+        for node, value in (guess or {}).items():
+            V[:, self.node_index(node)] = np.broadcast_to(np.asarray(value, dtype=float), shape).reshape(n)
+
+        elements = self._flat_elements(shape)
+        converged = np.zeros(n, dtype=bool)
+        iterations = 0
+        while iterations < max_iter and not converged.all() and unknown.size:
+            iterations += 1
+            F = np.zeros((n, size))
+            J = np.zeros((n, size, size))
+            for element, nodes in zip(elements, index):
+                element.stamp(V, F, J, nodes)
+            Fu = F[:, unknown] + gmin * V[:, unknown]
+            Ju = J[:, unknown[:, None], unknown] + gmin * np.eye(unknown.size)
+
+            active = ~converged
+            dV = -np.linalg.solve(Ju[active], Fu[active][..., None])[..., 0]
+            largest = np.abs(dV).max(axis=1)
+            V[np.ix_(active, unknown)] += np.clip(dV, -max_step, max_step)
+            Vmax = np.abs(V[np.ix_(active, unknown)]).max(axis=1)
+            converged[active] = largest <= vtol * (1 + Vmax)
+        if not unknown.size:
+            converged[:] = True
+
+        if strict and not converged.all():
+            raise ConvergenceError("{0} of {1} operating points did not converge in {2} iterations".format(
+                int((~converged).sum()), n, max_iter))
+        return OperatingPoint(self, elements, V, converged, iterations, shape)
+
+
+def hi_low_switch_circuit(Vsig, Vsc, Rb, R1, Rload, Q1, Q2, Q3, tables=(None, None, None)):
+    """
+    Netlist of the hi_low_switch_bias.py circuit with a resistive load,
+    Q1/Q2 are FetParams and Q3 BjtParams of the device library. Both FETs
+    and the load are solved together, also when both are in triode.
+
+    tables: I-V tables (iv_tables) of Q1, Q2 and Q3, None keeps the
+            analytic model of that device
+
+    Elements: Rb, R1, Q3 (driver), Q1 (high side), Rload, Q2 (low side)
+    """
+    table_q1, table_q2, table_q3 = tables
+    circuit = Circuit()
+    circuit.supply("vsc", Vsc)
+    circuit.supply("vsig", Vsig)
+    circuit.resistor("vsig", "base", Rb, name="Rb")
+    circuit.resistor("vsc", "gate_q1", R1, name="R1")
+    circuit.npn("gate_q1", "base", "gnd", beta=Q3.beta, Vbe_sat=Q3.Vbe_sat, name="Q3", table=table_q3)
+    circuit.pfet("load_hi", "gate_q1", "vsc", Q1.Vth, Q1.K, name="Q1", table=table_q1)
+    circuit.resistor("load_hi", "load_lo", Rload, name="Rload")
+    circuit.nfet("load_lo", "vsig", "gnd", Q2.Vth, Q2.K, name="Q2", table=table_q2)
+    return circuit
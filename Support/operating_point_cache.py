@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+# Bounded LRU cache for the device evaluation functions.
+#
+# Float arguments are quantized to a relative tolerance before they are used
+# as cache keys, so the same operating point reached through slightly
+# different arithmetic (e.g. Vce - Vsc) hits the cache.
+#
+# from switch_bias_functions import *
+# from operating_point_cache import *     # cached device functions
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+from inspect import signature
+from math import frexp
+import weakref
+
+import switch_bias_functions
+
+__all__ = ["npn_calculate", "nfet_calculate", "pfet_calculate",
+           "calculate_pfet_vsaturation", "calculate_nfet_vsaturation",
+           "calculate_triode_vds"]
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_caches = weakref.WeakSet()
+
+
+def quantize(value, tolerance):
+    """
+    Returns a hashable key for value, floats (and ints) are rounded to a
+    relative tolerance on their binary mantissa, other values are unchanged
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if value == 0:
+        return 0
+    mantissa, exponent = frexp(value)
+    return (round(mantissa / tolerance), exponent)
+
+
+class OperatingPointCache:
+    """
+    LRU cache around a device function, see operating_point_cache()
+    """
+    def __init__(self, func, maxsize=4096, tolerance=1e-9):
+        update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._parameters = list(signature(func).parameters)
+        _caches.add(self)
+
+    def _key(self, args, kwargs):
+        # The default FET solver is part of the key, set_solver() switches
+        # to entries of the other backend instead of returning stale ones
+        tolerance = self.tolerance
+        positional = tuple(quantize(arg, tolerance) for arg in args)
+        if not kwargs:
+            return (switch_bias_functions.solver, positional, ())
+        return (switch_bias_functions.solver, positional,
+                tuple((name, quantize(kwargs[name], tolerance)) for name in sorted(kwargs)))
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        entries = self._entries
+        try:
+            result = entries[key]
+        except KeyError:
+            self.misses += 1
+            result = self.func(*args, **kwargs)
+            entries[key] = result
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        else:
+            self.hits += 1
+            entries.move_to_end(key)
+
+        # Callers unpack and may modify the returned lists
+        if isinstance(result, list):
+            return list(result)
+        return result
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def cache_clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, **params):
+        """
+        Drop cached operating points evaluated with the given parameter
+        values, e.g. cache.invalidate(Vth=old_vth) after a device's Vth
+        changed. Without parameters every entry is dropped.
+
+        Returns number of entries removed
+        """
+        if not params:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+        wanted = {name: quantize(value, self.tolerance) for name, value in params.items()}
+        stale = [key for key in self._entries if self._matches(key, wanted)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def _matches(self, key, wanted):
+        _, positional, keywords = key
+        for name, value in zip(self._parameters, positional):
+            if name in wanted and wanted[name] == value:
+                return True
+        for name, value in keywords:
+            if name in wanted and wanted[name] == value:
+                return True
+        return False
+
+
+def operating_point_cache(maxsize=4096, tolerance=1e-9):
+    """
+    Decorator adding a bounded LRU cache keyed on the quantized arguments
+
+    maxsize: maximum number of cached operating points
+    tolerance: relative tolerance used to quantize float arguments
+    """
+    def decorator(func):
+        return OperatingPointCache(func, maxsize, tolerance)
+    return decorator
+
+
+def cache_stats():
+    """
+    Returns {function name: CacheInfo} for every live cache
+    """
+    return {cache.__name__: cache.cache_info() for cache in _caches}
+
+
+def invalidate_all():
+    """
+    Clear every cache, call after changing device parameters in place
+    """
+    for cache in _caches:
+        cache.cache_clear()
+
+
+npn_calculate = operating_point_cache()(switch_bias_functions.npn_calculate)
+nfet_calculate = operating_point_cache()(switch_bias_functions.nfet_calculate)
+pfet_calculate = operating_point_cache()(switch_bias_functions.pfet_calculate)
+calculate_pfet_vsaturation = operating_point_cache()(switch_bias_functions.calculate_pfet_vsaturation)
+calculate_nfet_vsaturation = operating_point_cache()(switch_bias_functions.calculate_nfet_vsaturation)
+calculate_triode_vds = operating_point_cache()(switch_bias_functions.calculate_triode_vds)
@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+# Board power budget and battery life over all switch channels
+#
+# python3 power_budget.py channel_map.json
+# python3 power_budget.py channel_map.json --interval 900 --capacity 24
+#
+# A channel map is a JSON object of rails, channels, battery and schedule,
+# channel_map.json is an example:
+#
+# {"rails": {"12V": {"voltage": 12, "efficiency": 0.9, "quiescent": 0.5e-3},
+#            "5V": {"voltage": 5, "efficiency": 0.85, "quiescent": 8e-3}},
+#  "battery": {"capacity": 20, "voltage": 12, "usable": 0.8},
+#  "schedule": {"interval": 600},
+#  "channels": [
+#    {"name": "SDI12_PWR", "rail": "12V", "topology": "hi-low-switch",
+#     "on_time": 30, "Vsig": 5, "drive_rail": "5V", "load_current": 0.1,
+#     "load_power": 1.2},
+#    {"name": "PI_5V", "rail": "5V", "topology": "hi-switch", "duty": 0.05,
+#     "table": "circuit2", "load_current": 1.5, "load_power": 7.5}]}
+#
+# Every channel is one switch of topologies.py (hi-switch, hi-low-switch,
+# hi-low-inverted) supplied from its rail, the other keys are parameters
+# of the topology function (Q1, Rload via load_power/load_current, ...).
+# Vsig is the high drive level, by default the voltage of drive_rail or
+# else drive_voltage. Whether the load is on at Vsig or at 0V (pull-up and
+# inverted switches) is taken from the models. The drive current is taken
+# from drive_rail, without one from the channel's own rail. A channel is on
+# for duty of the time, or on_time seconds of every schedule interval, one
+# of them is required. Rails are converted from the battery with their
+# efficiency, quiescent is the rail's own draw.
+#
+# PowerBudget keeps the on/off evaluation of each channel, changed duty
+# cycles, rails or schedule only re-aggregate, only channels whose
+# topology parameters changed are evaluated again.
+from collections import namedtuple
+import argparse
+import json
+import sys
+
+from switch_bias_arrays import toSI_array
+from switch_bias_functions import toSI
+from topologies import TOPOLOGIES
+
+# Currents in A and powers in W of one channel state or average. The peak
+# current of a rail has every channel on at once.
+State = namedtuple("State", ["supply_current", "drive_current", "dissipation", "load_power"])
+# drive_rail: the rail the drive current is taken from
+ChannelResult = namedtuple("ChannelResult", ["name", "rail", "drive_rail", "duty", "on", "off", "average"])
+RailBudget = namedtuple("RailBudget", ["rail", "voltage", "current", "peak_current", "dissipation",
+                                       "load_power", "battery_current"])
+Rail = namedtuple("Rail", ["voltage", "efficiency", "quiescent"])
+Battery = namedtuple("Battery", ["capacity", "voltage", "usable"])
+
+# Channel keys that are not topology parameters
+CHANNEL_KEYS = ("name", "rail", "topology", "duty", "on_time", "drive_rail", "table", "Vsig")
+
+
+def _switch_loss(Id, *Vds):
+    return sum(abs(V) for V in Vds) * Id
+
+
+def _hi_switch_state(design, row, Vsc):
+    if hasattr(row, "Ic"):
+        # Q2 (NPN) pulls the gate low through R1
+        dissipation = row.P_q2 + row.Ic * (Vsc - row.Vce) + _switch_loss(row.Id, row.Vds_q1)
+        return State(row.Id + row.Ic, row.Ib, dissipation, row.Vdrop * row.Id)
+    # Pull-up R2 sinks into the drive pin
+    return State(row.Id + row.I_r2, 0.0, row.P_r2 + _switch_loss(row.Id, row.Vds_q1), row.Vdrop * row.Id)
+
+
+def _hi_low_state(design, row, Vsc):
+    dissipation = row.P_q3 + row.Ic * (Vsc - row.Vce) + _switch_loss(row.Id, row.Vds_q1, row.Vds_q2)
+    return State(row.Id + row.Ic, row.Ib, dissipation, row.Vdrop * row.Id)
+
+
+def _hi_low_inverted_state(design, rows, Vsc):
+    driver, switch = rows
+    # Q4 sources R2 unless cut off
+    V_r2 = 0.0 if driver.region_q4[0] == "c" else Vsc + driver.Vds_q4
+    I_r2 = V_r2 / design["R2"]
+    dissipation = (driver.P_q3 + driver.Ic * (Vsc - driver.Vce) + I_r2 * (Vsc - V_r2) + V_r2 * I_r2 +
+                   _switch_loss(switch.Id, switch.Vds_q1, switch.Vds_q2))
+    return State(switch.Id + driver.Ic + I_r2, driver.Ib, dissipation, switch.Vdrop * switch.Id)
+
+
+# Topology: function (design, row(s), Vsc) -> State of one Vsig level
+SWITCH_STATES = {
+    "hi-switch": _hi_switch_state,
+    "hi-low-switch": _hi_low_state,
+    "hi-low-inverted": _hi_low_inverted_state,
+}
+
+
+def _average(on, off, duty):
+    return State(*(duty * a + (1 - duty) * b for a, b in zip(on, off)))
+
+
+def _frozen(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+class PowerBudget:
+    """
+    Evaluates channels with the topology models, caching the on/off
+    states of every channel by its parameters
+
+    rails: {name: Rail}, battery: Battery or None
+    interval: sampling interval (s) for channels given by on_time
+    """
+    def __init__(self, rails, battery=None, interval=None):
+        self.rails = rails
+        self.battery = battery
+        self.interval = interval
+        self.evaluations = 0
+        self._states = {}
+
+    def _key(self, channel):
+        params = {key: _frozen(value) for key, value in channel.items()
+                  if key not in ("name", "duty", "on_time", "drive_rail")}
+        return tuple(sorted(params.items())), self.rails[channel["rail"]].voltage, self.drive_level(channel)
+
+    def drive_level(self, channel):
+        """Returns Vsig of a channel, the voltage of its drive_rail unless given"""
+        if "Vsig" in channel:
+            return channel["Vsig"]
+        if channel.get("drive_rail") is not None:
+            return self.rails[channel["drive_rail"]].voltage
+        return channel.get("drive_voltage", 5)
+
+    def _evaluate(self, channel):
+        """
+        Returns (on, off) States of a channel
+
+        Raises
+        ------
+        ValueError
+            If the topology is not a switch, Vsc is given, the table is
+            unknown or the channel has no (Vsig, Vsc) row
+        """
+        topology = channel["topology"]
+        if topology not in SWITCH_STATES:
+            raise ValueError("{0}: {1} is not a switch topology, use one of {2}".format(
+                channel["name"], topology, sorted(SWITCH_STATES)))
+        params = {key: value for key, value in channel.items() if key not in CHANNEL_KEYS}
+        if "Vsc" in params:
+            raise ValueError("{0}: Vsc is the voltage of the rail".format(channel["name"]))
+        Vsc = self.rails[channel["rail"]].voltage
+        Vsig = self.drive_level(channel)
+        result = TOPOLOGIES[topology](Vsc=(Vsc,), Vsig=(0, Vsig), **params)
+        tables = {table.name: list(table.rows) for table in result.tables}
+        if topology == "hi-low-inverted":
+            selected = list(zip(tables["driver"], tables["switch"]))
+        else:
+            table = channel.get("table", result.tables[0].name)
+            if table not in tables:
+                raise ValueError("{0}: unknown table {1}, use one of {2}".format(
+                    channel["name"], table, sorted(tables)))
+            selected = tables[table]
+        if len(selected) != 2:
+            raise ValueError("{0}: Vsig={1}V is not used at Vsc={2}V".format(channel["name"], Vsig, Vsc))
+        self.evaluations += 1
+        states = [SWITCH_STATES[topology](result.design, row, Vsc) for row in selected]
+        # On is the drive level that powers the load
+        return tuple(sorted(states, key=lambda state: state.load_power, reverse=True))
+
+    def duty(self, channel):
+        """
+        Returns the on fraction of a channel
+
+        Raises
+        ------
+        ValueError
+            If on_time is given without a schedule interval or neither
+            duty nor on_time is given
+        """
+        if "on_time" in channel:
+            if not self.interval:
+                raise ValueError("{0}: on_time needs a schedule interval".format(channel["name"]))
+            return min(channel["on_time"] / self.interval, 1.0)
+        if "duty" not in channel:
+            raise ValueError("{0}: needs duty or on_time".format(channel["name"]))
+        return channel["duty"]
+
+    def update(self, channels):
+        """
+        Returns a ChannelResult per channel, only channels which are new or
+        whose parameters changed since the last update are evaluated
+        """
+        states = {}
+        results = []
+        for channel in channels:
+            key = self._key(channel)
+            cached = self._states.get(channel["name"])
+            on, off = cached[1] if cached is not None and cached[0] == key else self._evaluate(channel)
+            states[channel["name"]] = (key, (on, off))
+            duty = self.duty(channel)
+            drive_rail = channel.get("drive_rail") or channel["rail"]
+            results.append(ChannelResult(channel["name"], channel["rail"], drive_rail, duty,
+                                         on, off, _average(on, off, duty)))
+        self._states = states
+        return results
+
+    def rail_budgets(self, results):
+        """Returns {rail: RailBudget} of the channel results, every rail listed"""
+        budgets = {}
+        for name, rail in self.rails.items():
+            current = rail.quiescent
+            peak = rail.quiescent
+            dissipation = load_power = 0.0
+            for result in results:
+                if result.rail == name:
+                    current += result.average.supply_current
+                    peak += result.on.supply_current
+                    dissipation += result.average.dissipation
+                    load_power += result.average.load_power
+                if result.drive_rail == name:
+                    current += result.average.drive_current
+                    peak += result.on.drive_current
+            battery_current = None
+            if self.battery is not None:
+                battery_current = rail.voltage * current / (rail.efficiency * self.battery.voltage)
+            budgets[name] = RailBudget(name, rail.voltage, current, peak, dissipation, load_power, battery_current)
+        return budgets
+
+    def battery_life(self, budgets):
+        """Returns (battery current in A, life in hours) of the rail budgets"""
+        current = sum(budget.battery_current for budget in budgets.values())
+        hours = self.battery.capacity * self.battery.usable / current if current > 0 else float("inf")
+        return current, hours
+
+
+def load_channel_map(path):
+    """
+    Returns (PowerBudget, channels) of a channel map file
+
+    Raises
+    ------
+    ValueError
+        If a channel names an unknown rail or a name is repeated
+    """
+    with open(path) as f:
+        spec = json.load(f)
+    rails = {name: Rail(rail["voltage"], rail.get("efficiency", 1.0), rail.get("quiescent", 0.0))
+             for name, rail in spec["rails"].items()}
+    battery = spec.get("battery")
+    if battery is not None:
+        battery = Battery(battery["capacity"], battery["voltage"], battery.get("usable", 1.0))
+    channels = spec["channels"]
+    names = set()
+    for channel in channels:
+        for key in ("rail", "drive_rail"):
+            if channel.get(key) is not None and channel[key] not in rails:
+                raise ValueError("{0}: unknown {1} {2}".format(channel["name"], key, channel[key]))
+        if channel["name"] in names:
+            raise ValueError("Channel {0} is listed twice".format(channel["name"]))
+        names.add(channel["name"])
+    return PowerBudget(rails, battery, spec.get("schedule", {}).get("interval")), channels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Board power budget and battery life")
+    parser.add_argument("channel_map", help="JSON channel map")
+    parser.add_argument("--interval", type=float, help="sampling interval (s), overrides the schedule")
+    parser.add_argument("--capacity", type=float, help="battery capacity (Ah), overrides the map")
+    args = parser.parse_args()
+
+    budget, channels = load_channel_map(args.channel_map)
+    if args.interval is not None:
+        budget.interval = args.interval
+    if args.capacity is not None and budget.battery is not None:
+        budget.battery = budget.battery._replace(capacity=args.capacity)
+    results = budget.update(channels)
+
+    print("{0:16s} {1:6s} {2:>7s} {3:>10s} {4:>10s} {5:>10s} {6:>10s} {7:>10s}".format(
+        "Channel", "Rail", "Duty", "I_on", "I_off", "I_avg", "P_sw_on", "P_sw_avg"))
+    columns = [toSI_array([getattr(getattr(result, state), name) for result in results], unit)
+               for state, name, unit in (("on", "supply_current", "A"), ("off", "supply_current", "A"),
+                                         ("average", "supply_current", "A"), ("on", "dissipation", "W"),
+                                         ("average", "dissipation", "W"))]
+    for result, texts in zip(results, zip(*columns)):
+        print("{0:16s} {1:6s} {2:7.2%} {3:>10s} {4:>10s} {5:>10s} {6:>10s} {7:>10s}".format(
+            result.name, result.rail, result.duty, *texts))
+
+    budgets = budget.rail_budgets(results)
+    print("\n{0:6s} {1:>6s} {2:>10s} {3:>10s} {4:>10s} {5:>10s} {6:>10s}".format(
+        "Rail", "V", "I_avg", "I_peak", "P_sw_avg", "P_load", "I_batt"))
+    rails = list(budgets.values())
+    columns = [toSI_array([getattr(rail, name) for rail in rails], unit) for name, unit in (
+        ("current", "A"), ("peak_current", "A"), ("dissipation", "W"), ("load_power", "W"))]
+    for rail, texts in zip(rails, zip(*columns)):
+        print("{0:6s} {1:6n} {2:>10s} {3:>10s} {4:>10s} {5:>10s} {6:>10s}".format(
+            rail.rail, rail.voltage, *texts,
+            "-" if rail.battery_current is None else toSI(rail.battery_current, "A")))
+
+    if budget.battery is not None:
+        current, hours = budget.battery_life(budgets)
+        print("\nBattery {0}Ah at {1}V ({2:.0%} usable): {3} average, {4:.1f} h ({5:.1f} days)".format(
+            budget.battery.capacity, budget.battery.voltage, budget.battery.usable, toSI(current, "A"),
+            hours, hours / 24))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/python3
+# Streaming result sinks for the sweep scripts
+#
+# Sweeps yield rows (namedtuples, or NumPy structured arrays for the array
+# engine) into a sink, which writes them out incrementally so memory does
+# not grow with the sweep size. The human readable table of the bias
+# scripts is one sink among the others.
+#
+# with open_sink("sweep.csv", Row._fields) as sink:
+#     for row in sweep(...):
+#         sink.write(row)
+#
+# .csv       CsvSink       one line per row
+# .ndjson    NdjsonSink    one JSON object per line (also .jsonl)
+# .parquet   ParquetSink   columnar, written in record batches (pyarrow)
+# .arrow     ArrowSink     Arrow IPC file, written in record batches (pyarrow)
+from itertools import islice
+import abc
+import csv
+import json
+import math
+import os
+import sys
+
+FORMATS = ("table", "csv", "ndjson", "parquet", "arrow")
+
+_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson",
+               ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+# Rows converted per step by write_array, bounds the Python objects alive
+ARRAY_CHUNK = 65536
+
+# Rows of a table whose SI columns are formatted together
+TABLE_CHUNK = 4096
+
+
+class ResultSink(abc.ABC):
+    """
+    Base class of the sinks. Rows are sequences in the order of fields,
+    e.g. namedtuples of a sweep generator.
+    """
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.rows = 0
+
+    @abc.abstractmethod
+    def write(self, row):
+        """Writes one row"""
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def write_array(self, array):
+        """Writes a NumPy structured array, fields in dtype order"""
+        array = array.ravel()
+        for start in range(0, len(array), ARRAY_CHUNK):
+            self.write_many(array[start:start + ARRAY_CHUNK].tolist())
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _FileSink(ResultSink):
+    # path "-" or None writes to stdout, which is not closed
+    def __init__(self, fields, path=None, mode="w"):
+        super().__init__(fields)
+        if path is None or path == "-":
+            self.file = sys.stdout
+            self._owned = False
+        elif hasattr(path, "write"):
+            self.file = path
+            self._owned = False
+        else:
+            self.file = open(path, mode, newline="")
+            self._owned = True
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class TableSink(_FileSink):
+    """
+    Human readable table, the print() output of the bias scripts
+
+    row_format is a format string applied positionally to every row or a
+    function returning the line of a row, header (if given) is printed
+    once when the sink is opened. si_fields {field: unit} are replaced by
+    their toSI text before row_format sees them, a block of rows at a time
+    with toSI_array.
+    """
+    def __init__(self, fields, row_format, header=None, path=None, si_fields=None):
+        super().__init__(fields, path)
+        self.row_format = row_format
+        self.si_fields = [(self.fields.index(name), unit) for name, unit in (si_fields or {}).items()]
+        if header is not None:
+            print(header, file=self.file)
+
+    def write(self, row):
+        self.write_many((row,))
+
+    def write_many(self, rows):
+        rows = iter(rows)
+        while True:
+            block = list(islice(rows, TABLE_CHUNK))
+            if not block:
+                break
+            if self.si_fields:
+                block = self._si_text(block)
+            for row in block:
+                if callable(self.row_format):
+                    print(self.row_format(row), file=self.file)
+                else:
+                    print(self.row_format.format(*row), file=self.file)
+            self.rows += len(block)
+
+    def _si_text(self, block):
+        from switch_bias_arrays import toSI_array
+
+        columns = [list(row) for row in zip(*block)]
+        for index, unit in self.si_fields:
+            columns[index] = toSI_array(columns[index], unit).tolist()
+        make = getattr(type(block[0]), "_make", tuple)
+        return [make(values) for values in zip(*columns)]
+
+
+class CsvSink(_FileSink):
+    """Comma separated values with a header line of the field names"""
+    def __init__(self, fields, path=None):
+        super().__init__(fields, path)
+        self._writer = csv.writer(self.file)
+        self._writer.writerow(self.fields)
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self.rows += 1
+
+
+def _json_value(value):
+    # NaN / inf are not valid JSON, unreachable operating points become null
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class NdjsonSink(_FileSink):
+    """Newline delimited JSON, one object per row"""
+    def write(self, row):
+        record = {name: _json_value(value) for name, value in zip(self.fields, row)}
+        self.file.write(json.dumps(record))
+        self.file.write("\n")
+        self.rows += 1
+
+
+class _ArrowBatchSink(ResultSink):
+    """
+    Buffers up to batch_size rows column wise and hands them to pyarrow as
+    one record batch. The schema is inferred from the first batch.
+    """
+    def __init__(self, fields, path, batch_size=65536):
+        try:
+            import pyarrow
+        except ImportError as error:
+            raise ImportError("{0} needs pyarrow (pip install pyarrow)".format(
+                type(self).__name__)) from error
+        super().__init__(fields)
+        self._pa = pyarrow
+        self.path = path
+        self.batch_size = batch_size
+        self._columns = [[] for _ in self.fields]
+        self._writer = None
+        self._schema = None
+
+    def write(self, row):
+        for column, value in zip(self._columns, row):
+            column.append(value)
+        self.rows += 1
+        if len(self._columns[0]) >= self.batch_size:
+            self.flush()
+
+    def _column_type(self, i, column):
+        if self._schema is not None:
+            return self._schema.field(i).type
+        # Sweeps mix int and float in one column (Vsig 0 and 3.3), numbers
+        # are stored as float64 so later batches do not change the schema
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in column):
+            return self._pa.float64()
+        return None
+
+    def flush(self):
+        if not self._columns or not self._columns[0]:
+            return
+        self._write_batch([self._pa.array(column, type=self._column_type(i, column))
+                           for i, column in enumerate(self._columns)])
+        self._columns = [[] for _ in self.fields]
+
+    def _write_batch(self, arrays):
+        batch = self._pa.RecordBatch.from_arrays(arrays, names=list(self.fields))
+        if self._writer is None:
+            self._schema = batch.schema
+            self._writer = self._open_writer(batch.schema)
+        elif batch.schema != self._schema:
+            batch = batch.cast(self._schema)
+        self._writer.write_batch(batch)
+
+    def write_array(self, array):
+        # Columns go to pyarrow straight from the NumPy buffers, keeping
+        # their dtypes (region codes stay integers)
+        import numpy as np
+
+        self.flush()
+        array = array.ravel()
+        for start in range(0, len(array), self.batch_size):
+            chunk = array[start:start + self.batch_size]
+            self._write_batch([self._pa.array(np.ascontiguousarray(chunk[name])) for name in self.fields])
+            self.rows += len(chunk)
+
+    @abc.abstractmethod
+    def _open_writer(self, schema):
+        """Returns the pyarrow writer of the file for schema"""
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ParquetSink(_ArrowBatchSink):
+    """Parquet file, one row group per record batch"""
+    def _open_writer(self, schema):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.path, schema)
+
+
+class ArrowSink(_ArrowBatchSink):
+    """Arrow IPC (Feather v2) file"""
+    def _open_writer(self, schema):
+        return self._pa.ipc.new_file(self.path, schema)
+
+
+def sink_format(path):
+    """
+    Returns the format for an output path from its extension
+
+    Raises
+    ------
+    ValueError
+        If the extension is not known
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError("Unknown output format {0}, use one of {1}".format(
+            extension, sorted(_EXTENSIONS)))
+    return _EXTENSIONS[extension]
+
+
+def sink_path(path, name):
+    """Returns path with _name before the extension, for scripts with several tables"""
+    if path is None or path == "-":
+        return path
+    root, extension = os.path.splitext(path)
+    return "{0}_{1}{2}".format(root, name, extension)
+
+
+def open_sink(path=None, fields=(), format=None, row_format=None, header=None, si_fields=None):
+    """
+    Returns a sink writing to path
+
+    Without path and format the human table (row_format, header,
+    si_fields) is written to stdout, otherwise format defaults to the
+    extension of path. path "-" writes csv / ndjson to stdout.
+
+    Raises
+    ------
+    ValueError
+        If the format is unknown or needs a file path
+    """
+    if format is None:
+        format = "table" if path is None or path == "-" else sink_format(path)
+    if format == "table":
+        return TableSink(fields, row_format, header, path, si_fields)
+    if format == "csv":
+        return CsvSink(fields, path)
+    if format == "ndjson":
+        return NdjsonSink(fields, path)
+    if format in ("parquet", "arrow"):
+        if path is None or path == "-":
+            raise ValueError("{0} output needs a file path".format(format))
+        return (ParquetSink if format == "parquet" else ArrowSink)(fields, path)
+    raise ValueError("Unknown output format {0}, use one of {1}".format(format, FORMATS))
@@ -0,0 +1,324 @@
+#!/usr/bin/python3
+# Differences between board revisions of the fabrication archives
+#
+# python3 revision_diff.py                            # consecutive revisions of every board
+# python3 revision_diff.py ../Outputs/DL-3.2-MB_PCB4.zip ../Outputs/DL-3.2.1-MB_PCB4.zip
+#
+# diff = diff_archives(old_zip, new_zip)
+# diff.changed, diff.layers["GTL"], diff.components.moved
+#
+# Members are matched by role, not name (PCB3.GTL of one revision is
+# PCB4.GTL of the next). Whether a member changed is decided from the CRC-32
+# and size in the zip central directory, no member is decompressed for it.
+# Only changed layers are read (gerber_analysis.analyze_member) and only a
+# changed pick-and-place file is parsed. Altium stamps every layer with the
+# export date, so a changed CRC can still have zero geometry deltas.
+#
+# Parsed layers and placements are cached per archive in CACHE_DIR under the
+# digest of its central directory, a later comparison of any two revisions
+# only reads the two cache files. With the disk caches turned off
+# (DATALOGGER_CACHE_DIR=off) every comparison parses the archives again.
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import zipfile
+
+from device_library import CACHE_DIR
+from gerber_analysis import ARCHIVES, DrillStats, LayerStats, analyze_member, layer_kind
+
+DIFF_CACHE_DIR = None if CACHE_DIR is None else os.path.join(CACHE_DIR, "revision_diff")
+
+# Bump when the cached layer stats or placements change
+DIFF_CACHE_VERSION = 1
+
+# Position (mm) and rotation (degree) changes below these are not moves
+MOVE_TOLERANCE = 0.01
+ROTATION_TOLERANCE = 0.01
+
+PICK_PLACE = "Pick Place.csv"
+
+Placement = namedtuple("Placement", ["designator", "layer", "footprint", "x", "y", "rotation"])
+
+# moved: [(old Placement, new Placement)], also for changed rotation,
+# layer or footprint
+ComponentDiff = namedtuple("ComponentDiff", ["added", "removed", "moved"])
+
+# added, removed, changed: member roles; layers: {role: (old, new)} stats
+# of the changed layers; components: ComponentDiff, None when a revision
+# has no pick-and-place file
+RevisionDiff = namedtuple("RevisionDiff", ["old", "new", "added", "removed", "changed", "unchanged",
+                                           "layers", "components"])
+
+_REVISION = re.compile(r"V?(\d+(?:\.\d+)*)")
+_PCB_MEMBER = re.compile(r"^PCB\d+(\W.*)$")
+
+
+def member_role(name):
+    """Returns the revision independent role of an archive member, e.g. GTL"""
+    if name.startswith("Pick Place for "):
+        return "Pick Place" + os.path.splitext(name)[1]
+    if name.startswith("BOM") and name.endswith(".xlsx"):
+        return "BOM.xlsx"
+    if layer_kind(name) is not None:
+        return name.rsplit(".", 1)[-1]
+    match = _PCB_MEMBER.match(name)
+    return "PCB" + match.group(1) if match else name
+
+
+def board_revision(path):
+    """Returns (board, version tuple) of an archive name, e.g. ("MB", (3, 2, 1))"""
+    name = os.path.basename(path)
+    board = "CB" if re.search(r"(^|[-_])CB([-_]|$)", name) else "MB"
+    match = _REVISION.search(name[3:] if name.startswith("DL-") else name)
+    return board, tuple(int(part) for part in match.group(1).split(".")) if match else ()
+
+
+def revisions(paths=ARCHIVES):
+    """Returns {board: [archive]} in revision order"""
+    boards = {}
+    for path in sorted(paths, key=board_revision):
+        boards.setdefault(board_revision(path)[0], []).append(path)
+    return boards
+
+
+def central_directory(path):
+    """Returns {role: (member name, crc32, size)} from the zip central directory"""
+    with zipfile.ZipFile(path) as archive:
+        return {member_role(info.filename): (info.filename, info.CRC, info.file_size)
+                for info in archive.infolist() if not info.is_dir() and info.file_size}
+
+
+def _number(text):
+    """Returns the value in mm of a pick-and-place coordinate such as 6204.173mil or 157.5860mm"""
+    text = text.strip()
+    if text.endswith("mil"):
+        return float(text[:-3]) * 0.0254
+    if text.endswith("mm"):
+        return float(text[:-2])
+    return float(text)
+
+
+def read_pick_place(stream):
+    """
+    Returns {designator: Placement} of an Altium pick-and-place CSV, the
+    design information preamble is skipped, coordinates in mm
+    """
+    placements = {}
+    columns = None
+    for row in csv.reader(stream):
+        if columns is None:
+            if row and row[0].strip() == "Designator":
+                columns = {name.split("(")[0].strip(): i for i, name in enumerate(row)}
+            continue
+        if not row or not row[0].strip():
+            continue
+        designator = row[columns["Designator"]].strip()
+        placements[designator] = Placement(designator, row[columns["Layer"]].strip(),
+                                           row[columns["Footprint"]].strip(),
+                                           _number(row[columns["Center-X"]]), _number(row[columns["Center-Y"]]),
+                                           float(row[columns["Rotation"]]) % 360)
+    return placements
+
+
+def archive_pick_place(path, name):
+    """Returns the placements of a pick-and-place member, read as a stream"""
+    with zipfile.ZipFile(path) as archive:
+        with io.TextIOWrapper(archive.open(name), encoding="iso-8859-1", newline="") as stream:
+            return read_pick_place(stream)
+
+
+class ArchiveCache:
+    """
+    Central directory, parsed layers and placements of one archive, kept
+    in a JSON file named after the digest of the central directory
+    """
+    def __init__(self, path, cache_dir=DIFF_CACHE_DIR):
+        self.path = path
+        self.members = central_directory(path)
+        signature = json.dumps([DIFF_CACHE_VERSION, sorted(self.members.items())])
+        self.digest = hashlib.sha1(signature.encode()).hexdigest()[:16]
+        self.cache_path = None if cache_dir is None else os.path.join(
+            cache_dir, "{0}_{1}.json".format(os.path.splitext(os.path.basename(path))[0], self.digest))
+        self.layers = {}
+        self.placements = None
+        self._dirty = False
+        if self.cache_path is not None:
+            try:
+                with open(self.cache_path) as f:
+                    cached = json.load(f)
+                self.layers = {role: self._stats(value) for role, value in cached["layers"].items()}
+                if cached["placements"] is not None:
+                    self.placements = {name: Placement(*value) for name, value in cached["placements"].items()}
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+    @staticmethod
+    def _stats(value):
+        if value["type"] == "drill":
+            tools = {int(number): tuple(tool) for number, tool in value["tools"].items()}
+            return DrillStats(value["name"], value["bbox"] and tuple(value["bbox"]), value["holes"], tools)
+        fields = dict(value)
+        del fields["type"]
+        for name in ("bbox", "extent"):
+            fields[name] = fields[name] and tuple(fields[name])
+        return LayerStats(**fields)
+
+    @staticmethod
+    def _json(stats):
+        value = stats._asdict()
+        value["type"] = "drill" if isinstance(stats, DrillStats) else "layer"
+        return value
+
+    def layer_stats(self, roles, executor=None):
+        """Returns {role: stats} of the given layer roles, parsing the uncached ones"""
+        missing = [role for role in roles if role not in self.layers]
+        if missing:
+            names = [self.members[role][0] for role in missing]
+            mapper = map if executor is None else executor.map
+            for role, stats in zip(missing, mapper(analyze_member, [self.path] * len(names), names)):
+                self.layers[role] = stats
+            self._dirty = True
+        return {role: self.layers[role] for role in roles}
+
+    def pick_place(self):
+        """Returns {designator: Placement}, None without a pick-and-place file"""
+        if self.placements is None and PICK_PLACE in self.members:
+            self.placements = archive_pick_place(self.path, self.members[PICK_PLACE][0])
+            self._dirty = True
+        return self.placements
+
+    def save(self):
+        if not self._dirty or self.cache_path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = "{0}.{1}.tmp".format(self.cache_path, os.getpid())
+            with open(tmp_path, "w") as f:
+                json.dump({"layers": {role: self._json(stats) for role, stats in self.layers.items()},
+                           "placements": self.placements}, f)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+        except OSError:
+            # Cache is optional, e.g. read-only home directory
+            pass
+
+
+def diff_components(old, new):
+    """Returns the ComponentDiff of two {designator: Placement}"""
+    added = [new[name] for name in new if name not in old]
+    removed = [old[name] for name in old if name not in new]
+    moved = []
+    for name in old.keys() & new.keys():
+        a, b = old[name], new[name]
+        rotation = abs((b.rotation - a.rotation + 180) % 360 - 180)
+        if (abs(a.x - b.x) > MOVE_TOLERANCE or abs(a.y - b.y) > MOVE_TOLERANCE
+                or rotation > ROTATION_TOLERANCE or a.layer != b.layer or a.footprint != b.footprint):
+            moved.append((a, b))
+    moved.sort(key=lambda pair: pair[0].designator)
+    return ComponentDiff(added, removed, moved)
+
+
+def diff_archives(old_path, new_path, cache_dir=DIFF_CACHE_DIR, executor=None):
+    """Returns the RevisionDiff of two archives"""
+    old, new = ArchiveCache(old_path, cache_dir), ArchiveCache(new_path, cache_dir)
+    added = sorted(new.members.keys() - old.members.keys())
+    removed = sorted(old.members.keys() - new.members.keys())
+    common = old.members.keys() & new.members.keys()
+    changed = sorted(role for role in common if old.members[role][1:] != new.members[role][1:])
+
+    roles = [role for role in changed if layer_kind(old.members[role][0]) is not None]
+    old_layers = old.layer_stats(roles, executor)
+    new_layers = new.layer_stats(roles, executor)
+    layers = {role: (old_layers[role], new_layers[role]) for role in roles}
+
+    components = None
+    if PICK_PLACE in old.members and PICK_PLACE in new.members:
+        if PICK_PLACE in changed:
+            components = diff_components(old.pick_place(), new.pick_place())
+        else:
+            components = ComponentDiff([], [], [])
+    old.save()
+    new.save()
+    return RevisionDiff(os.path.basename(old_path), os.path.basename(new_path), added, removed, changed,
+                        len(common) - len(changed), layers, components)
+
+
+def _layer_delta(old, new):
+    """Returns the text of the geometry change of a layer, '' if there is none"""
+    if isinstance(old, DrillStats):
+        parts = []
+        if new.holes != old.holes:
+            parts.append("holes {0:+d}".format(new.holes - old.holes))
+        if len(new.tools) != len(old.tools):
+            parts.append("tools {0:+d}".format(len(new.tools) - len(old.tools)))
+        return ", ".join(parts)
+    parts = ["{0} {1:+d}".format(name, getattr(new, name) - getattr(old, name))
+             for name in ("flashes", "draws", "arcs", "regions") if getattr(new, name) != getattr(old, name)]
+    if old.copper_area is not None and new.copper_area is not None and old.copper_area != new.copper_area:
+        parts.append("copper {0:+.1f} mm^2".format(new.copper_area - old.copper_area))
+    if old.extent is not None and new.extent is not None:
+        old_size = (old.extent[2] - old.extent[0], old.extent[3] - old.extent[1])
+        new_size = (new.extent[2] - new.extent[0], new.extent[3] - new.extent[1])
+        if any(abs(a - b) > MOVE_TOLERANCE for a, b in zip(old_size, new_size)):
+            parts.append("extent {0:.2f} x {1:.2f} -> {2:.2f} x {3:.2f} mm".format(*(old_size + new_size)))
+        elif any(abs(a - b) > MOVE_TOLERANCE for a, b in zip(old.extent[:2], new.extent[:2])):
+            parts.append("offset ({0:+.2f}, {1:+.2f}) mm".format(new.extent[0] - old.extent[0],
+                                                                new.extent[1] - old.extent[1]))
+    return ", ".join(parts)
+
+
+def print_diff(diff):
+    print("{0} -> {1}: {2} changed, {3} unchanged".format(diff.old, diff.new, len(diff.changed), diff.unchanged))
+    if diff.added:
+        print("  added members: {0}".format(", ".join(diff.added)))
+    if diff.removed:
+        print("  removed members: {0}".format(", ".join(diff.removed)))
+    for role, (old, new) in sorted(diff.layers.items()):
+        print("  {0:5s} {1}".format(role, _layer_delta(old, new) or "same geometry"))
+    components = diff.components
+    if components is None:
+        print("  components: no pick-and-place file in both revisions")
+        return
+    print("  components: {0} added, {1} removed, {2} moved".format(
+        len(components.added), len(components.removed), len(components.moved)))
+    for placement in components.added:
+        print("    + {0:12s} {1:24s} ({2:.2f}, {3:.2f})".format(
+            placement.designator, placement.footprint, placement.x, placement.y))
+    for placement in components.removed:
+        print("    - {0:12s} {1:24s} ({2:.2f}, {3:.2f})".format(
+            placement.designator, placement.footprint, placement.x, placement.y))
+    for a, b in components.moved:
+        print("    ~ {0:12s} ({1:.2f}, {2:.2f}) {3:g} -> ({4:.2f}, {5:.2f}) {6:g}{7}".format(
+            a.designator, a.x, a.y, a.rotation, b.x, b.y, b.rotation,
+            "" if a.footprint == b.footprint else " {0} -> {1}".format(a.footprint, b.footprint)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differences between revisions of the fabrication archives")
+    parser.add_argument("archives", nargs="*", help="old and new archive, default consecutive revisions")
+    parser.add_argument("--workers", type=int, help="worker processes for changed layers, default one per core")
+    args = parser.parse_args()
+
+    if args.archives:
+        if len(args.archives) != 2:
+            parser.error("give an old and a new archive")
+        pairs = [tuple(args.archives)]
+    else:
+        pairs = [pair for paths in revisions().values() for pair in zip(paths, paths[1:])]
+    if args.workers == 1:
+        for old, new in pairs:
+            print_diff(diff_archives(old, new))
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for old, new in pairs:
+                print_diff(diff_archives(old, new, executor=executor))
+
+
+if __name__ == "__main__":
+    main()
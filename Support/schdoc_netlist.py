@@ -0,0 +1,784 @@
+#!/usr/bin/python3
+# Netlist of the Altium schematics (*.SchDoc) of a project
+#
+# python3 schdoc_netlist.py                          # Project_Mainboard summary and timing
+# python3 schdoc_netlist.py --nets                   # every net and its pins
+# python3 schdoc_netlist.py --sheet SAO1             # components and ports of a sheet instance
+# python3 schdoc_netlist.py --sheet SAO1 --solve PWR=14.7 Din=5 --load HS,LS=10
+#
+# netlist = read_project(PROJECT_DIRS["mainboard"])
+# netlist.components["ISA1.R13"]           # Component(designator, lib_reference, comment, ...)
+# netlist.nets["GND"]                      # (("C3", "2"), ...)
+# circuit = netlist.circuit("SAO1", {"PWR": 14.7, "Din": 5}, loads=[("HS", "LS", 10)])
+# circuit.solve()                          # nodal_solver.OperatingPoint
+#
+# A SchDoc is an OLE compound file (CFB): fixed size sectors chained by a
+# file allocation table (FAT), a directory of streams in a red-black tree,
+# and small streams packed in 64 byte mini sectors. CompoundFile mmaps the
+# file and follows the chains on demand, so only the FAT, directory and
+# data sectors of the stream read are touched. The FileHeader stream is a
+# list of records, each a u32 (length | type << 24) and, for type 0, text
+# |KEY=VALUE|... Records refer to their owner (a pin to its component) by
+# position in the list, the header record not counted. Only the record
+# types needed for connectivity are split into fields.
+#
+# Connectivity of a sheet: wires, pins (at the end away from the body),
+# net labels, power ports, ports, sheet entries and junctions that meet at
+# a point, and points lying on a wire, are one net. Wires crossing without
+# a junction are not connected. The project is hierarchical (ports only
+# connect to the sheet entries of the sheet symbol above, net labels are
+# local to a sheet, power ports are global): every sheet symbol is an
+# instance of its sheet, components of sheets used more than once get the
+# channel designators of Altium, $RoomName.$Component (ISA1.R13). A bus
+# port or sheet entry (5V_HS_[1..28]) joins the nets labelled 5V_HS_1 ..
+# 5V_HS_28 on both sheets, the bus wires themselves are not traced. Signal
+# harnesses (SPI, I2C, UART) are not resolved, their nets stay per sheet.
+#
+# Net names: a power port, else the net label, sheet entry or port nearest
+# the top sheet (qualified by the instance path, Arduino_2560_schematics/
+# SAO1/HS), else Net<designator>_<pin> of its first pin.
+from collections import namedtuple
+import argparse
+import glob
+import mmap
+import os
+import re
+import struct
+import time
+
+from device_library import DATA_DIR, default_library
+from switch_bias_functions import fromSI
+
+REPO_DIR = os.path.dirname(DATA_DIR)
+
+PROJECT_DIRS = {
+    "mainboard": os.path.join(REPO_DIR, "Project_Mainboard"),
+    "connector": os.path.join(REPO_DIR, "Project_ConnectorBoard"),
+}
+
+CFB_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+HEADER_SIZE = 512
+# Sector sizes of versions 3 and 4 (512 and 4096 bytes), mini sectors are 64 bytes
+SECTOR_SHIFTS = (9, 12)
+MINI_SECTOR_SHIFT = 6
+
+# Sector numbers above MAXREGSECT end a chain (ENDOFCHAIN, FREESECT, ...)
+MAXREGSECT = 0xFFFFFFFA
+NOSTREAM = 0xFFFFFFFF
+STREAM = 2
+DIRECTORY_ENTRY_SIZE = 128
+
+# Record types
+COMPONENT, PIN, POWER_PORT, PORT, SHEET_SYMBOL, SHEET_ENTRY = 1, 2, 17, 18, 15, 16
+NET_LABEL, WIRE, JUNCTION, DESIGNATOR, PARAMETER = 25, 27, 29, 34, 41
+SHEET_NAME, SHEET_FILE_NAME = 32, 33
+NET_RECORDS = (COMPONENT, PIN, POWER_PORT, PORT, SHEET_SYMBOL, SHEET_ENTRY, NET_LABEL, WIRE,
+               JUNCTION, DESIGNATOR, PARAMETER, SHEET_NAME, SHEET_FILE_NAME)
+
+# Coordinates are in 10 mil, kept as integers of 1/FRACTION of that
+FRACTION = 100000
+
+# Pin orientation (PinConglomerate & 3): right, up, left, down
+PIN_DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+GROUND_NETS = ("GND", "AGND", "DGND", "0")
+
+# Component kinds (ComponentKindVersion2): standard, mechanical, graphical,
+# net tie (in BOM), net tie (no BOM), standard (no BOM), jumper
+STANDARD, MECHANICAL, GRAPHICAL, NET_TIE_BOM, NET_TIE, STANDARD_NO_BOM, JUMPER = range(7)
+NO_BOM_KINDS = (GRAPHICAL, NET_TIE, STANDARD_NO_BOM, JUMPER)
+
+# Designator letters of parts left out of DC circuits: capacitors,
+# connectors, jumpers and mounting holes
+OPEN_AT_DC = ("C", "J", "JW", "P", "H", "MH")
+
+_U32 = struct.Struct("<I")
+
+_BUS = re.compile(r"^(.*)\[(\d+)\.\.(\d+)\]$")
+
+DirectoryEntry = namedtuple("DirectoryEntry", ["sid", "name", "kind", "left", "right", "child",
+                                               "start", "size"])
+
+# A component of a sheet, pins: ((pin designator, pin name, local net), ...),
+# kind: one of the component kinds above
+SheetComponent = namedtuple("SheetComponent", ["designator", "lib_reference", "comment", "value",
+                                               "pins", "kind"])
+
+# entries: ((entry name, local net), ...)
+SheetSymbol = namedtuple("SheetSymbol", ["designator", "file_name", "entries"])
+
+# A component of the project, pins: ((pin designator, pin name, net name), ...)
+Component = namedtuple("Component", ["designator", "lib_reference", "comment", "value", "sheet",
+                                     "pins", "kind"])
+
+# path: sheet symbol designators from the top sheet joined by "/", room: the
+# channel prefix of its designators ("" if the sheet is used once), ports:
+# {port name: net name}
+SheetInstance = namedtuple("SheetInstance", ["path", "file_name", "room", "designators", "ports"])
+
+
+class CompoundFile:
+    """
+    Read only, memory mapped OLE compound file. Sectors of the FAT, the
+    directory and the mini stream are located on first use.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a compound file or a sector lies outside it
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                raise ValueError("{0} is not a compound file".format(path))
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != CFB_SIGNATURE:
+            self.close()
+            raise ValueError("{0} is not a compound file".format(path))
+        sector_shift, mini_shift = struct.unpack_from("<HH", self._map, 0x1E)
+        if sector_shift not in SECTOR_SHIFTS or mini_shift != MINI_SECTOR_SHIFT:
+            self.close()
+            raise ValueError("{0}: sector sizes 2**{1} / 2**{2} of no compound file version".format(
+                path, sector_shift, mini_shift))
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_shift
+        (_, directory_start, _, self.mini_cutoff, minifat_start, _,
+         difat_start, _) = struct.unpack_from("<8I", self._map, 0x2C)
+        self._per_sector = self.sector_size // 4
+        # FAT sector numbers: 109 in the header, the rest in a DIFAT chain
+        self._difat = list(struct.unpack_from("<109I", self._map, 0x4C))
+        self._difat_next = difat_start
+        self._directory = [directory_start]
+        self._minifat = [minifat_start]
+        self._mini_stream = None
+        self._entries = {}
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _offset(self, sector):
+        offset = (sector + 1) * self.sector_size
+        if sector >= MAXREGSECT or offset + self.sector_size > len(self._map):
+            raise ValueError("{0}: sector {1} outside the file".format(self.path, sector))
+        return offset
+
+    def _fat_sector(self, i):
+        while i >= len(self._difat):
+            if self._difat_next >= MAXREGSECT:
+                raise ValueError("{0}: FAT sector {1} missing".format(self.path, i))
+            offset = self._offset(self._difat_next)
+            # The last entry of a DIFAT sector is the next DIFAT sector
+            self._difat.extend(struct.unpack_from("<{0}I".format(self._per_sector - 1), self._map, offset))
+            self._difat_next = _U32.unpack_from(self._map, offset + self.sector_size - 4)[0]
+        return self._difat[i]
+
+    def _next(self, sector):
+        fat = self._fat_sector(sector // self._per_sector)
+        return _U32.unpack_from(self._map, self._offset(fat) + 4 * (sector % self._per_sector))[0]
+
+    def _nth(self, chain, n):
+        """Returns sector n of a chain, chain: its sectors found so far (extended)"""
+        while n >= len(chain):
+            if len(chain) * self.sector_size > len(self._map):
+                raise ValueError("{0}: sector chain loops".format(self.path))
+            chain.append(self._next(chain[-1]))
+        return chain[n]
+
+    def _chain(self, start):
+        sector, count = start, 0
+        while sector < MAXREGSECT:
+            yield sector
+            count += 1
+            if count * self.sector_size > len(self._map):
+                raise ValueError("{0}: sector chain loops".format(self.path))
+            sector = self._next(sector)
+
+    def entry(self, sid):
+        """Returns the DirectoryEntry of a stream id"""
+        if sid not in self._entries:
+            per_sector = self.sector_size // DIRECTORY_ENTRY_SIZE
+            offset = (self._offset(self._nth(self._directory, sid // per_sector))
+                      + DIRECTORY_ENTRY_SIZE * (sid % per_sector))
+            name_size, kind, _, left, right, child = struct.unpack_from("<HBBIII", self._map, offset + 64)
+            start, size = struct.unpack_from("<IQ", self._map, offset + 116)
+            if self.sector_size == 512:
+                # Version 3 files may leave garbage in the high 32 bits
+                size &= 0xFFFFFFFF
+            name = self._map[offset:offset + max(name_size - 2, 0)].decode("utf-16-le")
+            self._entries[sid] = DirectoryEntry(sid, name, kind, left, right, child, start, size)
+        return self._entries[sid]
+
+    def find(self, path):
+        """
+        Returns the DirectoryEntry of a "/" separated stream or storage path
+
+        Raises
+        ------
+        KeyError
+            If there is no such entry
+        """
+        entry = self.entry(0)
+        for name in path.split("/"):
+            # Siblings are a red-black tree ordered by name length, then upper case name
+            key = (len(name), name.upper())
+            sid = entry.child
+            while sid != NOSTREAM:
+                entry = self.entry(sid)
+                other = (len(entry.name), entry.name.upper())
+                if key == other:
+                    break
+                sid = entry.left if key < other else entry.right
+            else:
+                raise KeyError(path)
+        return entry
+
+    def read(self, path):
+        """
+        Returns the bytes of a stream
+
+        Raises
+        ------
+        KeyError
+            If there is no such stream
+        """
+        entry = self.find(path)
+        if entry.kind != STREAM:
+            raise KeyError(path)
+        if entry.size < self.mini_cutoff:
+            return self._read_mini(entry)
+        size = self.sector_size
+        return b"".join(self._map[self._offset(s):self._offset(s) + size]
+                        for s in self._chain(entry.start))[:entry.size]
+
+    def _read_mini(self, entry):
+        if self._mini_stream is None:
+            self._mini_stream = [self.entry(0).start]
+        per_minifat = self._per_sector
+        minis_per_sector = self.sector_size // self.mini_sector_size
+        parts, sector, count = [], entry.start, 0
+        while sector < MAXREGSECT and count * self.mini_sector_size < entry.size:
+            container = self._nth(self._mini_stream, sector // minis_per_sector)
+            offset = self._offset(container) + self.mini_sector_size * (sector % minis_per_sector)
+            parts.append(self._map[offset:offset + self.mini_sector_size])
+            fat = self._offset(self._nth(self._minifat, sector // per_minifat))
+            sector = _U32.unpack_from(self._map, fat + 4 * (sector % per_minifat))[0]
+            count += 1
+        return b"".join(parts)[:entry.size]
+
+
+def iter_records(data, types=NET_RECORDS):
+    """
+    Yields (index, record type, {KEY: value}) of the text records of a
+    FileHeader stream whose type is in types, index as used by OwnerIndex
+    (the header record is -1). Other records are skipped without splitting
+    them.
+    """
+    prefixes = tuple("|RECORD={0}|".format(kind).encode() for kind in types)
+    pos, index, end = 0, -1, len(data)
+    while pos + 4 <= end:
+        header = _U32.unpack_from(data, pos)[0]
+        start, pos = pos + 4, pos + 4 + (header & 0xFFFFFF)
+        if header >> 24 == 0 and data.startswith(prefixes, start, pos):
+            fields = {}
+            for field in data[start:pos].rstrip(b"\0").decode("latin-1").split("|"):
+                key, _, value = field.partition("=")
+                if key.startswith("%UTF8%"):
+                    key, value = key[6:], value.encode("latin-1").decode("utf-8", "replace")
+                fields[key] = value
+            yield index, int(fields["RECORD"]), fields
+        index += 1
+
+
+def _coordinate(fields, key):
+    return int(fields.get(key, 0)) * FRACTION + int(fields.get(key + "_Frac", 0))
+
+
+def _point(fields, key="Location"):
+    return _coordinate(fields, key + ".X"), _coordinate(fields, key + ".Y")
+
+
+def _entry_name(name):
+    # Sheet entry and port names carry overbars as backslashes, D\i\n\
+    return name.replace("\\", "").upper()
+
+
+def bus_members(name):
+    """Returns the net names of a bus port or entry, PWM[1..2] -> PWM1, PWM2"""
+    match = _BUS.match(_entry_name(name))
+    if not match:
+        return []
+    prefix, first, last = match.group(1), int(match.group(2)), int(match.group(3))
+    step = 1 if last >= first else -1
+    return ["{0}{1}".format(prefix, i) for i in range(first, last + step, step)]
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = []
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[b] = a
+
+
+class Sheet:
+    """
+    Components, sheet symbols and local nets of one SchDoc. Nets are
+    numbered 0..net_count-1, pins, sheet entries, labels, power ports and
+    ports refer to them by number.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file_name = os.path.basename(path)
+        with CompoundFile(path) as cfb:
+            records = list(iter_records(cfb.read("FileHeader")))
+        self._connect(records)
+
+    def _connect(self, records):
+        uf = _UnionFind()
+        points = {}
+        owned = {}
+        wires = []
+        for index, kind, fields in records:
+            if "OwnerIndex" in fields:
+                owned.setdefault(int(fields["OwnerIndex"]), []).append((index, kind, fields))
+
+        def attach(point):
+            node = uf.add()
+            uf.union(points.setdefault(point, node), node)
+            return node
+
+        components, symbols, labels, power, ports = [], [], [], [], []
+        for index, kind, fields in records:
+            if kind == COMPONENT:
+                components.append((index, fields))
+            elif kind == SHEET_SYMBOL:
+                symbols.append((index, fields))
+            elif kind == WIRE:
+                vertices = [(_coordinate(fields, "X{0}".format(i)), _coordinate(fields, "Y{0}".format(i)))
+                            for i in range(1, int(fields.get("LocationCount", 0)) + 1)]
+                node = uf.add()
+                for vertex in vertices:
+                    uf.union(node, attach(vertex))
+                wires.append((node, vertices))
+            elif kind == NET_LABEL or (kind == POWER_PORT and fields.get("IsCrossSheetConnector") == "T"):
+                labels.append((attach(_point(fields)), fields.get("Text", "")))
+            elif kind == POWER_PORT:
+                power.append((attach(_point(fields)), fields.get("Text", "")))
+            elif kind == PORT:
+                x, y = _point(fields)
+                width = _coordinate(fields, "Width")
+                # Styles 0-3 are horizontal ports, 4-7 vertical
+                end = (x + width, y) if int(fields.get("Style", 0)) < 4 else (x, y + width)
+                node = attach((x, y))
+                uf.union(node, attach(end))
+                ports.append((node, fields.get("Name", "")))
+            elif kind == JUNCTION:
+                attach(_point(fields))
+
+        pins = {}
+        for index, fields in components:
+            part = fields.get("CurrentPartId", "1")
+            mode = fields.get("DisplayMode", "0")
+            for _, kind, pin in owned.get(index, ()):
+                if (kind != PIN or pin.get("OwnerPartId", "0") not in ("0", part)
+                        or pin.get("OwnerPartDisplayMode", "0") != mode):
+                    continue
+                x, y = _point(pin)
+                dx, dy = PIN_DIRECTIONS[int(pin.get("PinConglomerate", 0)) & 3]
+                length = _coordinate(pin, "PinLength")
+                node = attach((x + dx * length, y + dy * length))
+                pins.setdefault(index, []).append((pin.get("Designator", ""), pin.get("Name", ""), node))
+                if pin.get("HiddenNetName"):
+                    power.append((node, pin["HiddenNetName"]))
+
+        entries = {}
+        for index, fields in symbols:
+            x, y = _point(fields)
+            width, height = _coordinate(fields, "XSize"), _coordinate(fields, "YSize")
+            for _, kind, entry in owned.get(index, ()):
+                if kind != SHEET_ENTRY:
+                    continue
+                # DistanceFromTop counts steps of 10 units, its fraction is in millionths of a step
+                distance = (int(entry.get("DistanceFromTop", 0)) * 10 * FRACTION
+                            + int(entry.get("DistanceFromTop_Frac1", 0)) * 10 * FRACTION // 1000000)
+                side = int(entry.get("Side", 0))
+                point = ((x, y - distance), (x + width, y - distance),
+                         (x + distance, y), (x + distance, y - height))[side & 3]
+                entries.setdefault(index, []).append((entry.get("Name", ""), attach(point)))
+
+        # Labels and ports of the same name on a sheet are one net
+        for objects in (labels, ports):
+            first = {}
+            for node, text in objects:
+                uf.union(first.setdefault(_entry_name(text), node), node)
+
+        # Points on a wire (not only at its vertices) connect to it
+        horizontal, vertical, oblique = {}, {}, []
+        for node, vertices in wires:
+            for (x1, y1), (x2, y2) in zip(vertices, vertices[1:]):
+                if y1 == y2:
+                    horizontal.setdefault(y1, []).append((min(x1, x2), max(x1, x2), node))
+                elif x1 == x2:
+                    vertical.setdefault(x1, []).append((min(y1, y2), max(y1, y2), node))
+                else:
+                    oblique.append((x1, y1, x2, y2, node))
+        for (x, y), node in points.items():
+            for low, high, wire in horizontal.get(y, ()):
+                if low <= x <= high:
+                    uf.union(wire, node)
+            for low, high, wire in vertical.get(x, ()):
+                if low <= y <= high:
+                    uf.union(wire, node)
+            for x1, y1, x2, y2, wire in oblique:
+                if ((x - x1) * (y2 - y1) == (y - y1) * (x2 - x1)
+                        and min(x1, x2) <= x <= max(x1, x2) and min(y1, y2) <= y <= max(y1, y2)):
+                    uf.union(wire, node)
+
+        numbers = {}
+
+        def net(node):
+            return numbers.setdefault(uf.find(node), len(numbers))
+
+        self.components = []
+        for index, fields in components:
+            parameters = {p.get("Name"): p.get("Text", "") for _, kind, p in owned.get(index, ())
+                          if kind in (PARAMETER, DESIGNATOR)}
+            comment = parameters.get("Comment", "")
+            if comment.startswith("="):
+                comment = parameters.get(comment[1:], "")
+            self.components.append(SheetComponent(
+                parameters.get("Designator", ""), fields.get("LibReference", ""), comment,
+                parameters.get("Value", ""),
+                tuple((number, name, net(node)) for number, name, node in pins.get(index, ())),
+                int(fields.get("ComponentKindVersion2", fields.get("ComponentKind", STANDARD)))))
+        self.symbols = []
+        for index, fields in symbols:
+            texts = {kind: f.get("Text", "") for _, kind, f in owned.get(index, ())}
+            self.symbols.append(SheetSymbol(
+                texts.get(SHEET_NAME, ""), texts.get(SHEET_FILE_NAME, ""),
+                tuple((name, net(node)) for name, node in entries.get(index, ()))))
+        self.labels = [(net(node), text) for node, text in labels]
+        self.label_nets = {_entry_name(text): net for net, text in self.labels}
+        self.power = [(net(node), text) for node, text in power]
+        self.ports = [(net(node), name) for node, name in ports]
+        for node in points.values():
+            net(node)
+        self.net_count = len(numbers)
+
+
+def _qualified(path, name):
+    return "{0}/{1}".format(path, name) if path else name
+
+
+class Netlist:
+    """
+    Flattened netlist of a hierarchical project: components by (channel)
+    designator, nets {name: ((designator, pin designator), ...)} and the
+    sheet instances by path
+    """
+    def __init__(self, components, nets, instances):
+        self.components = components
+        self.nets = nets
+        self.instances = instances
+
+    @classmethod
+    def from_sheets(cls, sheets, top=None):
+        """
+        Returns the Netlist of Sheets, starting from top (file name), by
+        default the sheet no sheet symbol refers to
+
+        Raises
+        ------
+        KeyError
+            If a sheet symbol refers to a sheet that is not given
+        ValueError
+            If there is no single top sheet or a sheet includes itself
+        """
+        by_name = {sheet.file_name.upper(): sheet for sheet in sheets}
+        uses = {}
+        for sheet in sheets:
+            for symbol in sheet.symbols:
+                uses[symbol.file_name.upper()] = uses.get(symbol.file_name.upper(), 0) + 1
+        if top is None:
+            tops = [name for name in by_name if name not in uses]
+            if len(tops) != 1:
+                raise ValueError("Top sheet is one of {0}, give one".format(sorted(tops)))
+            top = tops[0]
+
+        uf = _UnionFind()
+        global_nets = {}
+        # (priority, depth, name) candidates of the net names, per node
+        names = {}
+        pins = []
+        instances = {}
+        components = {}
+
+        def name(node, priority, depth, text):
+            names.setdefault(node, []).append((priority, depth, text))
+
+        def visit(sheet, path, room, stack):
+            if sheet.file_name.upper() in stack:
+                raise ValueError("{0} includes itself".format(sheet.file_name))
+            base = len(uf.parent)
+            for _ in range(sheet.net_count):
+                uf.add()
+            depth = path.count("/") + 1 if path else 0
+            for net, text in sheet.power:
+                uf.union(global_nets.setdefault(text.upper(), base + net), base + net)
+                name(base + net, 0, 0, text)
+            for net, text in sheet.labels:
+                name(base + net, 1, depth, _qualified(path, text))
+            for net, text in sheet.ports:
+                name(base + net, 3, depth, _qualified(path, text.replace("\\", "")))
+            designators = []
+            for component in sheet.components:
+                designator = "{0}.{1}".format(room, component.designator) if room else component.designator
+                designators.append(designator)
+                components[designator] = (component, sheet.file_name, base)
+                for number, _, net in component.pins:
+                    pins.append((base + net, designator, number))
+            for symbol in sheet.symbols:
+                child = by_name[symbol.file_name.upper()]
+                child_path = _qualified(path, symbol.designator)
+                child_room = room
+                if uses[symbol.file_name.upper()] > 1:
+                    # Rooms of nested channels are joined by "_"
+                    child_room = "{0}_{1}".format(room, symbol.designator) if room else symbol.designator
+                child_base = visit(child, child_path, child_room, stack | {sheet.file_name.upper()})
+                child_ports = {}
+                for net, port in child.ports:
+                    child_ports.setdefault(_entry_name(port), []).append(net)
+                for entry, net in symbol.entries:
+                    name(base + net, 2, depth, _qualified(path, entry.replace("\\", "")))
+                    for port_net in child_ports.get(_entry_name(entry), ()):
+                        uf.union(base + net, child_base + port_net)
+                    for member in bus_members(entry):
+                        if member in sheet.label_nets and member in child.label_nets:
+                            uf.union(base + sheet.label_nets[member], child_base + child.label_nets[member])
+            instances[path] = (sheet, room, base, designators)
+            return base
+
+        visit(by_name[top.upper()], "", "", frozenset())
+
+        # Pick a name per net, the first pin's automatic name if nothing else
+        for node, designator, number in sorted(pins, key=lambda pin: (pin[1], pin[2])):
+            name(node, 4, 0, "Net{0}_{1}".format(designator, number))
+        best = {}
+        for node, candidates in names.items():
+            root = uf.find(node)
+            candidate = min(candidates)
+            if root not in best or candidate < best[root]:
+                best[root] = candidate
+        net_names = {root: candidate[2] for root, candidate in best.items()}
+
+        nets = {}
+        for node, designator, number in pins:
+            nets.setdefault(net_names[uf.find(node)], []).append((designator, number))
+        nets = {name: tuple(sorted(members)) for name, members in sorted(nets.items())}
+        flat = {}
+        for designator, (component, file_name, base) in sorted(components.items()):
+            flat[designator] = Component(
+                designator, component.lib_reference, component.comment, component.value, file_name,
+                tuple((number, pin_name, net_names[uf.find(base + net)])
+                      for number, pin_name, net in component.pins), component.kind)
+        flat_instances = {}
+        for path, (sheet, room, base, designators) in instances.items():
+            ports = {port.replace("\\", ""): net_names.get(uf.find(base + net))
+                     for net, port in sheet.ports}
+            flat_instances[path] = SheetInstance(path, sheet.file_name, room, tuple(designators), ports)
+        return cls(flat, nets, flat_instances)
+
+    def instance(self, name):
+        """
+        Returns the SheetInstance of a path, or of the last sheet symbol
+        designators of one ("SAO1")
+
+        Raises
+        ------
+        KeyError
+            If no instance matches
+        ValueError
+            If several do
+        """
+        if name in self.instances:
+            return self.instances[name]
+        found = [instance for path, instance in self.instances.items() if path.endswith("/" + name)]
+        if not found:
+            raise KeyError(name)
+        if len(found) > 1:
+            raise ValueError("{0} is any of {1}".format(name, [instance.path for instance in found]))
+        return found[0]
+
+    def pin_nets(self, designator):
+        """Returns {pin name: net name} of a component"""
+        return {pin_name: net for _, pin_name, net in self.components[designator].pins}
+
+    def circuit(self, instance, supplies, loads=(), library=None):
+        """
+        Returns a nodal_solver.Circuit of the components of a sheet
+        instance, nodes named by net (GROUND_NETS are ground) and elements
+        by designator, FETs with several gates as <designator>:<gate pin
+        suffix> (Q3:P1, Q3:N1). Resistor values come from the Value
+        parameter, transistors from the device library by comment,
+        OPEN_AT_DC parts are left out.
+
+        supplies: {port or net name: V}
+        loads: ((port or net, port or net, Ohm), ...)
+
+        Raises
+        ------
+        KeyError
+            If a transistor is not in the device library, or a supply or
+            load is neither a port of the instance nor a net
+        ValueError
+            If a component has no DC model or its value is not a number
+        """
+        from nodal_solver import Circuit
+
+        library = default_library() if library is None else library
+        instance = self.instance(instance) if isinstance(instance, str) else instance
+
+        def node(name):
+            net = instance.ports.get(name, name)
+            if net not in self.nets:
+                raise KeyError("{0} is not a port of {1} or a net".format(name, instance.path))
+            return "gnd" if net.upper() in GROUND_NETS else net
+
+        circuit = Circuit()
+        for name, V in supplies.items():
+            circuit.supply(node(name), V)
+        for designator in instance.designators:
+            component = self.components[designator]
+            part = component.comment or component.lib_reference
+            terminals = {}
+            for _, pin_name, net in component.pins:
+                terminals.setdefault(pin_name.upper(), node(net))
+            kind = re.match(r"[A-Z]*", designator.rpartition(".")[2].upper()).group()
+            if kind in OPEN_AT_DC:
+                continue
+            if kind == "R":
+                nets = list(terminals.values())
+                circuit.resistor(nets[0], nets[-1], fromSI(component.value or component.comment, "Ohm"),
+                                 name=designator)
+            elif kind == "Q" and _is_bjt(part, library):
+                Q = library.bjt(part)
+                add = circuit.npn if Q.polarity.upper() == "NPN" else circuit.pnp
+                add(_terminal(terminals, "C"), _terminal(terminals, "B"), _terminal(terminals, "E"),
+                    beta=Q.beta, Vbe_sat=Q.Vbe_sat, name=designator)
+            elif kind == "Q":
+                channels = library.channels(part)
+                gates = [pin_name for pin_name in terminals if pin_name.startswith("G")]
+                for gate in gates:
+                    # One FET per gate pin: G, G1, GN1 (channel N, unit 1), ...
+                    unit = gate[1:]
+                    channel = channels[0] if len(channels) == 1 else unit[:1]
+                    Q = library.fet(part, channel)
+                    add = circuit.nfet if Q.channel.upper() == "N" else circuit.pfet
+                    add(_terminal(terminals, "D" + unit), terminals[gate], _terminal(terminals, "S" + unit),
+                        Q.Vth, Q.K, Q.lam, name=designator + (":" + unit if len(gates) > 1 else ""))
+            else:
+                raise ValueError("{0} ({1}) has no DC model".format(designator, part))
+        for a, b, R in loads:
+            circuit.resistor(node(a), node(b), R)
+        return circuit
+
+
+def _is_bjt(part, library):
+    try:
+        library.bjt(part)
+        return True
+    except KeyError:
+        return False
+
+
+def _terminal(terminals, name):
+    try:
+        return terminals[name]
+    except KeyError:
+        raise ValueError("No {0} pin in {1}".format(name, sorted(terminals)))
+
+
+def project_sheets(directory):
+    """Returns the SchDoc paths of a project directory, sorted"""
+    return sorted(glob.glob(os.path.join(directory, "*.SchDoc")))
+
+
+def read_project(directory, top=None):
+    """Returns the Netlist of the SchDocs of a project directory"""
+    return Netlist.from_sheets([Sheet(path) for path in project_sheets(directory)], top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Netlist of the Altium schematics of a project")
+    parser.add_argument("project", nargs="?", default="mainboard",
+                        help="{0} or a directory of SchDocs".format(", ".join(PROJECT_DIRS)))
+    parser.add_argument("--top", help="top sheet file name, default the one no sheet refers to")
+    parser.add_argument("--nets", action="store_true", help="print every net and its pins")
+    parser.add_argument("--components", action="store_true", help="print every component")
+    parser.add_argument("--sheet", help="print a sheet instance, path or sheet symbol designator")
+    parser.add_argument("--solve", nargs="*", metavar="NET=V",
+                        help="DC operating point of --sheet with these supplies (ports or nets)")
+    parser.add_argument("--load", action="append", default=[], metavar="A,B=OHM",
+                        help="load resistor of --solve between two ports or nets")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    netlist = read_project(PROJECT_DIRS.get(args.project, args.project), args.top)
+    elapsed = time.perf_counter() - start
+    print("{0}: {1} sheet instances, {2} components, {3} nets in {4:.3f}s".format(
+        args.project, len(netlist.instances), len(netlist.components), len(netlist.nets), elapsed))
+    if args.components:
+        for component in netlist.components.values():
+            print("  {0:12s} {1:16.16s} {2:16.16s} {3}".format(
+                component.designator, component.comment or component.lib_reference, component.value,
+                component.sheet))
+    if args.nets:
+        for name, members in netlist.nets.items():
+            print("  {0}: {1}".format(name, " ".join("{0}-{1}".format(*pin) for pin in members)))
+    if args.sheet:
+        instance = netlist.instance(args.sheet)
+        print("{0} ({1}):".format(instance.path, instance.file_name))
+        for port, net in sorted(instance.ports.items()):
+            print("  port {0:8s} {1}".format(port, net))
+        for designator in instance.designators:
+            component = netlist.components[designator]
+            print("  {0:12s} {1:16.16s} {2:8s} {3}".format(
+                designator, component.comment or component.lib_reference, component.value,
+                " ".join("{0}={1}".format(pin_name, net) for _, pin_name, net in component.pins)))
+        if args.solve is not None:
+            supplies = {}
+            for text in args.solve:
+                net, _, V = text.partition("=")
+                supplies[net] = fromSI(V, "V")
+            loads = []
+            for text in args.load:
+                nets, _, R = text.partition("=")
+                a, _, b = nets.partition(",")
+                loads.append((a, b, fromSI(R, "Ohm")))
+            op = netlist.circuit(instance, supplies, loads).solve()
+            for node in op.circuit.nodes:
+                print("  V({0}) = {1:.4g}".format(node, float(op.voltage(node))))
+
+
+if __name__ == "__main__":
+    main()
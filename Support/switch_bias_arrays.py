@@ -0,0 +1,326 @@
+#!/usr/bin/python3
+# Array versions of npn_calculate / nfet_calculate / pfet_calculate.
+# Every argument may be a scalar or a NumPy array, arguments are broadcast
+# against each other so a whole sweep grid is evaluated in one call.
+#
+# With table= (an iv_tables.FetTable of the part) the FET operating points
+# follow the tabulated characteristic, including the channel-length
+# modulation the closed forms leave out: the square-law point is refined by
+# TABLE_NEWTON_STEPS Newton steps on the table. The steps make
+# hi_low_switch_array about 2.5x slower than the closed forms, the table is
+# for fidelity, not speed. For a part without lam (table.lam == 0) the closed
+# forms are already exact and the table is not evaluated.
+from math import log10
+
+import numpy as np
+
+from switch_bias_functions import SI_DEC_PREFIXES, SI_INC_PREFIXES
+
+# Region codes stored in the "region" field of the result arrays
+REGION_CUT = 0
+REGION_SAT = 1
+REGION_TRI = 2
+REGION_ACTIVE = 3
+REGION_NAMES = np.array(["cut", "sat", "tri", "act"])
+
+# Newton steps from the square-law point on an I-V table
+TABLE_NEWTON_STEPS = 2
+
+NPN_DTYPE = np.dtype([("Ib", "f8"), ("Ic", "f8"), ("Vce", "f8"), ("Vb", "f8"),
+                      ("Vc", "f8"), ("Ve", "f8"), ("power", "f8"), ("region", "i1")])
+
+FET_DTYPE = np.dtype([("Id", "f8"), ("Vds", "f8"), ("power", "f8"), ("region", "i1")])
+
+
+def sweep_grid(*axes):
+    """
+    Returns open (sparse) grids of the given 1-D axes, e.g.
+    Vsig, Vsc = sweep_grid([0, 3.3, 5], np.linspace(3.3, 14.7, 1000))
+    broadcasts to a (3, 1000) result when passed to the *_array functions
+    """
+    return np.meshgrid(*[np.asarray(axis, dtype=float) for axis in axes],
+                       indexing="ij", sparse=True)
+
+
+def region_names(region):
+    """
+    Returns the "cut"/"sat"/"tri"/"act" strings used by the scalar functions
+    for an array of region codes
+    """
+    return REGION_NAMES[np.asarray(region)]
+
+
+# Prefix of toSI degrees -8 ... 8 at index degree + 8
+SI_PREFIXES = np.array(SI_DEC_PREFIXES[::-1] + [""] + SI_INC_PREFIXES)
+SI_DEGREE_MAX = len(SI_INC_PREFIXES)
+
+
+def toSI_array(d, unit="", digits=2):
+    """
+    Array form of toSI, returns a string array of the shape of d with the
+    same text toSI gives for every element (prefixes clamped at Y / y).
+    NaN and inf, which toSI can not format, give "nan" / "inf" plus unit.
+    """
+    shape = np.shape(d)
+    d = np.asarray(d, dtype=float).ravel()
+    if not d.size:
+        return np.zeros(shape, dtype=str)
+    magnitude = np.abs(d)
+    finite = np.isfinite(d) & (d != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        third = np.log10(np.where(finite, magnitude, 1)) / 3
+    # np.log10 may round differently from math.log10, redo the values
+    # next to a prefix boundary with the scalar function
+    near = finite & (np.abs(third - np.round(third)) < 1e-9)
+    third[near] = [log10(value) / 3 for value in magnitude[near]]
+    degree = np.clip(np.floor(third), -SI_DEGREE_MAX, SI_DEGREE_MAX).astype(int)
+
+    scaled = d * np.power(1000.0, -degree.astype(float))
+    text = _fixed(scaled, digits)
+    return np.char.add(np.char.add(text, SI_PREFIXES[degree + SI_DEGREE_MAX]), unit).reshape(shape)
+
+
+def _fixed(x, digits):
+    """
+    Returns "%3.{digits}f" % x for every element of a 1-D array. Digits
+    are formatted as integers, only values whose rounding is within reach
+    of a half (where x * 10**digits itself is rounded) go through str
+    formatting.
+    """
+    scale = 10**digits
+    y = np.abs(x) * scale
+    with np.errstate(invalid="ignore"):
+        fraction = y - np.floor(y)
+        exact = np.isfinite(y) & (y < 2**52) & (np.abs(fraction - 0.5) > 1e-6)
+    n = np.rint(np.where(exact, y, 0)).astype(np.int64)
+    text = (n // scale).astype(str)
+    if digits:
+        text = np.char.add(np.char.add(text, "."), np.char.zfill((n % scale).astype(str), digits))
+    text = np.where(np.signbit(x), np.char.add("-", text), text)
+    text = np.char.rjust(text, 3)
+    if not exact.all():
+        text = text.astype(object)
+        text[~exact] = np.char.mod("%3.{0}f".format(digits), x[~exact])
+        text = text.astype(str)
+    return text
+
+
+def _broadcast(*args):
+    return np.broadcast_arrays(*[np.asarray(arg, dtype=float) for arg in args])
+
+
+def npn_calculate_array(Vbe, Vce_sat, beta, Vcc, Vbb, Rb, Rc, Re=0, Vee=0):
+    """
+    Array form of npn_calculate
+
+    Returns
+    -------
+    numpy structured array of NPN_DTYPE with fields
+    Ib, Ic, Vce, Vb, Vc, Ve, power, region
+    """
+    Vbe, Vce_sat, beta, Vcc, Vbb, Rb, Rc, Re, Vee = _broadcast(
+        Vbe, Vce_sat, beta, Vcc, Vbb, Rb, Rc, Re, Vee)
+    result = np.empty(Vbb.shape, dtype=NPN_DTYPE)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Assume BJT is in active region
+        Ib = (Vbb - Vbe - Vee) / (Rb + ((beta + 1) * Re))
+        Ic = beta * Ib
+        Ie = (beta + 1) * Ib
+        Vce = Vcc - (Ic * Rc) - (Ie * Re) - Vee
+
+        cut = (Vbb >= 0) & (Vbb <= Vbe)
+        sat = ~cut & (Vce <= Vce_sat) & (Ib > 0) & (Ic > 0)
+
+        # BJT in Saturation Region, (beta * Ib) > Ic > 0
+        Vce = np.where(sat, Vce_sat, Vce)
+        Ic = np.where(sat, (Vcc - Vce - Vee - (Ib * Re)) / (Re + Rc), Ic)
+        Ie = np.where(sat, Ib + Ic, Ie)
+
+    Ve = Ie * Re
+    result["Ib"] = np.where(cut, 0, Ib)
+    result["Ic"] = np.where(cut, 0, Ic)
+    result["Vce"] = np.where(cut, Vcc - Vee, Vce)
+    result["Vb"] = np.where(cut, Vbb, Ve + Vbe)
+    result["Vc"] = np.where(cut, Vcc, Ve + Vce)
+    result["Ve"] = np.where(cut, Vee, Ve)
+    result["power"] = np.where(cut, 0, (Ic * Vce) + (Ib * Vbe))
+    result["region"] = np.select([cut, sat], [REGION_CUT, REGION_SAT], REGION_ACTIVE)
+    return result
+
+
+def _table_refine(table, Vov, K, I, V, Rd, Vds_sat, Vds_tri):
+    """
+    Returns (Id_sat, Vds_sat, Vds_tri) of the tabulated characteristic, all
+    in device polarity: Vds_sat on the load line from V through Rd, Vds_tri
+    where the triode current is I. Newton steps start from the square-law
+    values given.
+    """
+    for _ in range(TABLE_NEWTON_STEPS):
+        Id, _, gds = table.evaluate(Vov, Vds_sat, K)
+        Vds_sat = Vds_sat - (Vds_sat + Id * Rd - V) / (1 + gds * Rd)
+        Id, _, gds = table.evaluate(Vov, Vds_tri, K)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(gds > 0, (Id - I) / gds, 0)
+        Vds_tri = np.clip(Vds_tri - step, 0, Vov)
+    return (V - Vds_sat) / Rd, Vds_sat, Vds_tri
+
+
+def nfet_calculate_array(Vgs, Vth, K, Ids, Vdd, Rd, table=None):
+    """
+    Array form of nfet_calculate, N-Channel common source topology
+
+    Triode points where the requested Ids can not be reached are NaN
+
+    table: iv_tables.FetTable of the part, used instead of the square law
+    when it has channel-length modulation
+
+    Returns
+    -------
+    numpy structured array of FET_DTYPE with fields Id, Vds, power, region
+    """
+    Vgs, Vth, K, Ids, Vdd, Rd = _broadcast(Vgs, Vth, K, Ids, Vdd, Rd)
+    result = np.empty(Vgs.shape, dtype=FET_DTYPE)
+
+    Vov = Vgs - Vth
+    cut = Vov < 0
+
+    # Assume saturation region where Vds >= Vgs - Vth
+    Id_sat = K/2 * Vov**2
+    Vds_sat = Vdd - (Id_sat * Rd)
+
+    # Triode region, Vds < Vgs - Vth: smaller root of
+    # (K/2) Vds**2 - K Vov Vds + Ids = 0, in cancellation free form
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.sqrt(Vov**2 - (2 * Ids / K))
+        Vds_tri = (2 * Ids / K) / (Vov + root)
+        Vds_tri = np.where(Vov + root == 0, Vov, Vds_tri)
+
+    if table is not None and table.lam:
+        Id_sat, Vds_sat, Vds_tri = _table_refine(table, Vov, K, Ids, Vdd, Rd, Vds_sat, Vds_tri)
+    sat = ~cut & (Vds_sat >= Vov)
+    tri = ~cut & ~sat
+
+    Id = np.select([cut, sat], [0, Id_sat], Ids)
+    Vds = np.select([cut, sat], [0, Vds_sat], Vds_tri)
+    result["Id"] = Id
+    result["Vds"] = Vds
+    result["power"] = Id * Vds
+    result["region"] = np.select([cut, sat, tri], [REGION_CUT, REGION_SAT, REGION_TRI])
+    return result
+
+
+def pfet_calculate_array(Vgs, Vth, K, Isd, Vss, Rd, table=None):
+    """
+    Array form of pfet_calculate, P-Channel common source topology
+
+    Triode points where the requested Isd can not be reached are NaN
+
+    table: iv_tables.FetTable of the part, used instead of the square law
+    when it has channel-length modulation
+
+    Returns
+    -------
+    numpy structured array of FET_DTYPE with fields Id, Vds, power, region
+    """
+    Vgs, Vth, K, Isd, Vss, Rd = _broadcast(Vgs, Vth, K, Isd, Vss, Rd)
+    result = np.empty(Vgs.shape, dtype=FET_DTYPE)
+
+    Vov = Vgs - Vth
+    cut = Vov > 0
+
+    # Assume saturation region where Vds <= Vgs - Vth
+    Id_sat = K/2 * Vov**2
+    Vds_sat = (Id_sat * Rd) - Vss
+
+    # Triode region, Vds > Vgs - Vth: larger (closer to zero) root of
+    # (K/2) Vds**2 - K Vov Vds + Isd = 0, in cancellation free form
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.sqrt(Vov**2 - (2 * Isd / K))
+        Vds_tri = (2 * Isd / K) / (Vov - root)
+        Vds_tri = np.where(Vov - root == 0, Vov, Vds_tri)
+
+    if table is not None and table.lam:
+        # Tables are in device polarity, Vsg and Vsd
+        Id_sat, Vsd_sat, Vsd_tri = _table_refine(table, -Vov, K, Isd, Vss, Rd, -Vds_sat, -Vds_tri)
+        Vds_sat, Vds_tri = -Vsd_sat, -Vsd_tri
+    sat = ~cut & (Vds_sat <= Vov)
+    tri = ~cut & ~sat
+
+    Id = np.select([cut, sat], [0, Id_sat], Isd)
+    Vds = np.select([cut, sat], [0, Vds_sat], Vds_tri)
+    result["Id"] = Id
+    result["Vds"] = Vds
+    result["power"] = -Id * Vds
+    result["region"] = np.select([cut, sat, tri], [REGION_CUT, REGION_SAT, REGION_TRI])
+    return result
+
+
+HI_LOW_DTYPE = np.dtype([("Ib", "f8"), ("Ic", "f8"), ("Vce", "f8"), ("P_q3", "f8"),
+                         ("Vgs_q1", "f8"), ("Vds_q1", "f8"), ("P_q1", "f8"), ("region_q1", "i1"),
+                         ("Vgs_q2", "f8"), ("Vds_q2", "f8"), ("P_q2", "f8"), ("region_q2", "i1"),
+                         ("Vdrop", "f8"), ("Id", "f8")])
+
+
+def hi_low_switch_array(Vsig, Vsc, Rb, R1, Rload, load_current, Vbe_sat, Vce_sat,
+                        beta, Vth_q1, K_q1, Vth_q2, K_q2, active_load=True, table_q1=None, table_q2=None):
+    """
+    Array form of the hi_low_switch_bias.py circuit, Q3 (NPN) pulls the gate
+    of the high side Q1 (P-Chan) low, Vsig drives the low side Q2 (N-Chan)
+
+    table_q1, table_q2: iv_tables.FetTable of Q1 / Q2, None for the square law
+
+    Returns
+    -------
+    numpy structured array of HI_LOW_DTYPE, Vdrop and Id are the load
+    voltage and current
+    """
+    q3 = npn_calculate_array(Vbe=Vbe_sat, Vce_sat=Vce_sat, beta=beta, Vcc=Vsc,
+                             Vbb=Vsig, Rb=Rb, Rc=R1)
+    Vgs_q1 = q3["Vce"] - Vsc
+    Vgs_q2 = np.broadcast_to(np.asarray(Vsig, dtype=float), q3.shape)
+
+    q1 = pfet_calculate_array(Vgs=Vgs_q1, Vth=Vth_q1, K=K_q1, Isd=load_current, Vss=Vsc, Rd=Rload,
+                              table=table_q1)
+    q2 = nfet_calculate_array(Vgs=Vgs_q2, Vth=Vth_q2, K=K_q2, Ids=load_current, Vdd=Vsc, Rd=Rload,
+                              table=table_q2)
+    q1, q2 = np.broadcast_arrays(q1, q2)
+
+    # Find fet which is limiting the current of system (lowest current),
+    # the other fet is re-evaluated at that current
+    q1_limits = q1["Id"] < q2["Id"]
+    q2_limits = q2["Id"] < q1["Id"]
+    q2_limited = nfet_calculate_array(Vgs=Vgs_q2, Vth=Vth_q2, K=K_q2, Ids=q1["Id"], Vdd=Vsc, Rd=Rload,
+                                      table=table_q2)
+    q1_limited = pfet_calculate_array(Vgs=Vgs_q1, Vth=Vth_q1, K=K_q1, Isd=q2["Id"], Vss=Vsc, Rd=Rload,
+                                      table=table_q1)
+    q2 = np.where(q1_limits, q2_limited, q2)
+    q1 = np.where(q2_limits, q1_limited, q1)
+
+    cut = (q1["region"] == REGION_CUT) | (q2["region"] == REGION_CUT)
+    limited = q1_limits | q2_limits
+    Rload = np.asarray(Rload, dtype=float)
+
+    # Q1 and Q2 in triode region when neither limits nor is cut off
+    Vdrop_on = Vsc - q2["Vds"] + q1["Vds"]
+    Id_on = np.broadcast_to(load_current, Vdrop_on.shape) if active_load else Vdrop_on / Rload
+    Id_limited = np.where(q1_limits, q1["Id"], q2["Id"])
+    Id = np.select([limited, cut], [Id_limited, 0], Id_on)
+    Vdrop = np.select([limited, cut], [Id * Rload, 0], Vdrop_on)
+
+    result = np.empty(Id.shape, dtype=HI_LOW_DTYPE)
+    result["Ib"] = q3["Ib"]
+    result["Ic"] = q3["Ic"]
+    result["Vce"] = q3["Vce"]
+    result["P_q3"] = q3["power"]
+    result["Vgs_q1"] = Vgs_q1
+    result["Vds_q1"] = q1["Vds"]
+    result["P_q1"] = q1["power"]
+    result["region_q1"] = q1["region"]
+    result["Vgs_q2"] = Vgs_q2
+    result["Vds_q2"] = q2["Vds"]
+    result["P_q2"] = q2["power"]
+    result["region_q2"] = q2["region"]
+    result["Vdrop"] = Vdrop
+    result["Id"] = Id
+    return result
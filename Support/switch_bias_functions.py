@@ -1,7 +1,16 @@
 #!/usr/bin/python3
 # import cmath, math
-from math import floor, log10, nan, sqrt, trunc
-from sympy import Eq, solve, symbols
+import cmath
+from bisect import bisect_right
+import re
+from math import copysign, floor, log10, nan, sqrt, trunc
+from component_values import RESISTORS, STOCK_CAPACITORS
+
+# Backend for the FET quadratic solvers, see set_solver().
+# SymPy is only imported (switch_bias_sympy) when the "sympy" reference
+# backend is used, it costs about a second of import time.
+SOLVERS = ("numeric", "sympy")
+solver = "numeric"
 
 # User defined Exception
 class BetaValueError(Exception):
@@ -12,14 +21,13 @@ class CurrentValueError(Exception):
     """Raised when current value is not appropriate for given calculation"""
     pass
 
-caps = [1e-12, 2.2e-12, 3.3e-12, 3.9e-12, 4.7e-12, 5.6e-12, 6.8e-12,\
-        8.2e-12, 10e-12, 15e-12, 22e-12, 27e-12, 33e-12, 39e-12, 47e-12,\
-        56e-12, 82e-12, 100e-12, 150e-12, 180e-12, 220e-12, 330e-12,\
-        470e-12, 680e-12, 820e-12, 1e-9, 1.5e-9, 1.8e-9, 2.2e-9, 2.7e-9,\
-        3.3e-9, 3.9e-9, 4.7e-9, 5.6e-9, 6.8e-9, 8.2e-9, 10e-9, 15e-9,\
-        22e-9, 33e-9, 39e-9, 47e-9, 56e-9, 68e-9, 0.1e-6, 0.22e-6,\
-        0.33e-6, 0.47e-6, 0.68e-6, 1e-6, 2.2e-6, 3.3e-6, 4.7e-6, 10e-6,\
-        22e-6, 33e-6, 47e-6, 100e-6, 220e-6, 470e-6]
+# Capacitor values kept in stock, see component_values
+caps = STOCK_CAPACITORS
+
+
+# SI prefixes of toSI, 10**3 ... 10**24 and 10**-3 ... 10**-24
+SI_INC_PREFIXES = ['k', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y']
+SI_DEC_PREFIXES = ['m', 'µ', 'n', 'p', 'f', 'a', 'z', 'y']
 
 
 def toSI(d, unit="", digits=2):
@@ -27,8 +35,9 @@ def toSI(d, unit="", digits=2):
     #d: number the print
     #unit: SI unit to use
     #digits: level of precision (number of decimal digits)
-    incPrefixes = ['k', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y']
-    decPrefixes = ['m', 'µ', 'n', 'p', 'f', 'a', 'z', 'y']
+    #See switch_bias_arrays.toSI_array for arrays of values
+    incPrefixes = SI_INC_PREFIXES
+    decPrefixes = SI_DEC_PREFIXES
     if d != 0:
         degree = int(floor(log10(abs(d)) / 3))
     else:
@@ -54,28 +63,61 @@ def toSI(d, unit="", digits=2):
     return(s)
 
 
+# Exponent of every accepted prefix, 'u' and Greek mu for micro, 'K' for kilo
+_SI_EXPONENTS = dict([(p, 3 * (i + 1)) for i, p in enumerate(SI_INC_PREFIXES)] +
+                     [(p, -3 * (i + 1)) for i, p in enumerate(SI_DEC_PREFIXES)] +
+                     [('', 0), ('K', 3), ('u', -6), ('\u03bc', -6)])
+_SI_NUMBER = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(\S?)$")
+# RKM code as printed on parts and BOMs: 4k7, 1R5, R47, 2M2
+_RKM_CODE = re.compile(r"^(\d*)([RrKkMGmµu])(\d*)$")
+
+
+def fromSI(text, unit=""):
+    """
+    Returns the value of a toSI string or component value, e.g.
+    fromSI("4.70k") -> 4700.0, fromSI("100nF", "F"), fromSI("4k7")
+
+    Raises
+    ------
+    ValueError
+        If text is not a number with an optional SI prefix and unit
+    """
+    value = text.strip()
+    if unit and value.endswith(unit):
+        value = value[:-len(unit)].rstrip()
+    match = _SI_NUMBER.match(value)
+    if match and match.group(2) in _SI_EXPONENTS:
+        number, prefix = match.groups()
+        # Shift the decimal exponent instead of multiplying, "4.7k" is 4700.0
+        mantissa, _, exponent = number.lower().partition("e")
+        return float("{0}e{1}".format(mantissa, int(exponent or 0) + _SI_EXPONENTS[prefix]))
+    match = _RKM_CODE.match(value)
+    if match and (match.group(1) or match.group(3)):
+        whole, prefix, fraction = match.groups()
+        exponent = 0 if prefix in "Rr" else _SI_EXPONENTS[prefix]
+        return float("{0}.{1}e{2}".format(whole or "0", fraction or "0", exponent))
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError("Not an SI value: '{0}'".format(text))
+
+
 def get_common_resistor_value(Rx):
+    """
+    Returns [lower, upper, Rx] stock resistor values around round(Rx),
+    lower <= Rx < upper (both equal to the end value outside the stock range)
+    """
     Rx = round(Rx)
-    resistors = [10, 12, 15, 18, 22, 27, 33, 39, 47, 56, 100, 120, 150, 180,\
-                220, 270, 330, 390, 470, 560, 680, 820, 1e3, 1.2e3, 1.5e3,\
-                1.8e3, 2.2e3, 2.7e3, 3.3e3, 3.9e3, 4.7e3, 5.6e3, 6.8e3,\
-                8.2e3, 10e3, 12e3, 15e3, 18e3, 22e3, 27e3, 33e3, 39e3, 47e3,\
-                56e3, 68e3, 82e3, 100e3, 120e3, 150e3, 180e3, 220e3, 270e3,\
-                330e3, 390e3, 470e3, 510e3, 560e3, 620e3, 680e3, 820e3, 1e6]
-    
-    resistor_count = len(resistors)
+    resistors = RESISTORS["stock"].values
+    index = bisect_right(resistors, Rx)
 
-    for index in range(0, resistor_count):
+    if index == 0:
+        resistor_common_value_lower = resistor_common_value_upper = resistors[0]
+    elif index == len(resistors):
+        resistor_common_value_lower = resistor_common_value_upper = resistors[-1]
+    else:
+        resistor_common_value_lower = resistors[index - 1]
         resistor_common_value_upper = resistors[index]
-        if Rx == resistors[index]:
-            resistor_common_value_lower = resistor_common_value_upper
-        elif Rx > resistor_common_value_upper:
-            if (index == (resistor_count - 1)):
-                resistor_common_value_lower = resistor_common_value_upper
-            continue
-        elif Rx < resistor_common_value_upper:
-            resistor_common_value_lower = resistors[index-1]
-            break
     return [trunc(resistor_common_value_lower), trunc(resistor_common_value_upper), Rx]
 
 
@@ -190,55 +232,98 @@ def calculate_fet_K(Vgs1, Id1, Vgs2, Id2):
     return K
 
 
-def calculate_pfet_vsaturation(Vth, K, Rload, Vss):
-    Vgs = symbols("Vgs")
-    Id = K/2 * (Vgs - Vth)**2
+def set_solver(name):
+    """
+    Select the default backend used by the FET quadratic solvers.
+
+    "numeric" evaluates the closed-form quadratic roots, "sympy" keeps the
+    original symbolic solve() as a reference for cross-checking.
+
+    Raises
+    ------
+    ValueError
+        If the solver name is not one of SOLVERS
+    """
+    global solver
+    if name not in SOLVERS:
+        raise ValueError("Unknown solver '{0}', expected one of {1}".format(name, SOLVERS))
+    solver = name
 
-    # Assume saturation region so Vds <= Vgs - Vth
-    # Evaluate for Vds = Vgs - Vth
-    Vds = Vgs - Vth
-    
-    eq1 = Eq(Vds, Id * Rload - Vss)
 
-    Vsat_solve = solve(eq1, Vgs)
+def _get_solver(name=None):
+    if name is None:
+        return solver
+    if name not in SOLVERS:
+        raise ValueError("Unknown solver '{0}', expected one of {1}".format(name, SOLVERS))
+    return name
 
-    # Vsat solve returns 2 cases, Vgs > Vth (ignore)
-    # Vsat < Vth boundary condition
+
+def solve_quadratic(a, b, c):
+    """
+    Returns the roots of a*x**2 + b*x + c = 0 in ascending order,
+    complex pair if the discriminant is negative, [] if there is no solution
+    """
+    if a == 0:
+        if b == 0:
+            return []
+        return [-c / b]
+
+    discriminant = b**2 - 4 * a * c
+    if discriminant < 0:
+        root = cmath.sqrt(discriminant)
+        return [(-b - root) / (2 * a), (-b + root) / (2 * a)]
+
+    # Numerically stable form, avoids cancellation when b**2 >> 4ac
+    q = -(b + copysign(sqrt(discriminant), b)) / 2
+    if q == 0:
+        return [0.0]
+    roots = sorted({q / a, c / q})
+    return roots
+
+
+def calculate_pfet_vsaturation(Vth, K, Rload, Vss, solver=None):
+    if _get_solver(solver) == "sympy":
+        from switch_bias_sympy import calculate_pfet_vsaturation
+        return calculate_pfet_vsaturation(Vth, K, Rload, Vss)
+
+    # Id = K/2 * (Vgs - Vth)**2 with Vds = Vgs - Vth = Id * Rload - Vss,
+    # solve for x = Vgs - Vth: (K * Rload / 2) x**2 - x - Vss = 0
+    Vsat_solve = [Vth + x for x in solve_quadratic(K * Rload / 2, -1, -Vss)]
+
+    # Vsat < Vth boundary condition, Vgs > Vth (ignore)
     for Vsat in Vsat_solve:
         if Vsat < Vth:
             return Vsat
     return Vsat_solve
 
 
-def calculate_nfet_vsaturation(Vth, K, Rload, Vdd):
-    Vgs = symbols("Vgs")
-    Id = K/2 * (Vgs - Vth)**2
+def calculate_nfet_vsaturation(Vth, K, Rload, Vdd, solver=None):
+    if _get_solver(solver) == "sympy":
+        from switch_bias_sympy import calculate_nfet_vsaturation
+        return calculate_nfet_vsaturation(Vth, K, Rload, Vdd)
 
-    # Assume saturation region so Vds >= Vgs - Vth
-    # Evaluate for Vds = Vgs - Vth
-    Vds = Vgs - Vth
-    
-    eq1 = Eq(Vds, Vdd - (Id * Rload))
-
-    Vsat_solve = solve(eq1, Vgs)
+    # Id = K/2 * (Vgs - Vth)**2 with Vds = Vgs - Vth = Vdd - Id * Rload,
+    # solve for x = Vgs - Vth: (K * Rload / 2) x**2 + x - Vdd = 0
+    Vsat_solve = [Vth + x for x in solve_quadratic(K * Rload / 2, 1, -Vdd)]
 
-    # Vsat solve returns 2 cases, Vgs < Vth (ignore)
-    # Vsat > Vth boundary condition
+    # Vsat > Vth boundary condition, Vgs < Vth (ignore)
     for Vsat in Vsat_solve:
         if Vsat > Vth:
             return Vsat
     return Vsat_solve
 
 
-def calculate_triode_vds(Vgs, Vth, K, Id):
-    Vds = symbols("Vds")
-    eqn = Eq(Id, K * Vds * (Vgs - Vth - (Vds/2)))
-    vds_solve = solve(eqn, Vds)
-    # print(vds_solve)
-    return vds_solve
+def calculate_triode_vds(Vgs, Vth, K, Id, solver=None):
+    if _get_solver(solver) == "sympy":
+        from switch_bias_sympy import calculate_triode_vds
+        return calculate_triode_vds(Vgs, Vth, K, Id)
+
+    # Id = K * Vds * (Vgs - Vth - Vds/2)
+    # => (K/2) Vds**2 - K (Vgs - Vth) Vds + Id = 0
+    return solve_quadratic(K / 2, -K * (Vgs - Vth), Id)
 
 
-def nfet_calculate(Vgs, Vth, K, Ids, Vdd, Rd):
+def nfet_calculate(Vgs, Vth, K, Ids, Vdd, Rd, solver=None):
     if (Vgs < Vth):
         #N-Fet in cutoff region
         return [0, -0, "cut"]
@@ -255,7 +340,7 @@ def nfet_calculate(Vgs, Vth, K, Ids, Vdd, Rd):
     else:
         # Nfet in triode region, Vds < Vgs - Vth
         Region = "tri"
-        vds_solve = calculate_triode_vds(Vgs, Vth, K, Ids)
+        vds_solve = calculate_triode_vds(Vgs, Vth, K, Ids, solver=solver)
 
         for Vds in vds_solve:
             if (Vds < (Vgs - Vth)):
@@ -263,7 +348,7 @@ def nfet_calculate(Vgs, Vth, K, Ids, Vdd, Rd):
     return [Ids, Vds, Region]
 
 
-def pfet_calculate(Vgs, Vth, K, Isd, Vss, Rd):
+def pfet_calculate(Vgs, Vth, K, Isd, Vss, Rd, solver=None):
     if (Vgs > Vth):
         #P-Fet in cutoff region
         return [0, -0, "cut"]
@@ -280,7 +365,7 @@ def pfet_calculate(Vgs, Vth, K, Isd, Vss, Rd):
     else:
         # Pfet in triode region, Vds > Vgs - Vth
         Region = "tri"
-        vds_solve = calculate_triode_vds(Vgs, Vth, K, Isd)
+        vds_solve = calculate_triode_vds(Vgs, Vth, K, Isd, solver=solver)
 
         for Vds in vds_solve:
             if (Vds > (Vgs - Vth)):
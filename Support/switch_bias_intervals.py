@@ -0,0 +1,272 @@
+#!/usr/bin/python3
+# Interval versions of npn_calculate_array / nfet_calculate_array /
+# pfet_calculate_array and hi_low_switch_array.
+#
+# Every argument is an Interval (or a number) and every result an Interval
+# that encloses the array result for all argument values of the box. Boxes
+# are batched like the arrays, lo and hi are broadcast NumPy arrays.
+# Region conditions are decided per box (Condition.may / .must), a box
+# across a region boundary gets the hull of both regions. An Interval has a
+# nan flag for boxes where the array result may be NaN (a triode current
+# that can not be reached), callers treat those as unbounded. Bounds are not
+# outward rounded, corner_analysis prunes with a relative margin.
+#
+# bounds = hi_low_switch_interval(Vsig=Interval(4.75, 5.25), Vsc=Interval(13.965, 15.435), ...)
+# bounds["Id"].lo, bounds["Id"].hi
+import numpy as np
+
+
+class Condition:
+    """A boolean over a box: may be true for some values, must be true for all"""
+    def __init__(self, may, must):
+        self.may = np.asarray(may, dtype=bool)
+        self.must = np.asarray(must, dtype=bool)
+
+    def __and__(self, other):
+        return Condition(self.may & other.may, self.must & other.must)
+
+    def __or__(self, other):
+        return Condition(self.may | other.may, self.must | other.must)
+
+    def __invert__(self):
+        return Condition(~self.must, ~self.may)
+
+    def where(self, a, b):
+        """Returns the Condition a where self holds, else b"""
+        return Condition((self.may & a.may) | (~self.must & b.may),
+                         (self.must & a.must) | (~self.may & b.must) | (a.must & b.must))
+
+
+class Interval:
+    """Bounds lo <= x <= hi of the values over a box, nan where x may be NaN"""
+    def __init__(self, lo, hi=None, nan=False):
+        self.lo = np.asarray(lo, dtype=float)
+        self.hi = self.lo if hi is None else np.asarray(hi, dtype=float)
+        self.nan = np.asarray(nan, dtype=bool)
+
+    @classmethod
+    def of(cls, value):
+        return value if isinstance(value, Interval) else cls(value)
+
+    @classmethod
+    def _bounded(cls, lo, hi, nan):
+        # NaN bounds come from inf - inf and the like, the value is unbounded
+        return cls(np.where(np.isnan(lo), -np.inf, lo), np.where(np.isnan(hi), np.inf, hi), nan)
+
+    def __repr__(self):
+        return "Interval({0}, {1})".format(self.lo, self.hi)
+
+    def __add__(self, other):
+        other = Interval.of(other)
+        with np.errstate(invalid="ignore"):
+            return Interval._bounded(self.lo + other.lo, self.hi + other.hi, self.nan | other.nan)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Interval(-self.hi, -self.lo, self.nan)
+
+    def __sub__(self, other):
+        return self + -Interval.of(other)
+
+    def __rsub__(self, other):
+        return Interval.of(other) + -self
+
+    def __mul__(self, other):
+        other = Interval.of(other)
+        with np.errstate(invalid="ignore"):
+            products = [self.lo * other.lo, self.lo * other.hi, self.hi * other.lo, self.hi * other.hi]
+        # 0 * inf is 0 for bounds, the values themselves are finite
+        products = [np.where(np.isnan(p), 0.0, p) for p in products]
+        return Interval(np.minimum.reduce(products), np.maximum.reduce(products), self.nan | other.nan)
+
+    __rmul__ = __mul__
+
+    def reciprocal(self):
+        spans_zero = (self.lo <= 0) & (self.hi >= 0)
+        with np.errstate(divide="ignore"):
+            lo = np.where(spans_zero, -np.inf, 1 / self.hi)
+            hi = np.where(spans_zero, np.inf, 1 / self.lo)
+        return Interval(lo, hi, self.nan)
+
+    def __truediv__(self, other):
+        other = Interval.of(other)
+        quotient = self * other.reciprocal()
+        # 0 / 0 is NaN
+        zero = (self.lo <= 0) & (self.hi >= 0) & (other.lo <= 0) & (other.hi >= 0)
+        return Interval(quotient.lo, quotient.hi, quotient.nan | zero)
+
+    def __rtruediv__(self, other):
+        return Interval.of(other) / self
+
+    def square(self):
+        """Returns x**2, tighter than x * x"""
+        lo2, hi2 = self.lo**2, self.hi**2
+        spans_zero = (self.lo < 0) & (self.hi > 0)
+        lo = np.where(spans_zero, 0.0, np.minimum(lo2, hi2))
+        return Interval(lo, np.maximum(lo2, hi2), self.nan)
+
+    def sqrt(self):
+        """Returns sqrt(x), NaN possible where x may be negative"""
+        return Interval(np.sqrt(np.maximum(self.lo, 0)), np.sqrt(np.maximum(self.hi, 0)),
+                        self.nan | (self.lo < 0))
+
+    def __lt__(self, other):
+        other = Interval.of(other)
+        nan = self.nan | other.nan
+        return Condition(self.lo < other.hi, (self.hi < other.lo) & ~nan)
+
+    def __le__(self, other):
+        other = Interval.of(other)
+        nan = self.nan | other.nan
+        return Condition(self.lo <= other.hi, (self.hi <= other.lo) & ~nan)
+
+    def __gt__(self, other):
+        return Interval.of(other) < self
+
+    def __ge__(self, other):
+        return Interval.of(other) <= self
+
+
+def where(condition, a, b):
+    """Interval form of np.where"""
+    a, b = Interval.of(a), Interval.of(b)
+    pick_a, pick_b = condition.must, ~condition.may
+
+    def pick(x, y, merged):
+        return np.where(pick_a, x, np.where(pick_b, y, merged))
+    return Interval(pick(a.lo, b.lo, np.minimum(a.lo, b.lo)), pick(a.hi, b.hi, np.maximum(a.hi, b.hi)),
+                    pick(a.nan, b.nan, a.nan | b.nan))
+
+
+def select(conditions, choices, default):
+    """Interval form of np.select"""
+    result = Interval.of(default)
+    for condition, choice in reversed(list(zip(conditions, choices))):
+        result = where(condition, choice, result)
+    return result
+
+
+def npn_calculate_interval(Vbe, Vce_sat, beta, Vcc, Vbb, Rb, Rc, Re=0, Vee=0):
+    """
+    Interval form of npn_calculate_array
+
+    Returns
+    -------
+    dict of Intervals Ib, Ic, Vce, power and Vce_Vcc (Vce - Vcc, bounded
+    without the dependency on Vcc), and the Conditions cut and sat
+    """
+    Vbe, Vce_sat, beta, Vcc, Vbb, Rb, Rc, Re, Vee = (Interval.of(value) for value in
+                                                      (Vbe, Vce_sat, beta, Vcc, Vbb, Rb, Rc, Re, Vee))
+    # Assume BJT is in active region
+    Ib = (Vbb - Vbe - Vee) / (Rb + ((beta + 1) * Re))
+    Ic = beta * Ib
+    Ie = (beta + 1) * Ib
+    Vce_Vcc = -(Ic * Rc) - (Ie * Re) - Vee
+    Vce = Vcc + Vce_Vcc
+
+    cut = (Vbb >= 0) & (Vbb <= Vbe)
+    sat = ~cut & (Vce <= Vce_sat) & (Ib > 0) & (Ic > 0)
+
+    # BJT in Saturation Region, (beta * Ib) > Ic > 0
+    Ic_sat = (Vcc - Vce_sat - Vee - (Ib * Re)) / (Re + Rc)
+    Vce_Vcc = where(sat, Vce_sat - Vcc, Vce_Vcc)
+    Vce = where(sat, Vce_sat, Vce)
+    Ic = where(sat, Ic_sat, Ic)
+
+    power = (Ic * Vce) + (Ib * Vbe)
+    return {"Ib": where(cut, 0, Ib),
+            "Ic": where(cut, 0, Ic),
+            "Vce": where(cut, Vcc - Vee, Vce),
+            "Vce_Vcc": where(cut, -Vee, Vce_Vcc),
+            "power": where(cut, 0, power),
+            "cut": cut,
+            "sat": sat}
+
+
+def _fet_interval(Vov, K, I, Vds_sat, polarity):
+    """Returns the result dict of the N-Chan (polarity 1) or P-Chan (-1) FET"""
+    cut = Vov < 0 if polarity > 0 else Vov > 0
+    Id_sat = K / 2 * Vov.square()
+
+    # Triode root in the cancellation free form of the arrays where its
+    # denominator is bounded away from zero, else in the textbook form,
+    # which is also the Vov the arrays give for a zero denominator
+    root = (Vov.square() - (2 * I / K)).sqrt()
+    if polarity > 0:
+        denominator, textbook = Vov + root, Vov - root
+        usable = denominator.lo > 0
+        sat = ~cut & (Vds_sat >= Vov)
+    else:
+        denominator, textbook = Vov - root, Vov + root
+        usable = denominator.hi < 0
+        sat = ~cut & (Vds_sat <= Vov)
+    Vds_tri = where(Condition(usable, usable), (2 * I / K) / denominator, textbook)
+    tri = ~cut & ~sat
+
+    Id = select([cut, sat], [0, Id_sat], I)
+    Vds = select([cut, sat], [0, Vds_sat], Vds_tri)
+    return {"Id": Id, "Vds": Vds, "power": polarity * Id * Vds, "cut": cut, "sat": sat, "tri": tri}
+
+
+def nfet_calculate_interval(Vgs, Vth, K, Ids, Vdd, Rd):
+    """Interval form of nfet_calculate_array, dict of Id, Vds, power and the Conditions cut, sat, tri"""
+    Vov = Interval.of(Vgs) - Vth
+    K = Interval.of(K)
+    Vds_sat = Vdd - (K / 2 * Vov.square() * Rd)
+    return _fet_interval(Vov, K, Interval.of(Ids), Vds_sat, 1)
+
+
+def pfet_calculate_interval(Vgs, Vth, K, Isd, Vss, Rd):
+    """Interval form of pfet_calculate_array, dict of Id, Vds, power and the Conditions cut, sat, tri"""
+    Vov = Interval.of(Vgs) - Vth
+    K = Interval.of(K)
+    Vds_sat = (K / 2 * Vov.square() * Rd) - Vss
+    return _fet_interval(Vov, K, Interval.of(Isd), Vds_sat, -1)
+
+
+def _where_fet(condition, a, b):
+    return {name: condition.where(a[name], b[name]) if isinstance(a[name], Condition) else
+            where(condition, a[name], b[name]) for name in a}
+
+
+def hi_low_switch_interval(Vsig, Vsc, Rb, R1, Rload, load_current, Vbe_sat, Vce_sat,
+                           beta, Vth_q1, K_q1, Vth_q2, K_q2, active_load=True):
+    """
+    Interval form of hi_low_switch_array
+
+    Returns
+    -------
+    dict of Intervals Id, Vdrop, P_q1, P_q2, P_q3 and drop (Vsc - Vdrop,
+    bounded without the dependency on Vsc)
+    """
+    Vsig, Vsc, Rload, load_current = (Interval.of(value) for value in (Vsig, Vsc, Rload, load_current))
+    q3 = npn_calculate_interval(Vbe=Vbe_sat, Vce_sat=Vce_sat, beta=beta, Vcc=Vsc, Vbb=Vsig, Rb=Rb, Rc=R1)
+    Vgs_q1 = q3["Vce_Vcc"]
+    Vgs_q2 = Vsig
+
+    q1 = pfet_calculate_interval(Vgs=Vgs_q1, Vth=Vth_q1, K=K_q1, Isd=load_current, Vss=Vsc, Rd=Rload)
+    q2 = nfet_calculate_interval(Vgs=Vgs_q2, Vth=Vth_q2, K=K_q2, Ids=load_current, Vdd=Vsc, Rd=Rload)
+
+    # Find fet which is limiting the current of system (lowest current),
+    # the other fet is re-evaluated at that current
+    q1_limits = q1["Id"] < q2["Id"]
+    q2_limits = q2["Id"] < q1["Id"]
+    q2_limited = nfet_calculate_interval(Vgs=Vgs_q2, Vth=Vth_q2, K=K_q2, Ids=q1["Id"], Vdd=Vsc, Rd=Rload)
+    q1_limited = pfet_calculate_interval(Vgs=Vgs_q1, Vth=Vth_q1, K=K_q1, Isd=q2["Id"], Vss=Vsc, Rd=Rload)
+    q2 = _where_fet(q1_limits, q2_limited, q2)
+    q1 = _where_fet(q2_limits, q1_limited, q1)
+
+    cut = q1["cut"] | q2["cut"]
+    limited = q1_limits | q2_limits
+
+    # Q1 and Q2 in triode region when neither limits nor is cut off
+    drop_on = q2["Vds"] - q1["Vds"]
+    Vdrop_on = Vsc - drop_on
+    Id_on = load_current if active_load else Vdrop_on / Rload
+    Id_limited = where(q1_limits, q1["Id"], q2["Id"])
+    Id = select([limited, cut], [Id_limited, 0], Id_on)
+    Vdrop = select([limited, cut], [Id_limited * Rload, 0], Vdrop_on)
+    drop = select([limited, cut], [Vsc - Id_limited * Rload, Vsc], drop_on)
+    return {"Id": Id, "Vdrop": Vdrop, "drop": drop, "P_q1": q1["power"], "P_q2": q2["power"],
+            "P_q3": q3["power"]}
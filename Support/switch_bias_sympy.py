@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+# SymPy reference solvers for the FET quadratics, used through
+# switch_bias_functions with solver="sympy" to cross-check the closed-form
+# numeric solvers
+from sympy import Eq, solve, symbols
+
+
+def calculate_pfet_vsaturation(Vth, K, Rload, Vss):
+    Vgs = symbols("Vgs")
+    Id = K/2 * (Vgs - Vth)**2
+
+    # Assume saturation region so Vds <= Vgs - Vth
+    # Evaluate for Vds = Vgs - Vth
+    Vds = Vgs - Vth
+    
+    eq1 = Eq(Vds, Id * Rload - Vss)
+
+    Vsat_solve = solve(eq1, Vgs)
+
+    # Vsat solve returns 2 cases, Vgs > Vth (ignore)
+    # Vsat < Vth boundary condition
+    for Vsat in Vsat_solve:
+        if Vsat < Vth:
+            return Vsat
+    return Vsat_solve
+
+
+def calculate_nfet_vsaturation(Vth, K, Rload, Vdd):
+    Vgs = symbols("Vgs")
+    Id = K/2 * (Vgs - Vth)**2
+
+    # Assume saturation region so Vds >= Vgs - Vth
+    # Evaluate for Vds = Vgs - Vth
+    Vds = Vgs - Vth
+    
+    eq1 = Eq(Vds, Vdd - (Id * Rload))
+
+    Vsat_solve = solve(eq1, Vgs)
+
+    # Vsat solve returns 2 cases, Vgs < Vth (ignore)
+    # Vsat > Vth boundary condition
+    for Vsat in Vsat_solve:
+        if Vsat > Vth:
+            return Vsat
+    return Vsat_solve
+
+
+def calculate_triode_vds(Vgs, Vth, K, Id):
+    Vds = symbols("Vds")
+    eqn = Eq(Id, K * Vds * (Vgs - Vth - (Vds/2)))
+    vds_solve = solve(eqn, Vds)
+    # print(vds_solve)
+    return vds_solve
@@ -0,0 +1,458 @@
+#!/usr/bin/python3
+# Circuit topologies of the bias scripts as importable functions
+#
+# Importing this module computes nothing. Every topology function takes its
+# parameters as keyword arguments (devices as records or library part names
+# such as "dmc3016lsd:P"), and returns a TopologyResult: the chosen design
+# values and the sweep tables, whose rows are generated lazily.
+#
+# result = hi_low_switch(Vsc=(5, 12), load_current=1.5)
+# for row in result.tables[0].rows:
+#     print(row.Vsc, row.Id)
+#
+# The schematics are in the script of each topology (hi_switch_bias.py,
+# hi_low_switch_bias.py, hi-low_inverted_switch_bias.py,
+# standard_values_voltage_divider.py, uart-pick.py).
+from collections import namedtuple
+
+from component_values import RESISTORS
+from device_library import BjtParams, FetParams, default_library
+from divider_synthesis import synthesize_divider
+from operating_point_cache import (calculate_nfet_vsaturation, calculate_pfet_vsaturation,
+                                   nfet_calculate, npn_calculate, pfet_calculate)
+from switch_bias_functions import (calculate_theoretical_load_resistor, get_common_resistor_value,
+                                   npn_active_bias_vce, npn_calculate_ib, npn_rb_from_ib, toSI)
+
+# name: the suffix of --output files, rows: iterable of row_type,
+# row_format: format string (applied positionally) or function of the row,
+# si_fields: {field: unit} given to row_format as toSI text in the table
+Table = namedtuple("Table", ["name", "row_type", "rows", "row_format", "header", "preamble", "si_fields"],
+                   defaults=(None,))
+
+# design: the chosen component values, tables: the sweeps in print order
+TopologyResult = namedtuple("TopologyResult", ["topology", "design", "tables"])
+
+DriverResistors = namedtuple("DriverResistors", ["Rb", "R1", "Rb_options", "R1_options"])
+
+
+def fet_device(device, parameter="device"):
+    """
+    Returns FetParams for a record or a "part" / "part:channel" name
+
+    Raises
+    ------
+    ValueError
+        If the part or channel is not in the library, naming parameter
+    """
+    if isinstance(device, FetParams):
+        return device
+    library = default_library()
+    part, _, channel = str(device).partition(":")
+    try:
+        return library.fet(part, channel or None)
+    except KeyError:
+        raise ValueError("Unknown FET {0}={1!r}, use one of {2}".format(
+            parameter, device, library.parts())) from None
+    except ValueError as error:
+        raise ValueError("{0}={1!r}: {2}".format(parameter, device, error)) from None
+
+
+def bjt_device(device, parameter="device"):
+    """
+    Returns BjtParams for a record or a part name
+
+    Raises
+    ------
+    ValueError
+        If the part is not in the library, naming parameter
+    """
+    if isinstance(device, BjtParams):
+        return device
+    library = default_library()
+    try:
+        return library.bjt(str(device))
+    except KeyError:
+        raise ValueError("Unknown BJT {0}={1!r}, use one of {2}".format(
+            parameter, device, list(library.bjts["part"]))) from None
+
+
+def driver_resistors(Q, drive_voltage, base_current, collector_current, design_vcc, desired_vce, R1_option=0):
+    """
+    Standard values of the base resistor Rb and collector resistor R1 of an
+    NPN gate driver, Rb for base_current at drive_voltage and R1 for
+    collector_current with Vce at desired_vce from design_vcc
+
+    R1_option: 0 takes the standard value below, 1 the one above
+    """
+    Rb_options = get_common_resistor_value(round(npn_rb_from_ib(Vbb=drive_voltage, Vbe=Q.Vbe_sat, Ib=base_current)))
+    Rb = Rb_options[0]
+    Ib = npn_calculate_ib(Vbb=drive_voltage, Vbe=Q.Vbe_sat, Rb=Rb)
+    R1_options = get_common_resistor_value(round(npn_active_bias_vce(
+        desired_vce=desired_vce, Vce_sat=Q.Vce_sat, Vcc=design_vcc, beta=Q.beta, Ib=Ib, Ic=collector_current)))
+    return DriverResistors(Rb, R1_options[R1_option], Rb_options, R1_options)
+
+
+def _design_line(Rb, R1, load_current, Rload, active_load):
+    return "For Design\tRb(Ohm)={0:2}\t\tR1(Ohm)={1}\t\tDesired Current(A)={2}\tLoadImpedance(ohm)={3:n} [{4}]".format(
+        toSI(Rb), toSI(R1), load_current, Rload, "active" if active_load else "passive")
+
+
+def _load(Vsc, Vds_sum, Region, load_current, Rload, active_load):
+    # Load current and voltage of a switch with no limiting fet
+    if Region[0] == "c":
+        # Either Q1 or Q2 in cutoff region
+        return 0, 0 * Rload
+    # Q1 and Q2 in triode region
+    load_vdrop = Vsc + Vds_sum
+    return (load_current if active_load else load_vdrop / Rload), load_vdrop
+
+
+def _limited_load(Vsc, Vgs_q1, Vgs_q2, Q1, Q2, q1, q2, load_current, Rload, active_load):
+    """
+    Returns (q1, q2, Id, load_vdrop) of a P-Chan high side / N-Chan low side
+    pair, q1 and q2 are the pfet_calculate / nfet_calculate results at
+    load_current
+    """
+    Id_q1, Vds_q1, Region_q1 = q1
+    Id_q2, Vds_q2, Region_q2 = q2
+    # Find fet which is limiting the current of system (lowest current)
+    # and estimate load current and voltage drop
+    if (Id_q1 < Id_q2):
+        # Q1 limiting system
+        q2 = nfet_calculate(Vgs = Vgs_q2, Vth = Q2.Vth, K = Q2.K, Ids = Id_q1, Vdd = Vsc, Rd = Rload)
+        Id = Id_q1
+        load_vdrop = Id * Rload
+    elif (Id_q2 < Id_q1):
+        # Q2 Limiting system
+        q1 = pfet_calculate(Vgs = Vgs_q1, Vth = Q1.Vth, K = Q1.K, Isd = Id_q2, Vss = Vsc, Rd = Rload)
+        Id = Id_q2
+        load_vdrop = Id * Rload
+    elif (Region_q1[0] == "c" or Region_q2[0] == "c"):
+        # Either Q1 or Q2 in cutoff region
+        Id = 0
+        load_vdrop = Id * Rload
+    else:
+        # Q1 and Q2 in triode region
+        load_vdrop = Vsc - Vds_q2 + Vds_q1
+        if (active_load):
+            Id = load_current
+        else:
+            Id = load_vdrop / Rload
+    return q1, q2, Id, load_vdrop
+
+
+# High side switch (hi_switch_bias.py)
+
+HiSwitchRow = namedtuple("HiSwitchRow", ["Vsig", "Vsc", "Ib", "Ic", "Vce", "P_q2", "Vgs_q1", "Vsat_q1",
+                                         "Vdrop", "Vds_q1", "region_q1", "Id"])
+PullupSwitchRow = namedtuple("PullupSwitchRow", ["Vsig", "Vsc", "I_r2", "P_r2", "Vgs_q1", "region_q1",
+                                                 "Vsat_q1", "Vdrop", "Vds_q1", "Id"])
+
+HI_SWITCH_HEADER = "{0:7s} {1:7s} {2:8s} {3:8s} {4:6s} {5:7s}   {6:8s} {7:9s}   {8:8s} [{9}{10}] {11:8s}".format(
+        "Vsig(V)","Vsc(V)", "Ib(A)", "Ic(A)", "Vce(V)", "P_Q2(W)", "Vgs_Q1(V)", "Vsat_Q1(V)", "Vdrop(V) Load", "Q1","", "I_load(A)")
+HI_SWITCH_ROW = "{0:^7n} {1:>4n}   {2:<8.1e} {3:<8.1e}  {4:<6.2f} {5:<7.3f}  {6:7.2f} {10:2.1} {7:^10.2f}\t{8:>10.2f} [{9:5.2f}]   {11:.3f}"
+PULLUP_SWITCH_HEADER = "{0:7s} {1:6s} {2:7s} {3:10s} {4} {5} {6} {7} [{8}] {9}".format(
+        "Vsig(V)","Vsc(V)", "I_r2(A)", "P_r2(Watt)", "Vgs_Q1(V)", "", "Vsat_Q1(V)", "Vdrop(V) Load", "Q1", "I_load(A)")
+PULLUP_SWITCH_ROW = "{0:^7n} {1:^6n} {2:<7.1e} {3:<10.3f} {4:>6.2f} {5:.1}\t{6:.2f}\t{7:>8.2f} [{8:5.2f}]    {9:.3f}"
+
+
+def sweep_hi_switch(Q1, Q2, Rb, R1, Vsig, Vsc, load_current, Rload, active_load):
+    """Yields a HiSwitchRow per (Vsig, Vsc), Q2 (NPN) pulls the gate of Q1 low"""
+    for Vsigx in Vsig:
+        for Vscx in Vsc:
+            # Calculate BJT characteristics
+            [Ib, Ic, Vce, _,_,_, bjtPower] = npn_calculate(Vbe=Q2.Vbe_sat, Vce_sat=Q2.Vce_sat, beta=Q2.beta, Vcc=Vscx, Vbb=Vsigx, Rb=Rb, Rc=R1, Re=0)
+
+            Vsat_q1 = calculate_pfet_vsaturation(Q1.Vth, Q1.K, Rload, Vscx)
+
+            Vgs_q1 = (Vce - Vscx)
+            [_, Vds_q1, Region_q1] = pfet_calculate(Vgs = Vgs_q1, Vth = Q1.Vth, K = Q1.K, Isd = load_current, Vss = Vscx, Rd = Rload)
+            Id, load_vdrop = _load(Vscx, Vds_q1, Region_q1, load_current, Rload, active_load)
+
+            yield HiSwitchRow(Vsigx, Vscx, Ib, Ic, Vce, bjtPower, Vgs_q1, Vsat_q1, load_vdrop, Vds_q1, Region_q1, Id)
+
+
+def sweep_pullup_switch(Q1, R2, Vsig, Vsc, load_current, Rload, active_load):
+    """Yields a PullupSwitchRow per (Vsig, Vsc), R2 pulls the gate of Q1 up to Vsc"""
+    for Vsigx in Vsig:
+        for Vscx in Vsc:
+            Ir2 = (Vscx - Vsigx) / R2
+            P_r2 = R2 * Ir2**2
+
+            Vsat_q1 = calculate_pfet_vsaturation(Q1.Vth, Q1.K, Rload, Vscx)
+
+            Vgs_q1 = (Vsigx - Vscx)
+            [_, Vds_q1, Region_q1] = pfet_calculate(Vgs = Vgs_q1, Vth = Q1.Vth, K = Q1.K, Isd = load_current, Vss = Vscx, Rd = Rload)
+            Id, load_vdrop = _load(Vscx, Vds_q1, Region_q1, load_current, Rload, active_load)
+
+            yield PullupSwitchRow(Vsigx, Vscx, Ir2, P_r2, Vgs_q1, Region_q1, Vsat_q1, load_vdrop, Vds_q1, Id)
+
+
+def hi_switch(Q1="dmp3028lsd", Q2="bc848b", Vsc=(5.1,), Vsig=(0, 5), load_power=12.5, load_current=2.5,
+              active_load=True, drive_voltage=5, base_current=0.01e-3, collector_current=0.1e-3,
+              design_vcc=14.7):
+    """
+    P-Chan high side switch, circuit 1 driven by an NPN (Q2), circuit 2
+    by Vsig through the pull-up R2
+
+    active_load: the load acts as a current-stable non-linear resistor
+    (True) or is purely resistive (False)
+    """
+    Q1 = fet_device(Q1, "Q1")
+    Q2 = bjt_device(Q2, "Q2")
+    Rload = calculate_theoretical_load_resistor(power = load_power, I = load_current)
+    driver = driver_resistors(Q2, drive_voltage, base_current, collector_current, design_vcc,
+                              desired_vce=0, R1_option=1)
+
+    # Pullup R2 for collector_current at the highest supply
+    R2_options = get_common_resistor_value(calculate_theoretical_load_resistor(
+        power = (Vsc[-1] * collector_current), I = collector_current))
+    R2 = R2_options[1]
+
+    circuit1 = Table("circuit1", HiSwitchRow,
+                     sweep_hi_switch(Q1, Q2, driver.Rb, driver.R1, Vsig, Vsc, load_current, Rload, active_load),
+                     HI_SWITCH_ROW, HI_SWITCH_HEADER,
+                     ["Fet\tP(Q1): {0}".format(Q1.name.upper()),
+                      "CIRCUIT 1",
+                      "Rb options: {0}".format(driver.Rb_options),
+                      "R1 options: {0}".format(driver.R1_options),
+                      _design_line(driver.Rb, driver.R1, load_current, Rload, active_load)])
+    circuit2 = Table("circuit2", PullupSwitchRow,
+                     sweep_pullup_switch(Q1, R2, Vsig, Vsc, load_current, Rload, active_load),
+                     PULLUP_SWITCH_ROW, PULLUP_SWITCH_HEADER,
+                     ["CIRCUIT 2",
+                      "R2 options: {0}".format(R2_options),
+                      "For Design\tR2(Ohm)={0:2}\t\tDesired Current(A)={1}\tLoadImpedance(ohm)={2:n} [{3}]".format(
+                          toSI(R2), load_current, Rload, "active" if active_load else "passive")])
+    design = dict(Q1=Q1, Q2=Q2, Rb=driver.Rb, R1=driver.R1, R2=R2, Rload=Rload)
+    return TopologyResult("hi-switch", design, [circuit1, circuit2])
+
+
+# High/low side switch (hi_low_switch_bias.py)
+
+HiLowRow = namedtuple("HiLowRow", ["Vsig", "Vsc", "Ib", "Ic", "Vce", "P_q3", "Vgs_q1", "Vsat_q1",
+                                   "Vgs_q2", "Vsat_q2", "Vdrop", "Vds_q1", "Vds_q2",
+                                   "region_q1", "region_q2", "Id"])
+
+HI_LOW_HEADER = "{0:7s} {1:7s} {2:8s} {3:8s} {4:6s} {5:7s}   {6:8s} {7:9s}   {8:8s} {9:9s}   {10:5s} [{11}{13},{12}{14}] {15:8s}".format(
+        "Vsig(V)","Vsc(V)", "Ib(A)", "Ic(A)", "Vce(V)", "P_Q3(W)", "Vgs_Q1(V)", "Vsat_Q1(V)", "Vgs_Q2(V)", "Vsat_Q2(V)", "Vdrop(V) Load", "Q1", "Q2","","", "I_load(A)")
+HI_LOW_ROW = "{0:^7n} {1:>4n}   {2:<8.1e} {3:<8.1e}  {4:<6.2f} {5:<7.3f}  {6: 7.2f} {13:.1} {7: 8.2f}\t  {8:^6n} {14:.1}  {9:^9.2f}    {10:>5.2f} [{11: 5.2f}, {12:>4.2f}]\t{15:.3f}"
+
+
+def hi_low_corners(Vsig, Vsc):
+    """
+    Yields the (Vsig, Vsc) pairs in use, 3.3V drive only for the rpi
+    switches (Vsc <= 5) and 5V drive only for the arduino switches (Vsc >= 5)
+    """
+    for Vsigx in Vsig:
+        for Vscx in Vsc:
+            if (Vscx > 5) and (Vsigx == 3.3):
+                # Exclude voltage not used for rpi switches
+                continue
+            elif (Vscx < 5) and (Vsigx == 5):
+                # Exclude voltage not used for arduino switches
+                continue
+            yield Vsigx, Vscx
+
+
+def sweep_hi_low_switch(Q1, Q2, Q3, Rb, R1, corners, load_current, Rload, active_load):
+    """Yields a HiLowRow per (Vsig, Vsc) corner"""
+    for Vsigx, Vscx in corners:
+        # Calculate BJT characteristics
+        [Ib, Ic, Vce, _,_,_, bjtPower] = npn_calculate(Vbe=Q3.Vbe_sat, Vce_sat=Q3.Vce_sat, beta=Q3.beta, Vcc=Vscx, Vbb=Vsigx, Rb=Rb, Rc=R1, Re=0)
+
+        Vsat_q1 = calculate_pfet_vsaturation(Q1.Vth, Q1.K, Rload, Vscx)
+        Vsat_q2 = calculate_nfet_vsaturation(Q2.Vth, Q2.K, Rload, Vscx)
+
+        Vgs_q1 = (Vce - Vscx)
+        q1 = pfet_calculate(Vgs = Vgs_q1, Vth = Q1.Vth, K = Q1.K, Isd = load_current, Vss = Vscx, Rd = Rload)
+
+        Vgs_q2 = Vsigx
+        q2 = nfet_calculate(Vgs = Vgs_q2, Vth = Q2.Vth, K = Q2.K, Ids = load_current, Vdd = Vscx, Rd = Rload)
+
+        q1, q2, Id, load_vdrop = _limited_load(Vscx, Vgs_q1, Vgs_q2, Q1, Q2, q1, q2, load_current, Rload, active_load)
+        [_, Vds_q1, Region_q1] = q1
+        [_, Vds_q2, Region_q2] = q2
+
+        yield HiLowRow(Vsigx, Vscx, Ib, Ic, Vce, bjtPower, Vgs_q1, Vsat_q1, Vgs_q2, Vsat_q2,
+                       load_vdrop, Vds_q1, Vds_q2, Region_q1, Region_q2, Id)
+
+
+def hi_low_switch(Q1="dmc3016lsd:P", Q2="dmc3016lsd:N", Q3="bc848b", Vsc=(3.3, 5, 12, 14.7),
+                  Vsig=(0, 3.3, 5), load_power=12.5, load_current=2.5, active_load=True,
+                  drive_voltage=5, base_current=0.01e-3, collector_current=0.1e-3, design_vcc=14.7):
+    """
+    P-Chan high side (Q1) and N-Chan low side (Q2) switch, Q3 (NPN) pulls
+    the gate of Q1 low and Vsig drives the gate of Q2
+
+    active_load: the load acts as a current-stable non-linear resistor
+    (True) or is purely resistive (False)
+    """
+    Q1 = fet_device(Q1, "Q1")
+    Q2 = fet_device(Q2, "Q2")
+    Q3 = bjt_device(Q3, "Q3")
+    driver = driver_resistors(Q3, drive_voltage, base_current, collector_current, design_vcc,
+                              desired_vce=Q3.Vce_sat)
+    Rload = calculate_theoretical_load_resistor(power = load_power, I = load_current)
+
+    table = Table("switch", HiLowRow,
+                  sweep_hi_low_switch(Q1, Q2, Q3, driver.Rb, driver.R1, hi_low_corners(Vsig, Vsc),
+                                      load_current, Rload, active_load),
+                  HI_LOW_ROW, HI_LOW_HEADER,
+                  ["Rb options: {0}".format(driver.Rb_options),
+                   "R1 options: {0}".format(driver.R1_options),
+                   "Fet\tP(Q1): {0}\tN(Q2): {1}".format(Q1.name.upper(), Q2.name.upper()),
+                   _design_line(driver.Rb, driver.R1, load_current, Rload, active_load)])
+    design = dict(Q1=Q1, Q2=Q2, Q3=Q3, Rb=driver.Rb, R1=driver.R1, Rload=Rload)
+    return TopologyResult("hi-low-switch", design, [table])
+
+
+# Inverted high/low side switch (hi-low_inverted_switch_bias.py)
+
+InvertedDriverRow = namedtuple("InvertedDriverRow", ["Vsig", "Vsc", "Ib", "Ic", "Vce", "P_q3", "Vsat_q4",
+                                                     "Vgs_q4", "region_q4", "Vds_q4"])
+InvertedSwitchRow = namedtuple("InvertedSwitchRow", ["Vsig", "Vsc", "Vsat_q1", "Vgs_q1", "region_q1", "Vsat_q2",
+                                                     "Vgs_q2", "region_q2", "Vdrop", "Vds_q1", "Vds_q2", "Id"])
+
+INVERTED_DRIVER_HEADER = "{0:7s} {1:6s} {2:^8s} {3:^8s} {4:6s} {5:7s} {6} {7} {8}".format(
+        "Vsig(V)","Vsc(V)", "Ib(A)", "Ic(A)", "Vce(V)", "P_Q3(W)", "Q4Vsat(V)", "Q4Vgs(V)", "Q4Vds(V)")
+INVERTED_DRIVER_ROW = "{0:^7n} {1:^6n} {2:<8.1e} {3:<8.1e} {4:^6.2f} {5:^7.3f} {6:^9.2f} {7:>6.2f} {8:.1} {9:8.2f}"
+INVERTED_SWITCH_HEADER = "{0:7s} {1:6s} {2} {3}\t{4} {5}\t{6} [{7},{8}] {9}".format(
+        "Vsig(V)","Vsc(V)", "Q1Vsat(V)", "Q1Vgs(V)", "Q2Vsat(V)", "Q2Vgs(V)" ,"Vdrop(V) Load", "Q1", "Q2", "I_load(A)")
+INVERTED_SWITCH_ROW = "{0:^7n} {1:^6n} {2:^9.2f} {3:>6.2f} {4:.1}\t{5:^9.2f} {6:>6.2f} {7:.1}\t{8:5.2f} [{9:5.2f},{10:>4.2f}]    {11:^9.3f}"
+
+
+def _inverted_driver(Q3, Q4, Rb, R1, Vsig, Vsc, R2, driver_current):
+    # Q3 (NPN) pulls the gate of Q4 low, Q4 pulls the gate of Q1 up
+    [Ib, Ic, Vce, _,_,_, bjtPower] = npn_calculate(Vbe=Q3.Vbe_sat, Vce_sat=Q3.Vce_sat, beta=Q3.beta, Vcc=Vsc, Vbb=Vsig, Rb=Rb, Rc=R1, Re=0)
+    Vgs_q4 = (Vce - Vsc)
+    q4 = pfet_calculate(Vgs = Vgs_q4, Vth = Q4.Vth, K = Q4.K, Isd = driver_current, Vss = Vsc, Rd = R2)
+    return Ib, Ic, Vce, bjtPower, Vgs_q4, q4
+
+
+def sweep_inverted_driver(Q3, Q4, Rb, R1, Vsig, Vsc, R2, driver_current):
+    """Yields an InvertedDriverRow per (Vsig, Vsc) for the Q3/Q4 gate driver"""
+    for Vsigx in Vsig:
+        for Vscx in Vsc:
+            Ib, Ic, Vce, bjtPower, Vgs_q4, [_, Vds_q4, Region_q4] = _inverted_driver(
+                Q3, Q4, Rb, R1, Vsigx, Vscx, R2, driver_current)
+            Vsat_q4 = calculate_pfet_vsaturation(Q4.Vth, Q4.K, R2, Vscx)
+
+            yield InvertedDriverRow(Vsigx, Vscx, Ib, Ic, Vce, bjtPower, Vsat_q4, Vgs_q4, Region_q4, Vds_q4)
+
+
+def sweep_inverted_switch(Q1, Q2, Q3, Q4, Rb, R1, Vsig, Vsc, R2, driver_current, load_current, Rload, active_load):
+    """Yields an InvertedSwitchRow per (Vsig, Vsc), Q4 drives the gate of Q1 and Vce the gate of Q2"""
+    for Vsigx in Vsig:
+        for Vscx in Vsc:
+            _, _, Vce, _, _, [_, Vds_q4, Region_q4] = _inverted_driver(
+                Q3, Q4, Rb, R1, Vsigx, Vscx, R2, driver_current)
+
+            Vsat_q1 = calculate_pfet_vsaturation(Q1.Vth, Q1.K, Rload, Vscx)
+            Vsat_q2 = calculate_nfet_vsaturation(Q2.Vth, Q2.K, Rload, Vscx)
+
+            if (Region_q4[0] == "c"):
+                Vgs_q1 = (0 - Vscx)
+            else:
+                Vgs_q1 = (Vscx + Vds_q4 - Vscx)
+            q1 = pfet_calculate(Vgs = Vgs_q1, Vth = Q1.Vth, K = Q1.K, Isd = load_current, Vss = Vscx, Rd = Rload)
+
+            Vgs_q2 = Vce
+            q2 = nfet_calculate(Vgs = Vgs_q2, Vth = Q2.Vth, K = Q2.K, Ids = load_current, Vdd = Vscx, Rd = Rload)
+
+            q1, q2, Id, load_vdrop = _limited_load(Vscx, Vgs_q1, Vgs_q2, Q1, Q2, q1, q2, load_current, Rload, active_load)
+            [_, Vds_q1, Region_q1] = q1
+            [_, Vds_q2, Region_q2] = q2
+
+            yield InvertedSwitchRow(Vsigx, Vscx, Vsat_q1, Vgs_q1, Region_q1, Vsat_q2, Vgs_q2, Region_q2,
+                                    load_vdrop, Vds_q1, Vds_q2, Id)
+
+
+def hi_low_inverted_switch(Q1="dmc3016lsd:P", Q2="dmc3016lsd:N", Q3="bc848b", Q4="ntr1p02",
+                           Vsc=(5, 12, 14.7), Vsig=(0, 5), load_power=12.5, load_current=2.5,
+                           active_load=True, drive_voltage=5, base_current=0.01e-3,
+                           collector_current=0.1e-3, design_vcc=14.7, R2=120e3,
+                           driver_current=0.1225e-3):
+    """
+    Inverted high/low side switch, Q3 (NPN) and Q4 (P-Chan, pull-down R2)
+    drive the gate of Q1, the collector of Q3 drives the gate of Q2
+
+    driver_current: drain current of Q4 into R2
+    """
+    Q1 = fet_device(Q1, "Q1")
+    Q2 = fet_device(Q2, "Q2")
+    Q3 = bjt_device(Q3, "Q3")
+    Q4 = fet_device(Q4, "Q4")
+    driver = driver_resistors(Q3, drive_voltage, base_current, collector_current, design_vcc, desired_vce=0)
+    Rload = calculate_theoretical_load_resistor(power = load_power, I = load_current)
+
+    driver_table = Table("driver", InvertedDriverRow,
+                         sweep_inverted_driver(Q3, Q4, driver.Rb, driver.R1, Vsig, Vsc, R2, driver_current),
+                         INVERTED_DRIVER_ROW, INVERTED_DRIVER_HEADER,
+                         ["CIRCUIT 1",
+                          "Rb options: {0}".format(driver.Rb_options),
+                          "R1 options: {0}".format(driver.R1_options),
+                          "Fet\tP(Q1): {0}\tN(Q2): {1}".format(Q1.name.upper(), Q2.name.upper()),
+                          _design_line(driver.Rb, driver.R1, load_current, Rload, active_load)])
+    switch_table = Table("switch", InvertedSwitchRow,
+                         sweep_inverted_switch(Q1, Q2, Q3, Q4, driver.Rb, driver.R1, Vsig, Vsc, R2,
+                                               driver_current, load_current, Rload, active_load),
+                         INVERTED_SWITCH_ROW, INVERTED_SWITCH_HEADER, [])
+    design = dict(Q1=Q1, Q2=Q2, Q3=Q3, Q4=Q4, Rb=driver.Rb, R1=driver.R1, R2=R2, Rload=Rload)
+    return TopologyResult("hi-low-inverted", design, [driver_table, switch_table])
+
+
+# Voltage dividers (standard_values_voltage_divider.py, uart-pick.py)
+
+DividerRow = namedtuple("DividerRow", ["index", "R1", "R2", "deviation", "Vo"])
+
+
+DIVIDER_SI_FIELDS = {"R1": "", "R2": ""}
+DIVIDER_ROW = "#{0}\tR2= {2}\tR1= {1}\tDeviation(%): {3:.4f}\tRHS: {4:.4f}"
+UART_ROW = "#{0}\tR1= {1}\tR2= {2}\tDeviation(%): {3:.4f}\tRHS: {4:.4f}"
+
+
+def _divider_rows(matches, output, target):
+    for index, match in enumerate(matches, 1):
+        Vo = output(match)
+        yield DividerRow(index, match.R1, match.R2, (Vo - target) / target, Vo)
+
+
+def voltage_divider(target=680 / (680 + 2200), Vref=1, Vgnd=0, tolerance=0.1, R1_min=680, R2_min=680,
+                    series="stock"):
+    """
+    Standard resistor pairs for Vo = ((Vref * R2) - (Vgnd * R1)) / (R1 + R2)
+    within tolerance (relative) of target, best match first
+    """
+    # Vo = Vref * ratio - Vgnd * (1 - ratio) with ratio = R2 / (R1 + R2), Vo
+    # is linear in the ratio so the best ratios are the best outputs
+    ratio = (target + Vgnd) / (Vref + Vgnd)
+    matches = synthesize_divider(ratio, RESISTORS[series].values, k=None, r_min=min(R1_min, R2_min),
+                                 max_error=tolerance * abs(target / (target + Vgnd)))
+    matches = [match for match in matches if match.R1 >= R1_min and match.R2 >= R2_min]
+    output = lambda match: ((Vref * match.R2) - (Vgnd * match.R1)) / (match.R1 + match.R2)
+    table = Table("divider", DividerRow, _divider_rows(matches, output, target), DIVIDER_ROW, None,
+                  ["LHS:  {0}".format(target)], DIVIDER_SI_FIELDS)
+    return TopologyResult("divider", dict(target=target), [table])
+
+
+def uart_divider(Vin=5, Vout=3.3, tolerance=0.04, r_min=330, direction="below", series="stock"):
+    """
+    Standard resistor pairs dividing a Vin signal down to Vout, by default
+    never above it (direction "below")
+    """
+    matches = synthesize_divider(Vout / Vin, RESISTORS[series].values, k=None, r_min=r_min,
+                                 max_error=tolerance, direction=direction)
+    output = lambda match: Vin * match.ratio
+    table = Table("divider", DividerRow, _divider_rows(matches, output, Vout), UART_ROW, None, [],
+                  DIVIDER_SI_FIELDS)
+    return TopologyResult("uart-divider", dict(target=Vout), [table])
+
+
+TOPOLOGIES = {
+    "hi-switch": hi_switch,
+    "hi-low-switch": hi_low_switch,
+    "hi-low-inverted": hi_low_inverted_switch,
+    "divider": voltage_divider,
+    "uart-divider": uart_divider,
+}
@@ -0,0 +1,175 @@
+from xml.sax.saxutils import escape
+import io
+import zipfile
+
+import pytest
+
+from assembly_check import Part, archive_sources, check_sources, iter_xlsx_rows, read_bom_xlsx
+
+MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _column(i):
+    name = ""
+    i += 1
+    while i:
+        i, rest = divmod(i - 1, 26)
+        name = chr(ord("A") + rest) + name
+    return name
+
+
+def _xlsx(rows, inline=()):
+    """
+    Returns an xlsx file of rows {row number: {column: value}}, strings
+    shared unless their column is in inline, numbers as values
+    """
+    strings = []
+    sheet = []
+    for number, cells in sorted(rows.items()):
+        xml = []
+        for column, value in sorted(cells.items()):
+            reference = "{0}{1}".format(_column(column), number)
+            if isinstance(value, str) and column in inline:
+                xml.append('<c r="{0}" t="inlineStr"><is><t>{1}</t></is></c>'.format(reference, escape(value)))
+            elif isinstance(value, str):
+                strings.append(value)
+                xml.append('<c r="{0}" t="s"><v>{1}</v></c>'.format(reference, len(strings) - 1))
+            else:
+                xml.append('<c r="{0}"><v>{1}</v></c>'.format(reference, value))
+        sheet.append('<row r="{0}">{1}</row>'.format(number, "".join(xml)))
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, "w") as book:
+        book.writestr("xl/workbook.xml", '<workbook xmlns="{0}" xmlns:r="{1}"><sheets>'
+                      '<sheet name="BOM" sheetId="1" r:id="rId3"/></sheets></workbook>'.format(MAIN, RELATIONSHIPS))
+        book.writestr("xl/_rels/workbook.xml.rels", '<Relationships xmlns="{0}">'
+                      '<Relationship Id="rId1" Target="styles.xml"/>'
+                      '<Relationship Id="rId3" Target="worksheets/bom.xml"/></Relationships>'.format(PACKAGE))
+        book.writestr("xl/sharedStrings.xml", '<sst xmlns="{0}">{1}</sst>'.format(
+            MAIN, "".join("<si><t>{0}</t></si>".format(escape(s)) for s in strings)))
+        book.writestr("xl/worksheets/bom.xml", '<worksheet xmlns="{0}"><sheetData>{1}</sheetData></worksheet>'.format(
+            MAIN, "".join(sheet)))
+    stream.seek(0)
+    return stream
+
+
+HEADER = {0: "Comment", 1: "Description", 2: "*Designator", 3: "Footprint", 5: "Quantity", 6: "Type"}
+
+
+def _bom(*lines):
+    """Returns an xlsx BOM of (comment, designators, footprint, quantity, type) lines below a title"""
+    rows = {1: {0: "Bill of Materials"}, 3: HEADER}
+    for number, (comment, designators, footprint, quantity, kind) in enumerate(lines, 4):
+        rows[number] = {0: comment, 2: designators, 3: footprint, 5: quantity}
+        if kind:
+            rows[number][6] = kind
+    return _xlsx(rows)
+
+
+def test_iter_xlsx_rows_sparse_and_inline():
+    rows = list(iter_xlsx_rows(_xlsx({2: {0: "a", 3: 4.7}, 5: {1: "b & c", 2: "inline"}}, inline=(2,))))
+    assert rows == [(2, ["a", "", "", "4.7"]), (5, ["", "b & c", "inline"])]
+
+
+def test_read_bom_xlsx_parts():
+    parts, findings = read_bom_xlsx(_bom(("10k", "R1, R2", "0603", 2, ""),
+                                         ("100nF", "C1", "0402", 1, "DNS")))
+    assert findings == []
+    assert parts["R2"] == Part("R2", "10k", "0603", True, "R1 (row 4)")
+    assert not parts["C1"].fitted
+
+
+@pytest.mark.parametrize("line, check", [
+    (("10k", "R1, R2", "0603", 3, ""), "quantity"),
+    (("10k", "R1, R2", "0603", 0, ""), "dnp"),
+    (("10k", "R1, R2", "0603", 0, "DNS"), None),
+    (("10k", "R1, R2", "0603", 2, "DNP"), None),
+    (("10k", "R1, R2", "0603", 1, "DNS"), "quantity"),
+])
+def test_read_bom_xlsx_quantity_rules(line, check):
+    _, findings = read_bom_xlsx(_bom(line))
+    assert [finding[1] for finding in findings] == ([check] if check else [])
+
+
+def test_read_bom_xlsx_duplicate():
+    parts, findings = read_bom_xlsx(_bom(("10k", "R1", "0603", 1, ""), ("22k", "R1", "0603", 1, "")))
+    assert findings == [("R1", "duplicate", "BOM lists it on lines R1 (row 4) and R1 (row 5)")]
+    assert parts["R1"].value == "10k"
+
+
+def test_read_bom_xlsx_without_designator_column():
+    with pytest.raises(ValueError):
+        read_bom_xlsx(_xlsx({1: {0: "Comment", 1: "Quantity"}, 2: {0: "10k", 1: 1}}))
+
+
+def test_archive_sources(tmp_path):
+    path = tmp_path / "DL-9.9-MB_PCB9.zip"
+    pick_place = ("Altium Designer Pick and Place Locations\r\n\r\n"
+                  "Designator,Comment,Layer,Footprint,Center-X(mm),Center-Y(mm),Rotation,Description\r\n"
+                  "R1,10k,TopLayer,0603,1.0,2.0,90,\r\n"
+                  "C1,100nF,TopLayer,0402,3.0,4.0,0,\r\n")
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("Pick Place for DL-MB.csv", pick_place)
+        archive.writestr("BOM_DL-MB.xlsx", _bom(("10k", "R1", "0603", 1, ""), ("100nF", "C1", "0402", 2, "")).read())
+    sources, findings = archive_sources(str(path))
+    assert sources["pick_place"]["R1"].footprint == "0603"
+    assert set(sources["bom"]) == {"R1", "C1"}
+    assert [finding[1] for finding in findings] == ["quantity"]
+
+
+def _part(designator, value=None, footprint=None, fitted=True):
+    return Part(designator, value, footprint, fitted, designator)
+
+
+def _checks(sources):
+    return sorted((designator, check, internal) for designator, check, _, internal in check_sources(sources))
+
+
+def test_check_sources_findings():
+    sources = {
+        "pick_place": {d: _part(d, footprint="0603") for d in ("R1", "R2", "R3", "R4", "R6")},
+        "bom": {
+            "R1": _part("R1", "4k7", "0603"),
+            "R2": _part("R2", "10k", "0603", fitted=False),     # placed but DNS
+            "R3": _part("R3", "10k", "0805"),                   # other footprint
+            "R5": _part("R5", "10k", "0603"),                   # fitted, not placed
+            "R6": _part("R6", "22k", "0603"),                   # schematic has 10k
+            "H1": _part("H1", "M3 screw", "HOLE"),              # BomDoc footprint differs
+        },
+        "schematic": {
+            "R1": _part("R1", ("4.7k", "Res2")),
+            "R2": _part("R2", ("10k",)),
+            "R3": _part("R3", ("10k",)),
+            "R5": _part("R5", ("10k",)),
+            "R6": _part("R6", ("10k",)),
+            "R7": _part("R7", ("1k",)),                         # not in the BOM
+            "R8": _part("R8", ("1k",), fitted=False),           # no BOM symbol
+        },
+        "bomdoc": {
+            "H1": _part("H1", "M3 screw", "M3"),
+            "H2": _part("H2", "Spacer", None),                  # manual line not in the BOM
+        },
+    }
+    assert _checks(sources) == [
+        ("H1", "footprint", False),
+        ("H2", "missing", False),
+        ("R2", "dnp", True),
+        ("R3", "footprint", True),
+        ("R4", "missing", False),
+        ("R4", "missing", True),
+        ("R5", "missing", True),
+        ("R6", "value", False),
+        ("R7", "missing", False),
+    ]
+
+
+def test_check_sources_bomdoc_value_and_manual_lines():
+    sources = {
+        "pick_place": {},
+        "bom": {"H1": _part("H1", "M3 screw", "M3"), "H2": _part("H2", "M2 screw", "M2")},
+        "schematic": {},
+        "bomdoc": {"H1": _part("H1", "M3 screw", "M3"), "H2": _part("H2", "M2.5 screw", "M2")},
+    }
+    # Manual lines are neither placed nor in the schematics
+    assert _checks(sources) == [("H2", "value", False)]
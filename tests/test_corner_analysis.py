@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from corner_analysis import (HI_LOW_METRICS, PRUNE_RTOL, Parameter, analyze, hi_low_bounds, hi_low_metrics,
+                             hi_low_parameters, worst_case)
+from device_library import default_library
+from switch_bias_arrays import hi_low_switch_array
+from switch_bias_intervals import Interval, hi_low_switch_interval
+from topologies import driver_resistors
+
+
+def _parameters(Vsig=5, Vsc=14.7, Rload=2.0, **tolerances):
+    library = default_library()
+    Q1, Q2, Q3 = library.fet("dmc3016lsd", "P"), library.fet("dmc3016lsd", "N"), library.bjt("bc848b")
+    driver = driver_resistors(Q3, Vsig, 0.01e-3, 0.1e-3, Vsc, desired_vce=Q3.Vce_sat)
+    return hi_low_parameters(Q1, Q2, Q3, driver.Rb, driver.R1, Rload, Vsc, Vsig, **tolerances)
+
+
+@pytest.mark.parametrize("Vsig, load_current, active_load", [(5, 2.5, False), (3.3, 10, True)])
+def test_branch_and_bound_matches_every_corner(Vsig, load_current, active_load):
+    parameters = _parameters(Vsig)
+    evaluate = hi_low_metrics(load_current, active_load)
+    pruned = analyze(parameters, evaluate, bounds=hi_low_bounds(load_current, active_load))
+    exhaustive = analyze(parameters, evaluate)
+    for metric in HI_LOW_METRICS:
+        assert pruned[metric].value == pytest.approx(exhaustive[metric].value, rel=PRUNE_RTOL)
+        assert pruned[metric].evaluations < 3**len(parameters) // 100
+        # The corner reported is one with the worst value
+        corner = {name: np.array([value]) for name, (_, value) in pruned[metric].corner.items()}
+        assert evaluate(corner)[metric][0] == pruned[metric].value
+        assert exhaustive[metric].boxes == 0
+
+
+@pytest.mark.filterwarnings("error")
+def test_failing_corners_are_the_worst():
+    parameters = _parameters(Vsig=3.3, Vsc=3.3)
+    evaluate = hi_low_metrics(2.5)
+    pruned = analyze(parameters, evaluate, bounds=hi_low_bounds(2.5))
+    exhaustive = analyze(parameters, evaluate)
+    for metric in HI_LOW_METRICS:
+        assert np.isnan(pruned[metric].value) == np.isnan(exhaustive[metric].value)
+    assert np.isnan(pruned["load_current"].value)
+    assert pruned["P_q3"].value == pytest.approx(exhaustive["P_q3"].value, rel=PRUNE_RTOL)
+
+
+def test_boxes_that_may_fail_are_not_pruned():
+    # Only the all-max corner fails, no single-parameter change from typ finds it
+    parameters = [Parameter(name, 1.0, 2.0, 3.0) for name in "abc"]
+
+    def evaluate(values):
+        failing = (values["a"] == 3) & (values["b"] == 3) & (values["c"] == 3)
+        return {"m": np.where(failing, np.nan, 0.0)}
+
+    def bounds(lo, hi):
+        return {"m": Interval(0.0 * lo["a"], 0.0 * hi["a"], (hi["a"] == 3) & (hi["b"] == 3) & (hi["c"] == 3))}
+
+    worst = worst_case(parameters, evaluate, "m", "max", bounds)
+    assert np.isnan(worst.value)
+    assert {name: level for name, (level, _) in worst.corner.items()} == dict.fromkeys("abc", "max")
+
+
+def test_bounds_enclose_the_array_engine():
+    parameters = _parameters(Vsig=4, K_tolerance=0.6, Vbe_tolerance=0.5, Vce_tolerance=0.9)
+    rng = np.random.default_rng(3)
+    m = 5000
+    lo, hi, values = {}, {}, {}
+    for p in parameters:
+        # P-Chan Vth levels are negative, min > max
+        a, b = sorted((p.min, p.max))
+        edges = np.sort(rng.uniform(a, b, (2, m)), axis=0)
+        # Whole ranges, sub-boxes and single points
+        full = rng.random(m) < 0.3
+        point = rng.random(m) < 0.2
+        lo[p.name] = np.where(full, a, edges[0])
+        hi[p.name] = np.where(point, lo[p.name], np.where(full, b, edges[1]))
+        values[p.name] = lo[p.name] + (hi[p.name] - lo[p.name]) * rng.random(m)
+    for load_current, active_load in [(2.5, False), (15, True)]:
+        bounds = hi_low_switch_interval(load_current=load_current, active_load=active_load,
+                                        **{name: Interval(lo[name], hi[name]) for name in lo})
+        result = hi_low_switch_array(load_current=load_current, active_load=active_load, **values)
+        expected = {"Id": result["Id"], "Vdrop": result["Vdrop"], "drop": values["Vsc"] - result["Vdrop"],
+                    "P_q1": result["P_q1"], "P_q2": result["P_q2"], "P_q3": result["P_q3"]}
+        for name, value in expected.items():
+            bound = bounds[name]
+            tol = 1e-12 * np.maximum(np.abs(value), 1)
+            inside = (value >= bound.lo - tol) & (value <= bound.hi + tol)
+            assert np.where(np.isnan(value), bound.nan, inside).all(), name
+
+
+def test_tables_with_lambda_have_no_bounds():
+    flat = SimpleNamespace(lam=0.0)
+    assert hi_low_bounds(2.5, tables=(flat, None)) is not None
+    assert hi_low_bounds(2.5, tables=(flat, SimpleNamespace(lam=0.01))) is None
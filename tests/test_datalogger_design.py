@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+
+from datalogger_design import main
+
+
+def test_ndjson_on_stdout_parses(capsys):
+    assert main(["hi-low-switch", "--output", "-", "--format", "ndjson"]) == 0
+    out, err = capsys.readouterr()
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert rows and all("Id" in row and "Vsc" in row for row in rows)
+    # The preamble is still shown, on stderr
+    assert "Rb options" in err
+
+
+def test_csv_on_stdout_with_two_tables(capsys):
+    assert main(["hi-switch", "--output", "-", "--format", "csv"]) == 0
+    out, err = capsys.readouterr()
+    rows = list(csv.reader(io.StringIO(out)))
+    headers = [i for i, row in enumerate(rows) if row[0] == "Vsig"]
+    # One header per table, every other line a row of that table
+    assert len(headers) == 2 and headers[0] == 0
+    for start, stop in zip(headers, headers[1:] + [len(rows)]):
+        assert stop - start > 1
+        assert all(len(row) == len(rows[start]) for row in rows[start:stop])
+    assert "\r\n" in err
+
+
+def test_table_keeps_preamble_on_stdout(capsys):
+    assert main(["hi-low-switch"]) == 0
+    out, err = capsys.readouterr()
+    assert "Rb options" in out and not err
+
+
+def test_batch_ndjson_on_stdout_parses(tmp_path, capsys):
+    specs = tmp_path / "specs.json"
+    specs.write_text(json.dumps([{"topology": "hi-low-switch", "Vsc": [5], "output": "-", "format": "ndjson"},
+                                 {"topology": "hi-low-switch", "Vsc": [12], "output": "-", "format": "ndjson"}]))
+    assert main(["batch", str(specs)]) == 0
+    out, _ = capsys.readouterr()
+    rows = [json.loads(line) for line in out.splitlines()]
+    assert {row["Vsc"] for row in rows} == {5, 12}
@@ -0,0 +1,62 @@
+import csv
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fet_fit import Curve, fit_curves, read_curve
+from nodal_solver import square_law
+
+
+def _curve(part, channel, Vth, K, lam):
+    """Returns a Curve of a transfer curve and four output curves of the model"""
+    transfer = np.linspace(Vth + 0.3, Vth + 4, 12)
+    Vgs = [transfer]
+    Vds = [np.full(transfer.shape, np.nan)]
+    for gate in (Vth + 1, Vth + 2, Vth + 3, Vth + 4):
+        drain = np.linspace(0.05, 6, 15)
+        Vgs.append(np.full(drain.shape, gate))
+        Vds.append(drain)
+    Vgs, Vds = np.concatenate(Vgs), np.concatenate(Vds)
+    saturated = np.isnan(Vds)
+    Vov = Vgs - Vth
+    Id = np.where(saturated, K / 2 * Vov**2, square_law(Vov, np.where(saturated, 0, Vds), K, lam)[0])
+    return Curve(part, channel, Vgs, Vds, Id)
+
+
+def test_fit_recovers_model_parameters():
+    parts = [("a", "N", 1.8, 35.0, 0.02), ("b", "P", 1.1, 0.25, 0.0), ("c", "N", 3.0, 8.5, 0.05)]
+    fits = fit_curves([_curve(*part) for part in parts])
+    for (part, channel, Vth, K, lam), fit in zip(parts, fits):
+        assert (fit.part, fit.channel) == (part, channel)
+        assert fit.Vth == pytest.approx(Vth if channel == "N" else -Vth, abs=1e-3)
+        assert fit.K == pytest.approx(K, rel=1e-3)
+        assert fit.lam == pytest.approx(lam, abs=1e-4)
+        assert fit.relative < 1e-3
+
+
+def test_fit_without_lambda():
+    fit = fit_curves([_curve("a", "N", 2.0, 10.0, 0.0)], fit_lambda=False)[0]
+    assert fit.lam == 0
+    assert fit.Vth == pytest.approx(2.0, abs=1e-3)
+    assert fit.K == pytest.approx(10.0, rel=1e-3)
+
+
+def _write(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Vgs", "Vds", "Id"])
+        writer.writerows(rows)
+
+
+def test_read_curve_signed_p_channel(tmp_path):
+    path = tmp_path / "p.csv"
+    _write(path, [(-3, "", -0.5), (-4, -1, -1.2), (-5, "", -2.0)])
+    curve = read_curve(str(path), "p", "P")
+    assert list(curve.Vgs) == [3, 4, 5]
+    assert list(curve.Id) == [0.5, 1.2, 2.0]
+    assert np.isnan(curve.Vds[0]) and curve.Vds[1] == 1
+
+    _write(path, [(-3, "", 0.5), (-4, "", -1.2)])
+    with pytest.raises(ValueError):
+        read_curve(str(path), "p", "P")
@@ -0,0 +1,75 @@
+import copy
+import os
+import pickle
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from device_library import default_library
+from iv_tables import TABLE_VERSION, VDS_MIN, VOV_MIN, FetTable, fet_table
+from nodal_solver import square_law
+
+
+@pytest.fixture(scope="module")
+def fets():
+    library = default_library()
+    return library.fet("dmc3016lsd", "N"), library.fet("dmc3016lsd", "P")
+
+
+def _with_lam(Q, lam):
+    Q = copy.copy(Q)
+    Q.lam = lam
+    return Q
+
+
+@pytest.mark.parametrize("lam", [0.0, 0.05])
+def test_fet_table_within_error_bound(tmp_path, fets, lam):
+    Q = _with_lam(fets[0], lam)
+    table = fet_table(Q, table_dir=str(tmp_path))
+    assert table.lam == lam
+    rng = np.random.default_rng(2)
+    Vov = np.exp(rng.uniform(np.log(VOV_MIN), np.log(abs(Q.Vgs_max)), 20000))
+    Vds = np.exp(rng.uniform(np.log(VDS_MIN), np.log(30), 20000))
+    Id, gm, gds = table.evaluate(Vov, Vds, Q.K)
+    expected = square_law(Vov, Vds, Q.K, lam)[0]
+    assert np.max(np.abs(Id / expected - 1)) <= table.error_bound
+    # Cut off at and below Vth
+    assert not table(np.array([0.0, -1.0]), 1.0, Q.K).any()
+
+
+def test_pickle_round_trip(tmp_path, fets):
+    table = fet_table(_with_lam(fets[1], 0.02), table_dir=str(tmp_path))
+    copied = pickle.loads(pickle.dumps(table))
+    assert isinstance(copied, FetTable)
+    assert (copied.path, copied.x, copied.y, copied.lam) == (table.path, table.x, table.y, 0.02)
+    # The file is mapped, not copied into the pickle
+    assert len(pickle.dumps(table)) < 1000
+    assert np.array_equal(copied(0.5, 2.0, 3.0), table(0.5, 2.0, 3.0))
+
+
+def test_changed_parameters_supersede_only_their_grid(tmp_path, fets):
+    table_dir = str(tmp_path)
+    N, P = fets
+    old = fet_table(N, table_dir=table_dir)
+    coarse = fet_table(N, n=(32, 32), table_dir=table_dir)
+    other_part = fet_table(P, table_dir=table_dir)
+    prefix = os.path.basename(old.path).split("_v")[0]
+    # Files of an older TABLE_VERSION and of the names before versions
+    older = tmp_path / "{0}_v{1}_0123abcd_0123456789abcdef.npy".format(prefix, TABLE_VERSION - 1)
+    legacy = tmp_path / "{0}_0123456789abcdef.npy".format(prefix)
+    unrelated = tmp_path / "notes.npy"
+    for path in (older, legacy, unrelated):
+        path.write_bytes(b"")
+
+    mtime = os.path.getmtime(old.path)
+    assert fet_table(N, table_dir=table_dir).path == old.path
+    assert os.path.getmtime(old.path) == mtime
+
+    new = fet_table(_with_lam(N, 0.01), table_dir=table_dir)
+    assert new.path != old.path
+    remaining = set(os.listdir(table_dir))
+    assert os.path.basename(old.path) not in remaining
+    assert not {older.name, legacy.name} & remaining
+    assert {os.path.basename(path) for path in (new.path, coarse.path, other_part.path)} <= remaining
+    assert unrelated.name in remaining
@@ -0,0 +1,75 @@
+from itertools import combinations_with_replacement, product
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from component_values import series_values
+from network_synthesis import NetworkSynthesizer
+
+# E6 over two decades keeps the brute force small
+VALUES = series_values("E6", 1, 2)
+
+
+def _brute_force_networks(values):
+    """Returns {canonical network: resistance} of every network of up to three values"""
+    networks = {}
+    for a in values:
+        networks[("R", a)] = a
+    for a, b in combinations_with_replacement(values, 2):
+        networks[("R+R", a, b)] = a + b
+        networks[("R||R", a, b)] = a * b / (a + b)
+    for a, b, c in combinations_with_replacement(values, 3):
+        networks[("R+R+R", a, b, c)] = a + b + c
+        networks[("R||R||R", a, b, c)] = 1 / (1 / a + 1 / b + 1 / c)
+    for (a, b), c in product(combinations_with_replacement(values, 2), values):
+        networks[("(R+R)||R", a, b, c)] = (a + b) * c / (a + b + c)
+        networks[("(R||R)+R", a, b, c)] = a * b / (a + b) + c
+    return networks
+
+
+def _canonical(network):
+    values = network.values
+    if network.topology in ("(R+R)||R", "(R||R)+R"):
+        return (network.topology,) + tuple(sorted(values[:2])) + (values[2],)
+    return (network.topology,) + tuple(sorted(values))
+
+
+@pytest.mark.parametrize("max_parts", [1, 2, 3])
+def test_resistance_matches_brute_force(max_parts):
+    networks = {key: R for key, R in _brute_force_networks(VALUES).items()
+                if (len(key) - 1) <= max_parts}
+    synthesizer = NetworkSynthesizer(VALUES, max_parts=max_parts)
+    rng = np.random.default_rng(5)
+    targets = 10**rng.uniform(0.5, 3, 50)
+    k = 5
+    for target, found in zip(targets, synthesizer.resistance(targets, k=k)):
+        expected = sorted(abs(R / target - 1) for R in networks.values())[:k]
+        assert [abs(network.error) for network in found] == pytest.approx(expected, rel=1e-9)
+        assert len({_canonical(network) for network in found}) == k
+        for network in found:
+            assert networks[_canonical(network)] == pytest.approx(network.resistance, rel=1e-12)
+
+
+def test_ratio_matches_brute_force():
+    synthesizer = NetworkSynthesizer(VALUES, max_parts=2)
+    for target in (0.1, 0.2487, 0.5, 0.9):
+        found = synthesizer.ratio([target], k=3)[0]
+        expected = sorted(abs(R2 / (R1 + R2) / target - 1) for R1, R2 in product(VALUES, VALUES))
+        # Every (R1, R2) pair is a distinct divider
+        assert [abs(match.error) for match in found] == pytest.approx(expected[:3], rel=1e-9)
+
+
+def test_tolerance_prefers_fewer_parts():
+    synthesizer = NetworkSynthesizer(VALUES)
+    best = synthesizer.resistance([48.0], k=1, tolerance=0.05)[0][0]
+    assert best.topology == "R" and best.values == (47.0,)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        NetworkSynthesizer(VALUES, max_parts=4)
+    with pytest.raises(ValueError):
+        NetworkSynthesizer(VALUES).resistance([-1.0])
+    with pytest.raises(ValueError):
+        NetworkSynthesizer(VALUES).ratio([1.5])
@@ -0,0 +1,67 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from device_library import default_library
+from nodal_solver import Circuit, ConvergenceError, hi_low_switch_circuit
+from switch_bias_functions import nfet_calculate
+from topologies import driver_resistors
+
+
+def test_resistor_divider_is_exact():
+    circuit = Circuit()
+    circuit.supply("vin", np.linspace(1, 10, 7))
+    circuit.resistor("vin", "out", 3e3)
+    circuit.resistor("out", "gnd", 1e3)
+    op = circuit.solve(strict=True)
+    assert op.converged.all()
+    assert op.voltage("out") == pytest.approx(np.linspace(1, 10, 7) / 4, rel=1e-9)
+
+
+def test_nfet_matches_nfet_calculate():
+    Vdd = np.linspace(3.3, 15, 40)
+    Vgs, Vth, K, Rd = 4.0, 2.0, 0.05, 50.0
+    circuit = Circuit()
+    circuit.supply("vdd", Vdd)
+    circuit.supply("vg", Vgs)
+    circuit.resistor("vdd", "d", Rd, name="Rd")
+    circuit.nfet("d", "vg", "gnd", Vth, K, name="M1")
+    op = circuit.solve(strict=True)
+    Id, Vds = op.current("M1"), op.voltage("d")
+    assert op.current("Rd") == pytest.approx(Id, rel=1e-9)
+
+    regions = set()
+    for i in range(len(Vdd)):
+        # The triode point is the one nfet_calculate finds for the solved current
+        expected_Id, expected_Vds, region = nfet_calculate(Vgs, Vth, K, Id[i], Vdd[i], Rd)
+        regions.add(region)
+        assert expected_Id == pytest.approx(Id[i], rel=1e-9)
+        assert expected_Vds == pytest.approx(Vds[i], rel=1e-7, abs=1e-9)
+    assert regions == {"sat", "tri"}
+
+
+def test_hi_low_switch_converges_over_sweep():
+    library = default_library()
+    Q1, Q2, Q3 = library.fet("dmc3016lsd", "P"), library.fet("dmc3016lsd", "N"), library.bjt("bc848b")
+    driver = driver_resistors(Q3, 5, 0.01e-3, 0.1e-3, 14.7, desired_vce=Q3.Vce_sat)
+    Vsig = np.array([0, 3.3, 5])[:, None]
+    Vsc = np.linspace(3.3, 14.7, 25)[None, :]
+    op = hi_low_switch_circuit(Vsig, Vsc, driver.Rb, driver.R1, 2.0, Q1, Q2, Q3).solve(strict=True)
+    assert op.converged.shape == (3, 25) and op.converged.all()
+    load = op.current("Rload")
+    # Series path: the high side, load and low side carry one current
+    assert -op.current("Q1") == pytest.approx(load, rel=1e-6, abs=1e-9)
+    assert op.current("Q2") == pytest.approx(load, rel=1e-6, abs=1e-9)
+    assert (np.abs(load[0]) < 1e-6).all()
+    assert (load[2] > 1).all()
+
+
+def test_strict_raises_when_not_converged():
+    circuit = Circuit()
+    circuit.supply("vdd", 12)
+    circuit.supply("vg", 5)
+    circuit.resistor("vdd", "d", 10)
+    circuit.nfet("d", "vg", "gnd", 2.0, 1.0)
+    with pytest.raises(ConvergenceError):
+        circuit.solve(max_iter=1, strict=True)
+    assert not circuit.solve(max_iter=1).converged.all()
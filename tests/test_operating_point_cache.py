@@ -0,0 +1,80 @@
+import switch_bias_functions
+from operating_point_cache import OperatingPointCache, cache_stats, invalidate_all, operating_point_cache, quantize
+
+
+def _counting(calls):
+    def evaluate(Vgs, Vth, K=1.0):
+        calls.append((Vgs, Vth, K))
+        return [Vgs - Vth, K]
+    return evaluate
+
+
+def test_quantize_merges_rounding_noise():
+    assert quantize(0.1 + 0.2, 1e-9) == quantize(0.3, 1e-9)
+    assert quantize(0.3, 1e-9) != quantize(0.3 * (1 + 1e-6), 1e-9)
+    assert quantize(-2.5, 1e-9) != quantize(2.5, 1e-9)
+    assert quantize(0.0, 1e-9) == quantize(-0.0, 1e-9) == 0
+    assert quantize("sat", 1e-9) == "sat"
+    assert quantize(True, 1e-9) is True
+
+
+def test_key_hits_and_returns_copies():
+    calls = []
+    cache = OperatingPointCache(_counting(calls), maxsize=8)
+    first = cache(5.0, 2.0, K=1.5)
+    first[0] = None
+    assert cache(5.0, 2.0 + 1e-15, K=1.5) == [3.0, 1.5]
+    # K given by position is a different key
+    cache(5.0, 2.0, 1.5)
+    assert len(calls) == 2
+    assert cache.cache_info() == (1, 2, 8, 2)
+
+
+def test_lru_eviction():
+    calls = []
+    cache = operating_point_cache(maxsize=2)(_counting(calls))
+    cache(1.0, 0.0)
+    cache(2.0, 0.0)
+    cache(1.0, 0.0)
+    cache(3.0, 0.0)         # evicts 2.0, the least recently used
+    cache(1.0, 0.0)
+    cache(2.0, 0.0)
+    assert [call[0] for call in calls] == [1.0, 2.0, 3.0, 2.0]
+
+
+def test_invalidate_by_parameter():
+    calls = []
+    cache = OperatingPointCache(_counting(calls))
+    cache(5.0, 2.0)
+    cache(5.0, 1.0)
+    cache(4.0, Vth=2.0)
+    assert cache.invalidate(Vth=2.0) == 2
+    assert cache.cache_info().currsize == 1
+    cache(5.0, 2.0)
+    cache(5.0, 1.0)
+    assert len(calls) == 4
+    assert cache.invalidate() == 2
+    assert cache.cache_info().currsize == 0
+
+
+def test_solver_is_part_of_the_key():
+    calls = []
+    cache = OperatingPointCache(_counting(calls))
+    previous = switch_bias_functions.solver
+    try:
+        cache(5.0, 2.0)
+        switch_bias_functions.set_solver("sympy" if previous == "numeric" else "numeric")
+        cache(5.0, 2.0)
+    finally:
+        switch_bias_functions.set_solver(previous)
+    assert len(calls) == 2
+
+
+def test_invalidate_all_clears_registered_caches():
+    calls = []
+    cache = OperatingPointCache(_counting(calls))
+    cache.__name__ = "test_cache"
+    cache(5.0, 2.0)
+    assert cache_stats()["test_cache"].currsize == 1
+    invalidate_all()
+    assert cache.cache_info() == (0, 0, 4096, 0)
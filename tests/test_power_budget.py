@@ -0,0 +1,78 @@
+import copy
+import os
+
+import pytest
+
+from power_budget import load_channel_map
+
+CHANNEL_MAP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Support",
+                           "channel_map.json")
+
+
+@pytest.fixture
+def budget_channels():
+    return load_channel_map(CHANNEL_MAP)
+
+
+def test_duty_and_schedule_changes_are_not_evaluated(budget_channels):
+    budget, channels = budget_channels
+    first = budget.update(channels)
+    assert budget.evaluations == len(channels)
+
+    changed = copy.deepcopy(channels)
+    changed[2]["duty"] = 0.5
+    budget.interval = 1200
+    second = budget.update(changed)
+    assert budget.evaluations == len(channels)
+    assert second[2].duty == 0.5
+    assert second[0].duty == first[0].duty / 2
+    # The states are the cached ones, only the averages change
+    assert [(result.on, result.off) for result in second] == [(result.on, result.off) for result in first]
+    assert second[2].average.supply_current > first[2].average.supply_current
+
+
+def test_topology_changes_are_evaluated(budget_channels):
+    budget, channels = budget_channels
+    budget.update(channels)
+    changed = copy.deepcopy(channels)
+    changed[0]["load_current"] = 0.2
+    results = budget.update(changed)
+    assert budget.evaluations == len(channels) + 1
+    assert results[0].on.supply_current > 0.2
+
+    # A rail voltage is a parameter of every channel on it
+    budget.rails["3V3"] = budget.rails["3V3"]._replace(voltage=3.6)
+    budget.update(changed)
+    assert budget.evaluations == len(channels) + 2
+
+
+def test_drive_current_without_drive_rail_is_on_the_own_rail(budget_channels):
+    budget, channels = budget_channels
+    channel = dict(channels[0])
+    del channel["drive_rail"]
+    result, = budget.update([channel])
+    assert result.drive_rail == channel["rail"]
+    assert result.on.drive_current > 0
+    rail = budget.rail_budgets([result])[channel["rail"]]
+    expected = budget.rails[channel["rail"]].quiescent + result.average.supply_current + result.average.drive_current
+    assert rail.current == pytest.approx(expected)
+    assert budget.rail_budgets([result])["5V"].current == budget.rails["5V"].quiescent
+
+
+def test_battery_life(budget_channels):
+    budget, channels = budget_channels
+    budgets = budget.rail_budgets(budget.update(channels))
+    current, hours = budget.battery_life(budgets)
+    assert current == pytest.approx(sum(rail.battery_current for rail in budgets.values()))
+    assert hours == pytest.approx(20 * 0.8 / current)
+
+
+def test_channel_map_errors(tmp_path):
+    path = tmp_path / "map.json"
+    path.write_text('{"rails": {"5V": {"voltage": 5}}, "channels": [{"name": "a", "rail": "12V"}]}')
+    with pytest.raises(ValueError):
+        load_channel_map(str(path))
+    path.write_text('{"rails": {"5V": {"voltage": 5}}, "channels": [{"name": "a", "rail": "5V"}, '
+                    '{"name": "a", "rail": "5V"}]}')
+    with pytest.raises(ValueError):
+        load_channel_map(str(path))
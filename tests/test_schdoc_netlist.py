@@ -0,0 +1,90 @@
+from collections import Counter
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from device_library import default_library
+from nodal_solver import hi_low_switch_circuit
+from schdoc_netlist import CFB_SIGNATURE, PROJECT_DIRS, Sheet, read_project
+
+
+@pytest.fixture(scope="module")
+def mainboard():
+    return read_project(PROJECT_DIRS["mainboard"])
+
+
+def test_mainboard_counts(mainboard):
+    assert (len(mainboard.instances), len(mainboard.components), len(mainboard.nets)) == (32, 261, 366)
+    sheets = Counter(instance.file_name for instance in mainboard.instances.values())
+    assert sheets["HS_LS_Switch_LOW_PWR.SchDoc"] == 18
+    assert sheets["Inverted_HS_LS_switch_HI_PWR.SchDoc"] == 4
+    assert sheets["HS_LS_switch_HI_PWR.SchDoc"] == 2
+    assert mainboard.instances[""].file_name == "Top level.SchDoc"
+
+
+def test_connector_board_counts():
+    netlist = read_project(PROJECT_DIRS["connector"])
+    assert (len(netlist.instances), len(netlist.components), len(netlist.nets)) == (1, 44, 170)
+    # A single sheet has no channels
+    assert not any("." in designator for designator in netlist.components)
+
+
+def test_channel_designators(mainboard):
+    for room in ("ISA1", "ISA2", "ISA3", "ISA4"):
+        instance = mainboard.instance(room)
+        assert instance.room == room
+        assert "{0}.R13".format(room) in instance.designators
+    R13 = mainboard.components["ISA1.R13"]
+    assert (R13.value, R13.sheet) == ("390k", "Inverted_HS_LS_switch_HI_PWR.SchDoc")
+    # Every channel of a sheet has the same parts, under its own room
+    channels = [instance for instance in mainboard.instances.values()
+                if instance.file_name == "HS_LS_Switch_LOW_PWR.SchDoc"]
+    parts = {tuple(designator.partition(".")[2] for designator in instance.designators) for instance in channels}
+    assert len(parts) == 1
+    assert len({instance.room for instance in channels}) == len(channels)
+
+
+def test_ports_join_the_sheet_above(mainboard):
+    instance = mainboard.instance("SAO1")
+    assert instance.ports["PWR"] == "5V"
+    # The drive port and the resistor pin on it are one net
+    assert mainboard.pin_nets("SAO1.R8")["1"] == instance.ports["Din"]
+    # Power ports are global, GND of every channel is one net
+    grounds = {mainboard.pin_nets(designator).get("E") for designator in mainboard.components
+               if designator.endswith(".Q1") and designator.startswith("SAO")}
+    assert grounds == {"GND"}
+
+
+def test_circuit_matches_hi_low_switch_circuit(mainboard):
+    library = default_library()
+    Q1, Q2, Q3 = library.fet("dmc3016lsd", "P"), library.fet("dmc3016lsd", "N"), library.bjt("bc848b")
+    Vsc = np.linspace(5, 14.7, 5)
+    op = mainboard.circuit("SAO1", {"PWR": Vsc, "Din": 5}, loads=[("HS", "LS", 10)]).solve(strict=True)
+    expected = hi_low_switch_circuit(5, Vsc, 390e3, 120e3, 10, Q1, Q2, Q3).solve(strict=True)
+
+    instance = mainboard.instance("SAO1")
+    driver = mainboard.pin_nets("SAO1.Q1")
+    nodes = {"base": driver["B"], "gate_q1": driver["C"], "load_hi": instance.ports["HS"],
+             "load_lo": instance.ports["LS"]}
+    for node, net in nodes.items():
+        assert op.voltage(net) == pytest.approx(expected.voltage(node), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("data", [b"", b"not a compound file" * 40, CFB_SIGNATURE + bytes(600)],
+                         ids=["empty", "text", "zero header"])
+def test_malformed_files_raise_value_error(tmp_path, data):
+    path = tmp_path / "bad.SchDoc"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        Sheet(str(path))
+
+
+def test_truncated_file_raises_value_error(tmp_path):
+    with open(os.path.join(PROJECT_DIRS["mainboard"], "5V_switches.SchDoc"), "rb") as f:
+        data = f.read()
+    path = tmp_path / "truncated.SchDoc"
+    path.write_bytes(data[:1536])
+    with pytest.raises(ValueError):
+        Sheet(str(path))
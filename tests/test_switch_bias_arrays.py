@@ -0,0 +1,100 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from switch_bias_arrays import (hi_low_switch_array, nfet_calculate_array, npn_calculate_array,
+                                pfet_calculate_array, region_names, sweep_grid, toSI_array)
+from switch_bias_functions import fromSI, nfet_calculate, npn_calculate, pfet_calculate, toSI
+
+
+POINTS = 400
+
+
+@pytest.mark.parametrize("Re", [0, 47.0])
+def test_npn_array_matches_scalar(Re):
+    rng, n = np.random.default_rng(1), POINTS
+    Vbb = rng.uniform(-1, 12, n)
+    Vcc = rng.uniform(3.3, 15, n)
+    Rb = rng.uniform(1e3, 1e6, n)
+    Rc = rng.uniform(100, 1e5, n)
+    beta = rng.uniform(100, 400, n)
+    result = npn_calculate_array(0.7, 0.1, beta, Vcc, Vbb, Rb, Rc, Re=Re)
+    for i in range(n):
+        expected = npn_calculate(0.7, 0.1, beta[i], Vcc[i], Vbb[i], Rb[i], Rc[i], Re=Re)
+        actual = [result[name][i] for name in ("Ib", "Ic", "Vce", "Vb", "Vc", "Ve", "power")]
+        assert actual == pytest.approx(expected, rel=1e-12, abs=1e-15)
+
+
+@pytest.mark.parametrize("channel", ["N", "P"])
+def test_fet_arrays_match_scalar(channel):
+    rng, n = np.random.default_rng(2), POINTS
+    Vgs = rng.uniform(0, 10, n)
+    Vth = rng.uniform(0.5, 3, n)
+    K = 10**rng.uniform(-2, 2, n)
+    I = 10**rng.uniform(-4, 1, n)
+    V = rng.uniform(3.3, 15, n)
+    Rd = 10**rng.uniform(-1, 3, n)
+    if channel == "N":
+        result = nfet_calculate_array(Vgs, Vth, K, I, V, Rd)
+        scalar = [nfet_calculate(Vgs[i], Vth[i], K[i], I[i], V[i], Rd[i]) for i in range(n)]
+    else:
+        result = pfet_calculate_array(-Vgs, -Vth, K, I, V, Rd)
+        scalar = [pfet_calculate(-Vgs[i], -Vth[i], K[i], I[i], V[i], Rd[i]) for i in range(n)]
+
+    regions = region_names(result["region"])
+    compared = 0
+    for i, (Id, Vds, region) in enumerate(scalar):
+        assert regions[i] == region
+        if isinstance(Vds, complex):
+            # The requested current is out of reach in triode
+            assert np.isnan(result["Vds"][i])
+            continue
+        assert result["Id"][i] == pytest.approx(Id, rel=1e-12, abs=1e-15)
+        assert result["Vds"][i] == pytest.approx(Vds, rel=1e-12, abs=1e-12)
+        compared += 1
+    assert {"cut", "sat", "tri"} <= set(regions)
+    assert compared > n // 2
+
+
+def test_hi_low_switch_array_broadcasts_sweep_grid():
+    Vsig, Vsc = sweep_grid([0, 3.3, 5], np.linspace(3.3, 14.7, 50))
+    result = hi_low_switch_array(Vsig, Vsc, Rb=390e3, R1=100e3, Rload=2, load_current=2.5,
+                                 Vbe_sat=0.7, Vce_sat=0.1, beta=200, Vth_q1=-2.1, K_q1=30,
+                                 Vth_q2=1.9, K_q2=35)
+    assert result.shape == (3, 50)
+    # Vsig = 0 leaves Q3 and so Q1 off, the load carries no current
+    assert (result["Id"][0] == 0).all()
+    assert (result["Id"][2] > 0).all()
+
+
+@pytest.mark.parametrize("digits", [0, 2, 4])
+def test_toSI_array_matches_toSI(digits):
+    rng = np.random.default_rng(3)
+    values = np.concatenate([
+        rng.choice([-1, 1], 5000) * 10**rng.uniform(-30, 30, 5000),
+        # Prefix boundaries, rounding halves and the Y / y clamping
+        [0.0, 1e-3, 1e3, 999.9999, 1e6 - 1e-7, 0.125, 2.5, 0.0005, 1e27, -1e-27, 4.7e3, 100e-9]])
+    text = toSI_array(values, "V", digits)
+    assert text.shape == values.shape
+    assert list(text) == [toSI(value, "V", digits) for value in values]
+
+
+def test_toSI_array_keeps_shape_and_non_finite():
+    assert toSI_array(np.ones((2, 3)) * 4700, "Ohm").shape == (2, 3)
+    assert list(toSI_array([np.nan, np.inf], "A")) == ["nanA", "infA"]
+
+
+@pytest.mark.parametrize("text, unit, value", [("4.70k", "", 4700.0), ("100nF", "F", 100e-9), ("10 kOhm", "Ohm", 10e3),
+                                               ("4k7", "", 4700.0), ("1R5", "", 1.5), ("R47", "", 0.47),
+                                               ("2M2", "", 2.2e6), ("3.3uF", "F", 3.3e-6), ("-12", "", -12.0)])
+def test_fromSI_parses_component_values(text, unit, value):
+    assert fromSI(text, unit) == value
+
+
+def test_fromSI_round_trips_toSI():
+    rng = np.random.default_rng(4)
+    values = rng.choice([-1, 1], 2000) * 10**rng.uniform(-24, 27, 2000)
+    for value, text in zip(values, toSI_array(values, "F", 6)):
+        assert fromSI(text, "F") == pytest.approx(value, rel=1e-6)
+    with pytest.raises(ValueError):
+        fromSI("4.7x")
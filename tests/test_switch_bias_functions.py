@@ -0,0 +1,63 @@
+import importlib.util
+
+import pytest
+
+from switch_bias_functions import (calculate_nfet_vsaturation, calculate_pfet_vsaturation,
+                                   calculate_triode_vds, nfet_calculate, pfet_calculate, solve_quadratic)
+
+# Only the reference backend needs SymPy
+requires_sympy = pytest.mark.skipif(importlib.util.find_spec("sympy") is None, reason="sympy is not installed")
+
+# (Vth, K, Rload, supply) of library parts from 1 Ohm to 100 kOhm loads
+SATURATION_CASES = [(2.0, 35.0, 2.0, 14.7), (1.1, 0.25, 120e3, 5), (3.5, 8.5, 10.0, 12), (0.7, 1e-3, 1e3, 3.3)]
+# (Vgs, Vth, K, Id), the last one has no real root
+TRIODE_CASES = [(5, 2.0, 35.0, 2.5), (-14.5, -1.1, 0.25, 0.1225e-3), (3.0, 2.0, 1.0, 0.4), (3.0, 2.0, 1.0, 0.6)]
+
+
+def _complex_roots(roots):
+    return sorted((complex(root) for root in roots), key=lambda z: (z.real, z.imag))
+
+
+@requires_sympy
+@pytest.mark.parametrize("Vth, K, Rload, Vdd", SATURATION_CASES)
+def test_nfet_vsaturation_matches_sympy(Vth, K, Rload, Vdd):
+    expected = float(calculate_nfet_vsaturation(Vth, K, Rload, Vdd, solver="sympy"))
+    assert calculate_nfet_vsaturation(Vth, K, Rload, Vdd) == pytest.approx(expected, rel=1e-12)
+
+
+@requires_sympy
+@pytest.mark.parametrize("Vth, K, Rload, Vss", SATURATION_CASES)
+def test_pfet_vsaturation_matches_sympy(Vth, K, Rload, Vss):
+    expected = float(calculate_pfet_vsaturation(-Vth, K, Rload, Vss, solver="sympy"))
+    assert calculate_pfet_vsaturation(-Vth, K, Rload, Vss) == pytest.approx(expected, rel=1e-12)
+
+
+@requires_sympy
+@pytest.mark.parametrize("Vgs, Vth, K, Id", TRIODE_CASES)
+def test_triode_vds_matches_sympy(Vgs, Vth, K, Id):
+    expected = _complex_roots(calculate_triode_vds(Vgs, Vth, K, Id, solver="sympy"))
+    actual = _complex_roots(calculate_triode_vds(Vgs, Vth, K, Id))
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert a == pytest.approx(e, rel=1e-12, abs=1e-15)
+
+
+@requires_sympy
+@pytest.mark.parametrize("Vgs, Ids, Vdd, Rd", [(5, 2.5, 14.7, 2.0), (2.05, 0.01, 12, 50), (1.5, 1, 5, 1)])
+def test_fet_calculate_matches_sympy(Vgs, Ids, Vdd, Rd):
+    nfet = dict(Vgs=Vgs, Vth=2.0, K=35.0, Ids=Ids, Vdd=Vdd, Rd=Rd)
+    pfet = dict(Vgs=-Vgs, Vth=-2.0, K=35.0, Isd=Ids, Vss=Vdd, Rd=Rd)
+    for function, kwargs in ((nfet_calculate, nfet), (pfet_calculate, pfet)):
+        expected = function(solver="sympy", **kwargs)
+        actual = function(**kwargs)
+        assert actual[2] == expected[2]
+        assert actual[:2] == pytest.approx([float(value) for value in expected[:2]], rel=1e-12, abs=1e-15)
+
+
+def test_solve_quadratic_without_cancellation():
+    # b**2 >> 4ac: the small root loses every digit in the textbook formula
+    small, large = solve_quadratic(1.0, -1e8, 1.0)
+    assert small == pytest.approx(1e-8, rel=1e-12)
+    assert large == pytest.approx(1e8, rel=1e-12)
+    assert solve_quadratic(0, 2.0, -4.0) == [2.0]
+    assert solve_quadratic(0, 0, 1.0) == []
@@ -0,0 +1,25 @@
+import pytest
+
+from topologies import voltage_divider
+
+
+def _rows(result):
+    return list(result.tables[0].rows)
+
+
+def test_divider_with_vgnd_is_ranked_on_vo():
+    rows = _rows(voltage_divider(target=1.0, Vref=5, Vgnd=1, tolerance=0.05))
+    assert rows
+    for row in rows:
+        Vo = (5 * row.R2 - 1 * row.R1) / (row.R1 + row.R2)
+        assert row.Vo == pytest.approx(Vo)
+        assert abs(Vo - 1.0) <= 0.05
+    errors = [abs(row.Vo - 1.0) for row in rows]
+    assert errors == sorted(errors)
+
+
+def test_divider_minimums_apply_to_their_own_resistor():
+    rows = _rows(voltage_divider(R1_min=10e3, R2_min=100))
+    assert all(row.R1 >= 10e3 and row.R2 >= 100 for row in rows)
+    # R2 below R1_min is allowed
+    assert min(row.R2 for row in rows) < 10e3